@@ -2,45 +2,157 @@
 # Funciones de análisis de contenido e intent
 
 import re
+import threading
 import numpy as np
-from typing import List, Dict, Any, Tuple
-from sklearn.feature_extraction.text import CountVectorizer
+import pandas as pd
+import scipy.sparse as sp
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.utils import murmurhash3_32
+from results_store import pages_frame
 
+try:
+    import ahocorasick
+except Exception:
+    ahocorasick = None
+
+_TOKEN_PATTERN = r"(?u)\b\w+\b"
+
+
+INTENT_LABELS = ("informational", "transactional", "navigational", "commercial_investigation", "local")
+
+# Patrones de intent en español: (peso, frases). Cada intent suma su peso una vez
+# si aparece alguna de sus frases (como palabra completa) en títulos, snippets o PAA.
+INTENT_CUES = {
+    "informational": (1.5, ["cómo", "que es", "qué es", "guía", "explicación", "review", "reseña", "vs"]),
+    "transactional": (1.5, ["comprar", "precio", "$", "oferta", "tienda", "dónde comprar"]),
+    "navigational": (1.0, ["sitio oficial", "oficial", "inicio", "login", "marcapágina"]),
+    "commercial_investigation": (1.5, ["mejores", "top", "ranking", "comparativa", "comparación"]),
+    "local": (1.0, ["cerca", "cercano", "cerca de mí", "mapa", "dirección", "teléfono"]),
+}
+
+# Features de la SERP que indican intent por sí mismas: {feature: (intent, peso)}
+INTENT_SERP_FEATURES = {
+    "shopping": ("transactional", 1.5),
+    "local_pack": ("local", 1.5),
+    "top_stories": ("informational", 0.5),
+    "videos": ("informational", 0.5),
+    "ai_overview": ("informational", 0.5),
+    "knowledge_graph": ("navigational", 0.5),
+}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+_CUES = [cue for _, cues in INTENT_CUES.values() for cue in cues]
+_CUE_COLUMN = {cue: i for i, cue in enumerate(_CUES)}
+_CUE_LENGTHS = np.array([len(cue) for cue in _CUES], dtype=np.int64)
+# Bordes de palabra: solo para frases que empiezan/terminan en letra o número ("$" no)
+_CUE_BOUNDS = np.array([(_is_word_char(cue[0]), _is_word_char(cue[-1])) for cue in _CUES], dtype=bool)
+if ahocorasick:
+    # Autómata Aho-Corasick con todas las frases: una sola pasada (en C) por el texto
+    _CUE_AUTOMATON = ahocorasick.Automaton()
+    for _column, _cue in enumerate(_CUES):
+        _CUE_AUTOMATON.add_word(_cue, _column)
+    _CUE_AUTOMATON.make_automaton()
+else:
+    _CUE_AUTOMATON = None
+# Frase → intent (matriz frases × intents) y pesos por intent
+_CUE_INTENT = np.zeros((len(_CUES), len(INTENT_LABELS)))
+for _label, (_, _cues) in INTENT_CUES.items():
+    for _cue in _cues:
+        _CUE_INTENT[_CUE_COLUMN[_cue], INTENT_LABELS.index(_label)] = 1.0
+_INTENT_WEIGHTS = np.array([INTENT_CUES[label][0] for label in INTENT_LABELS])
+_FEATURE_NAMES = list(INTENT_SERP_FEATURES)
+_FEATURE_INTENT = np.zeros((len(_FEATURE_NAMES), len(INTENT_LABELS)))
+for _i, (_label, _weight) in enumerate(INTENT_SERP_FEATURES.values()):
+    _FEATURE_INTENT[_i, INTENT_LABELS.index(_label)] = _weight
+
+
+def _serp_text(serp_snippets: List[Dict[str, Any]], paa: List[str]) -> str:
+    text = " ".join([(x.get("title") or "") + " " + (x.get("snippet") or "")
+                     for x in serp_snippets])
+    return (text + " " + " ".join(paa)).lower()
+
+
+def _cue_matches(corpus: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Inicio y columna de cada aparición de una frase, incluidas las que están dentro
+    de otras más largas (sin mirar bordes de palabra)."""
+    if _CUE_AUTOMATON is not None:
+        hits = np.array(list(_CUE_AUTOMATON.iter(corpus)), dtype=np.int64).reshape(-1, 2)
+        columns = hits[:, 1]
+        return hits[:, 0] + 1 - _CUE_LENGTHS[columns], columns
+    # Sin pyahocorasick: búsqueda de cada frase con str.find (mismo resultado)
+    starts, columns = [], []
+    for column, cue in enumerate(_CUES):
+        start = corpus.find(cue)
+        while start != -1:
+            starts.append(start)
+            columns.append(column)
+            start = corpus.find(cue, start + 1)
+    return np.array(starts, dtype=np.int64), np.array(columns, dtype=np.int64)
+
+
+def _word_chars(corpus: str, positions: np.ndarray) -> np.ndarray:
+    """Si el carácter en cada posición es letra/número/_ (fuera del texto: no)."""
+    # Code points con un carácter de relleno a cada lado (posiciones -1 y len)
+    codes = np.frombuffer(("\n" + corpus + "\n").encode("utf-32-le"), dtype=np.uint32)[positions + 1]
+    unique, inverse = np.unique(codes, return_inverse=True)
+    return np.array([_is_word_char(chr(c)) for c in unique], dtype=bool)[inverse]
+
+
+def intent_cue_counts(texts: List[str]) -> sp.csr_matrix:
+    """Matriz dispersa textos × frases de INTENT_CUES con la cantidad de apariciones
+    (como palabras completas).
+
+    Los textos se unen con un separador y se recorren de una vez; cada aparición se
+    asigna a su texto por posición.
+    """
+    if not texts:
+        return sp.csr_matrix((0, len(_CUES)))
+    corpus = "\n".join(texts)
+    starts, columns = _cue_matches(corpus)
+    ends = starts + _CUE_LENGTHS[columns]
+    keep = ~((_CUE_BOUNDS[columns, 0] & _word_chars(corpus, starts - 1)) |
+             (_CUE_BOUNDS[columns, 1] & _word_chars(corpus, ends)))
+    starts, columns = starts[keep], columns[keep]
+    # Posición de inicio de cada texto dentro del corpus
+    offsets = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+    rows = np.searchsorted(offsets, starts, side="right") - 1
+    return sp.csr_matrix((np.ones(len(columns)), (rows, columns)), shape=(len(texts), len(_CUES)))
 
-def guess_intent(serp_snippets: List[Dict[str, Any]], paa: List[str]) -> Tuple[str, Dict[str, float]]:
-    """Heuristic intent classifier based on snippets, PAA patterns, and SERP mix."""
-    text = " ".join([(x.get("title") or "") + " " + (x.get("snippet") or "") 
-                    for x in serp_snippets]).lower()
-    text += " " + " ".join(paa).lower()
-    
-    scores = {
-        "informational": 0.0,
-        "transactional": 0.0,
-        "navigational": 0.0,
-        "commercial_investigation": 0.0,
-        "local": 0.0,
-    }
-    
-    kw = lambda *xs: any(x in text for x in xs)
-    
-    # Patrones de intent en español
-    if kw("cómo", "que es", "qué es", "guía", "explicación", "review", "reseña", "vs "):
-        scores["informational"] += 1.5
-    if kw("comprar", "precio", "$", "oferta", "tienda", "dónde comprar"):
-        scores["transactional"] += 1.5
-    if kw("sitio oficial", "oficial", "inicio", "login", "marcapágina"):
-        scores["navigational"] += 1.0
-    if kw("mejores", "top", "ranking", "comparativa", "comparación"):
-        scores["commercial_investigation"] += 1.5
-    if kw("cerca", "cercano", "cerca de mí", "mapa", "dirección", "teléfono"):
-        scores["local"] += 1.0
-    
-    # Normalizar y seleccionar
-    label = max(scores, key=scores.get)
-    total = sum(scores.values()) or 1.0
-    probs = {k: v/total for k, v in scores.items()}
-    
-    return label, probs
+
+def guess_intent_batch(serps: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, float]]]:
+    """Clasifica el intent de muchas SERP de una vez.
+
+    Cada elemento de `serps` es un dict de features (parse_serp_features) con
+    "organic" (ya recortado al top a analizar) y "paa"; las demás features que traiga
+    (shopping, local_pack, top_stories...) suman según INTENT_SERP_FEATURES.
+    Devuelve [(label, probs)] en el mismo orden, como guess_intent.
+    """
+    if not serps:
+        return []
+    texts = [_serp_text(serp.get("organic") or [], serp.get("paa") or []) for serp in serps]
+    present = (intent_cue_counts(texts) @ _CUE_INTENT) > 0
+    scores = present * _INTENT_WEIGHTS
+    indicators = np.array([[bool(serp.get(name)) for name in _FEATURE_NAMES] for serp in serps], dtype=float)
+    scores += indicators @ _FEATURE_INTENT
+    totals = scores.sum(axis=1)
+    probs = scores / np.where(totals > 0, totals, 1.0)[:, None]
+    # argmax desempata por el primer intent, igual que max() sobre el dict
+    return [(INTENT_LABELS[label], dict(zip(INTENT_LABELS, row.tolist())))
+            for label, row in zip(scores.argmax(axis=1), probs)]
+
+
+def guess_intent(serp_snippets: List[Dict[str, Any]], paa: List[str],
+                 features: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, float]]:
+    """Heuristic intent classifier based on snippets, PAA patterns, and SERP mix.
+
+    Para varios keywords conviene guess_intent_batch (una sola pasada).
+    """
+    return guess_intent_batch([dict(features or {}, organic=serp_snippets, paa=paa)])[0]
 
 
 def ngrams_top(texts: List[str], n: Tuple[int, int] = (1, 2), topk: int = 20) -> List[Tuple[str, int]]:
@@ -49,7 +161,7 @@ def ngrams_top(texts: List[str], n: Tuple[int, int] = (1, 2), topk: int = 20) ->
         return []
     
     vect = CountVectorizer(ngram_range=n, lowercase=True, stop_words=None, 
-                          token_pattern=r"(?u)\b\w+\b")
+                          token_pattern=_TOKEN_PATTERN)
     X = vect.fit_transform(texts)
     sums = np.array(X.sum(axis=0)).ravel()
     items = list(zip(vect.get_feature_names_out(), sums))
@@ -57,10 +169,160 @@ def ngrams_top(texts: List[str], n: Tuple[int, int] = (1, 2), topk: int = 20) ->
     return items[:topk]
 
 
+class NgramIndex:
+    """Índice incremental de n-gramas de las páginas scrapeadas en una corrida.
+
+    Cada página (por URL) se vectoriza una sola vez con un HashingVectorizer, sin
+    vocabulario que ajustar: agregar páginas no obliga a recalcular nada. Se guarda
+    una fila dispersa por página y por campo (`title`, `headings` = H2+H3, `text`) y
+    qué keywords la trajeron, así una URL compartida cuenta para cada keyword pero
+    una sola vez en el total de la corrida. Como el hashing no es reversible, se
+    recuerda el primer n-grama visto en cada columna para devolver términos legibles.
+    """
+
+    FIELDS = ("title", "headings", "text")
+
+    def __init__(self, n: Tuple[int, int] = (1, 2), n_features: int = 2 ** 20):
+        self.n_features = n_features
+        self._vect = HashingVectorizer(ngram_range=n, lowercase=True, token_pattern=_TOKEN_PATTERN,
+                                       n_features=n_features, alternate_sign=False, norm=None,
+                                       dtype=np.float32)
+        self._analyzer = self._vect.build_analyzer()
+        self._lock = threading.Lock()
+        self._rows: Dict[str, List[sp.csr_matrix]] = {field: [] for field in self.FIELDS}
+        self._url_row: Dict[str, int] = {}
+        self._keyword_rows: Dict[str, List[int]] = {}
+        self._terms: Dict[int, str] = {}
+        self._matrices: Dict[str, sp.csr_matrix] = {}
+
+    def _column(self, term: str) -> int:
+        # Mismo hash que HashingVectorizer (murmurhash3 con signo, módulo n_features)
+        return abs(murmurhash3_32(term, seed=0)) % self.n_features
+
+    def _field_texts(self, page: Dict[str, Any]) -> List[str]:
+        headings = list(page.get("h2") or []) + list(page.get("h3") or [])
+        return [page.get("title") or "", "\n".join(h for h in headings if h), page.get("text") or ""]
+
+    def add_page(self, keyword: str, page: Dict[str, Any]) -> bool:
+        """Suma una página scrapeada (fila de scrape_urls) al keyword. Devuelve si era nueva."""
+        url = page.get("url") or ""
+        with self._lock:
+            row = self._url_row.get(url) if url else None
+            if row is not None:
+                rows = self._keyword_rows.setdefault(keyword, [])
+                if row not in rows:
+                    rows.append(row)
+                return False
+        texts = self._field_texts(page)
+        # Vectorizar y mapear términos fuera del lock: es la parte cara
+        X = self._vect.transform(texts).tocsr()
+        terms = {}
+        for text in texts:
+            for term in self._analyzer(text):
+                terms.setdefault(self._column(term), term)
+        with self._lock:
+            if url and url in self._url_row:
+                # Otro hilo la indexó mientras tanto
+                row = self._url_row[url]
+            else:
+                row = len(self._rows["title"])
+                for i, field in enumerate(self.FIELDS):
+                    self._rows[field].append(X[i])
+                if url:
+                    self._url_row[url] = row
+                for column, term in terms.items():
+                    self._terms.setdefault(column, term)
+                self._matrices.clear()
+            rows = self._keyword_rows.setdefault(keyword, [])
+            if row not in rows:
+                rows.append(row)
+        return True
+
+    def add_pages(self, keyword: str, pages: Iterable[Dict[str, Any]]) -> int:
+        """Suma varias páginas (de las fallidas queda el título de la SERP). Devuelve cuántas eran nuevas."""
+        return sum(self.add_page(keyword, page) for page in pages)
+
+    def _matrix(self, fields: Tuple[str, ...]) -> Tuple[sp.csr_matrix, Dict[str, List[int]]]:
+        """Matriz páginas × columnas sumando `fields` (se cachea hasta la próxima página nueva)."""
+        with self._lock:
+            keyword_rows = {kw: list(rows) for kw, rows in self._keyword_rows.items()}
+            X = self._matrices.get(fields)
+            if X is None:
+                X = sp.csr_matrix((len(self._rows["title"]), self.n_features), dtype=np.float32)
+                for field in fields:
+                    if self._rows[field]:
+                        X = X + sp.vstack(self._rows[field], format="csr")
+                self._matrices[fields] = X
+        return X, keyword_rows
+
+    def _top(self, scores: np.ndarray, topk: int, as_int: bool) -> List[Tuple[str, Any]]:
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > topk:
+            # Empates en el corte incluidos, para desempatar por término como ngrams_top
+            kth = np.partition(scores[candidates], len(candidates) - topk)[len(candidates) - topk]
+            candidates = candidates[scores[candidates] >= kth]
+        with self._lock:
+            items = [(self._terms.get(int(c), f"#{c}"), int(scores[c]) if as_int else float(scores[c]))
+                     for c in candidates]
+        items.sort(key=lambda x: (-x[1], x[0]))
+        return items[:topk]
+
+    def top(self, keyword: Optional[str] = None, topk: int = 20,
+            fields: Iterable[str] = FIELDS, tfidf: bool = False) -> List[Tuple[str, Any]]:
+        """N-gramas más frecuentes de un keyword (o de toda la corrida con keyword=None).
+
+        Devuelve [(término, conteo)] como ngrams_top. Con `tfidf=True` el puntaje es
+        conteo × idf, con el idf calculado sobre todas las páginas de la corrida
+        (destaca lo propio del keyword frente al resto del lote).
+        """
+        fields = tuple(fields)
+        if keyword is not None and not tfidf:
+            # Solo las filas del keyword: no hace falta armar la matriz de toda la corrida
+            with self._lock:
+                rows = [self._rows[field][r] for r in self._keyword_rows.get(keyword, ()) for field in fields]
+            if not rows:
+                return []
+            return self._top(np.asarray(sp.vstack(rows).sum(axis=0)).ravel(), topk, as_int=True)
+        X, keyword_rows = self._matrix(fields)
+        if keyword is None:
+            selected = X
+        else:
+            rows = keyword_rows.get(keyword)
+            if not rows:
+                return []
+            selected = X[rows]
+        scores = np.asarray(selected.sum(axis=0)).ravel()
+        if tfidf:
+            docs = np.bincount(X.indices, minlength=self.n_features)
+            scores = scores * (np.log((1 + X.shape[0]) / (1 + docs)) + 1)
+        return self._top(scores, topk, as_int=not tfidf)
+
+    def top_by_keyword(self, topk: int = 20, fields: Iterable[str] = FIELDS,
+                       tfidf: bool = False) -> Dict[str, List[Tuple[str, Any]]]:
+        """top() para cada keyword indexado."""
+        with self._lock:
+            keywords = list(self._keyword_rows)
+        return {kw: self.top(kw, topk, fields, tfidf) for kw in keywords}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"pages": len(self._rows["title"]), "keywords": len(self._keyword_rows),
+                    "terms": len(self._terms),
+                    "nnz": sum(row.nnz for rows in self._rows.values() for row in rows)}
+
+
+def median_length_words(df) -> int:
+    """Mediana de palabras de las páginas con texto (0 si ninguna tiene)."""
+    lengths = df["len_words"].fillna(0)
+    median = lengths[lengths > 0].median()
+    return 0 if pd.isna(median) else int(median)
+
+
 def analyze_content_structure(df) -> Dict[str, Any]:
-    """Analiza la estructura del contenido extraído"""
+    """Analiza la estructura del contenido extraído (DataFrame o tabla Arrow de páginas)"""
+    df = pages_frame(df)
     return {
-        "median_length_words": int(df["len_words"].replace(0, np.nan).median(skipna=True) or 0),
+        "median_length_words": median_length_words(df),
         "has_tables": int(df["has_tables"].sum()),
         "has_lists": int(df["has_lists"].sum()),
         "total_h2": sum(len(h2) for h2 in df["h2"].dropna() if h2),
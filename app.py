@@ -8,6 +8,7 @@
 #   or fill them in the sidebar (they'll only live for this session).
 # - Install requirements from requirements.txt
 # - Run: streamlit run app.py
+# - Batch (sin UI): python batch_runner.py keywords.csv --out runs/lote1
 #
 # DISCLAIMER
 # Respect target sites' terms and robots.txt. Use responsibly.
@@ -33,11 +34,16 @@ logger = logging.getLogger(__name__)
 logger.info("=== LOGGING INICIALIZADO ===")  # Prueba de log
 
 # Imports de nuestros módulos
-from dataforseo_api import dfs_live_serp, get_autocomplete, parse_serp_features
+from dataforseo_api import dfs_live_serp, get_autocomplete, parse_serp_features, serp_cache
 from dfs_client import RestClient
 from scraper import extract_article
-from analytics import guess_intent, analyze_content_structure
+from analytics import NgramIndex, guess_intent, analyze_content_structure
 from outline_generator import *
+from pipeline import OUTLINE_NGRAM_FIELDS, keyword_events, scrape_registry
+from serp_clustering import SerpClusterer
+from results_store import ResultsStore
+from llm_cache import get_llm_cache
+from llm_dispatcher import get_dispatcher
 from ui_components import (
     setup_sidebar, 
     setup_main_input, 
@@ -45,9 +51,160 @@ from ui_components import (
     display_content_anatomy,
     display_video_suggestions,
     create_download_links,
+    create_run_download,
     create_article_download_button
 )
 
+
+def render_keyword_result(result, config):
+    """Muestra en la pestaña actual el resultado de analyze_keyword para un keyword"""
+    kw = result["keyword"]
+    st.subheader(f"Keyword: {kw}")
+    if result.get("error"):
+        st.error(result["error"])
+        return
+
+    features = result["features"]
+    organic = result["organic"]
+    paa = features["paa"]
+    videos = features["videos"]
+    ai_overview = features["ai_overview"]
+    top_stories = features["top_stories"]
+    related_searches = features["related_searches"]
+    images = features["images"]
+    twitter = features["twitter"]
+    carousel = features["carousel"]
+    knowledge_graph = features["knowledge_graph"]
+    intent_label, intent_scores = result["intent_label"], result["intent_scores"]
+    df = result["df"]
+    auto = result["auto"]
+    related = related_searches
+    outline_md = result["outline_md"]
+
+    with st.status("Consultando SERP de Google via DataForSEO…", expanded=False, state="complete"):
+        display_results_summary(organic, paa, videos, ai_overview, top_stories,
+                                related_searches, images, twitter, carousel, knowledge_graph)
+
+    # Análisis de intent
+    st.markdown(f"**Intención (heurística)**: `{intent_label}`")
+    st.json(intent_scores, expanded=False)
+
+    # Scraping de resultados (organic + top stories)
+    st.info(f"Extraído el contenido de {len(result['urls_to_scrape'])} resultados (orgánicos + noticias destacadas)")
+    
+    # Debug: mostrar columnas disponibles si hay error
+    st.write("**Columnas disponibles en el DataFrame:**", list(df.columns))
+    st.write("**Primeras filas:**")
+    st.write(df.head())
+    
+    # Verificar que las columnas existen antes de mostrar
+    expected_cols = ["rank", "site", "title", "len_words", "has_tables", "has_lists", "url"]
+    available_cols = [col for col in expected_cols if col in df.columns]
+    if available_cols:
+        st.dataframe(df[available_cols])
+    else:
+        logger.error("Error: No se pudieron extraer las columnas esperadas del contenido web")
+        st.error("Error: No se pudieron extraer las columnas esperadas del contenido web")
+        st.write("Datos extraídos:", df)
+
+    # Anatomía del contenido
+    display_content_anatomy(df)
+
+    # Related searches y Autocomplete
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Búsquedas relacionadas**")
+        if related:
+            st.write(related[:15])
+        else:
+            st.write("(ninguna)")
+    with col2:
+        st.markdown("**Autocompletado**")
+        if auto:
+            st.write(auto[:15])
+        else:
+            st.write("(ninguno)")
+
+    for warning in result["warnings"]:
+        st.warning(warning)
+
+    # Mostrar outline
+    st.markdown("### Outline recomendado")
+    cluster = result.get("cluster")
+    if cluster and cluster["representative"] != result["keyword"]:
+        st.caption(f"🔗 Outline compartido con «{cluster['representative']}» "
+                   f"(SERP {cluster['similarity']:.0%} similar, cluster de {cluster['size']} keywords)")
+    if result.get("llm_cache") == "hit":
+        st.caption("♻️ Outline desde la caché del LLM (usá «Forzar regeneración» para pedir uno nuevo)")
+    st.markdown(outline_md)
+
+    # Sugerencias de video
+    display_video_suggestions(videos)
+
+    # Botones de descarga
+    create_download_links(result["full_outline_md"], result["pages"], kw)
+
+    # # SOLO generación automática de artículo según config
+    # if config.get("auto_generate_article") and config.get("article_type"):
+    #     st.markdown("---")
+    #     st.subheader("🚀 Artículo Generado Automáticamente")
+    #     if config["article_type"] == "IA (OpenAI)":
+    #         if config.get("use_openai") and config.get("openai_key"):
+    #             with st.spinner("Generando artículo con IA... ⏳"):
+    #                 try:
+    #                     logger.info(f"Llamando a generate_article_with_openai para '{kw}'")
+    #                     article_content = generate_article_with_openai(
+    #                         kw,
+    #                         outline=outline_md,
+    #                         df=df,
+    #                         paa=paa,
+    #                         related=related or auto or [],
+    #                         ai_overview=ai_overview,
+    #                         videos=videos,
+    #                         top_stories=top_stories,
+    #                         related_searches=related_searches,
+    #                         images=images,
+    #                         twitter=twitter,
+    #                         carousel=carousel,
+    #                         knowledge_graph=knowledge_graph,
+    #                         intent_label=intent_label,
+    #                         intent_scores=intent_scores,
+    #                         model=config["openai_model"],
+    #                         api_key=config["openai_key"],
+    #                         temperature=config["openai_temperature"],
+    #                     )
+    #                     logger.info(f"Artículo generado con IA para '{kw}': {len(article_content)} caracteres")
+    #                     st.success("✅ ¡Artículo generado con IA!")
+    #                     st.markdown("### 📄 Artículo Completo (IA)")
+    #                     st.markdown(article_content)
+    #                     create_article_download_button(article_content, kw, 'ia')
+    #                 except Exception as e:
+    #                     logger.error(f"Error generando artículo con OpenAI para '{kw}': {str(e)}")
+    #                     # Si la función genera un response_raw, loguéalo
+    #                     if hasattr(e, 'response') and hasattr(e.response, 'text'):
+    #                         logger.error(f"Respuesta cruda OpenAI: {e.response.text}")
+    #                     st.error(f"❌ Error: {str(e)}")
+    #         else:
+    #             st.warning("⚠️ Configura OpenAI en la barra lateral")
+    #     elif config["article_type"] == "Básico (Heurístico)":
+    #         with st.spinner("Generando artículo básico... ⏳"):
+    #             try:
+    #                 article_content = generate_article_heuristic(
+    #                     kw,
+    #                     outline=outline_md,
+    #                     df=df,
+    #                     paa=paa,
+    #                     related=related or auto or []
+    #                 )
+    #                 st.success("✅ ¡Artículo básico generado!")
+    #                 st.markdown("### 📄 Artículo Básico")
+    #                 st.markdown(article_content)
+    #                 create_article_download_button(article_content, kw, 'basico')
+    #             except Exception as e:
+    #                 logger.error(f"Error generando artículo básico para '{kw}': {str(e)}")
+    #                 st.error(f"❌ Error: {str(e)}")
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # UI CONFIG
 
@@ -98,300 +255,74 @@ def main():
             st.error("Las credenciales de DataForSEO son requeridas.")
             st.stop()
 
+        keywords = list(dict.fromkeys(keywords))
         logger.info(f"Procesando {len(keywords)} keywords: {keywords}")
         tabs = st.tabs([f"{k}" for k in keywords])
-
+        placeholders = {}
         for tab, kw in zip(tabs, keywords):
-            with tab:
-                logger.info(f"--- PROCESANDO KEYWORD: {kw} ---")
-                st.subheader(f"Keyword: {kw}")
-
-                # Consultar SERP via DataForSEO
-                logger.info(f"Consultando SERP para: {kw}")
-                with st.status("Consultando SERP de Google via DataForSEO…", expanded=False):
-                    try:
-                        js = dfs_live_serp(
-                            kw, 
-                            login=config["dfs_login"], 
-                            password=config["dfs_password"],
-                            location_name=config["location_name"], 
-                            language_code=config["language_code"],
-                            device=config["device"], 
-                            safe=config["safe"]
-                        )
-                        logger.info(f"Respuesta SERP recibida: {type(js)}, keys: {js.keys() if isinstance(js, dict) else 'No dict'}")
-                        
-                        features = parse_serp_features(js)
-                        logger.info(f"Features parseadas: organic={len(features['organic'])}, paa={len(features['paa'])}, videos={len(features['videos'])}, ai_overview={len(features['ai_overview'])}, related_searches={len(features['related_searches'])}, top_stories={len(features['top_stories'])}, twitter={len(features['twitter'])}, carousel={len(features['carousel'])}, knowledge_graph={len(features['knowledge_graph'])}")
-                        
-                        organic = features["organic"][:config["top_n"]]
-                        top_stories = features["top_stories"]
-                        
-                        # Combinar URLs de organic y top_stories para scraping
-                        all_urls_to_scrape = []
-                        
-                        # Agregar URLs orgánicas
-                        for item in organic:
-                            all_urls_to_scrape.append({
-                                "title": item["title"],
-                                "url": item["url"],
-                                "source_type": "organic"
-                            })
-                        
-                        # Agregar URLs de top stories (hasta 3 para no sobrecargar)
-                        for story in top_stories[:3]:
-                            all_urls_to_scrape.append({
-                                "title": story["title"],
-                                "url": story["url"],
-                                "source_type": "top_stories"
-                            })
-                        paa = features["paa"]
-                        videos = features["videos"]
-                        ai_overview = features["ai_overview"]
-                        related_searches = features["related_searches"]
-                        images = features["images"]
-                        twitter = features["twitter"]
-                        carousel = features["carousel"]
-                        knowledge_graph = features["knowledge_graph"]
-                        logger.info(f"Usando top {len(organic)} resultados orgánicos + {len(top_stories[:3])} top stories para scraping")
-                        logger.info(f"Related searches extraídas del SERP: {len(related_searches)}")
-                        logger.info(f"Features adicionales extraídos - Images: {len(images)}, Twitter: {len(twitter)}, Carousel: {len(carousel)}, Knowledge Graph: {len(knowledge_graph)}")
-                        
-                        display_results_summary(organic, paa, videos, ai_overview, top_stories,
-                                               related_searches, images, twitter, carousel, knowledge_graph)
-                    except Exception as e:
-                        logger.error(f"Error consultando SERP: {str(e)}")
-                        st.error(f"Error consultando SERP: {str(e)}")
-                        continue
-
-                # Análisis de intent
-                logger.info("Analizando intención de búsqueda...")
-                intent_label, intent_scores = guess_intent(organic, paa)
-                logger.info(f"Intent detectado: {intent_label}, scores: {intent_scores}")
-                st.markdown(f"**Intención (heurística)**: `{intent_label}`")
-                st.json(intent_scores, expanded=False)
-
-                # Scraping de resultados (organic + top stories)
-                logger.info(f"Iniciando scraping de {len(all_urls_to_scrape)} resultados (organic + top stories)...")
-                st.info(f"Extrayendo contenido de {len(all_urls_to_scrape)} resultados (orgánicos + noticias destacadas)…")
-                rows = []
-                for i, item in enumerate(all_urls_to_scrape, 1):
-                    url = item.get("url")
-                    title = item.get("title")
-                    source_type = item.get("source_type", "organic")
-                    logger.info(f"Scraping {i}/{len(all_urls_to_scrape)}: {url} (tipo: {source_type})")
-                    if not url:
-                        logger.warning(f"URL vacía en resultado {i}")
-                        continue
-                    time.sleep(config["pause"])
-                    try:
-                        data = extract_article(url)
-                        logger.info(f"Scraping exitoso: {url} -> {data.get('len_words', 0)} palabras")
-                    except Exception as e:
-                        logger.error(f"Error scraping {url}: {str(e)}")
-                        data = {
-                            "url": url, "site": url, "title": title or "", "text": "", 
-                            "h2": [], "h3": [], "has_tables": False, "has_lists": False, 
-                            "len_words": 0, "error": str(e)
-                        }
-                    data["rank"] = i
-                    data["source_type"] = source_type
-                    if not data.get("title"):
-                        data["title"] = title
-                    rows.append(data)
-                    logger.info(f"Datos agregados para {url}: {list(data.keys())}")
-
-                logger.info(f"Creando DataFrame con {len(rows)} filas...")
-                df = pd.DataFrame(rows)
-                logger.info(f"DataFrame creado. Shape: {df.shape}, Columnas: {list(df.columns)}")
-                
-                # Debug: mostrar columnas disponibles si hay error
-                st.write("**Columnas disponibles en el DataFrame:**", list(df.columns))
-                st.write("**Primeras filas:**")
-                st.write(df.head())
-                logger.info(f"Mostrando DataFrame en UI: shape={df.shape}")
-                
-                # Verificar que las columnas existen antes de mostrar
-                expected_cols = ["rank", "site", "title", "len_words", "has_tables", "has_lists", "url"]
-                available_cols = [col for col in expected_cols if col in df.columns]
-                logger.info(f"Columnas esperadas: {expected_cols}")
-                logger.info(f"Columnas disponibles: {available_cols}")
-                
-                if available_cols:
-                    logger.info(f"Mostrando columnas disponibles: {available_cols}")
-                    st.dataframe(df[available_cols])
-                else:
-                    logger.error("Error: No se pudieron extraer las columnas esperadas del contenido web")
-                    st.error("Error: No se pudieron extraer las columnas esperadas del contenido web")
-                    st.write("Datos extraídos:", df)
-
-                # Anatomía del contenido
-                logger.info("Mostrando anatomía del contenido...")
-                display_content_anatomy(df)
-
-                # Related searches y Autocomplete
-                logger.info("Mostrando búsquedas relacionadas y autocompletado...")
-                col1, col2 = st.columns(2)
-                with col1:
-                    # Las related searches ya están extraídas del SERP
-                    related = related_searches
-                    logger.info(f"Related searches del SERP: {len(related)} resultados")
-                        
-                    st.markdown("**Búsquedas relacionadas**")
-                    if related:
-                        st.write(related[:15])
-                    else:
-                        st.write("(ninguna)")
-                
-                with col2:
-                    try:
-                        auto = get_autocomplete(
-                            kw, 
-                            contry_iso_code=config["country_iso_code"], 
-                            lang_iso=config["lang_iso_code"]
-                        )
-                        logger.info(f"Autocomplete obtenido: {len(auto)} resultados")
-                    except Exception as e:
-                        logger.error(f"Error obteniendo autocomplete: {str(e)}")
-                        auto = []
-                    st.markdown("**Autocompletado**")
-                    if auto:
-                        st.write(auto[:15])
-                    else:
-                        st.write("(ninguno)")
-
-                # Generar outline
-                logger.info("Iniciando generación de outline...")
-                outline_md = None
-                if config["use_openai"] and config["openai_key"]:
-                    logger.info("Usando OpenAI para generar outline...")
-                    with st.spinner("Generando outline con OpenAI…"):
-                        try:
-                            outline_md = generate_outline_with_openai(
-                                kw,
-                                df=df,
-                                paa=paa,
-                                related=related or auto or [],
-                                ai_overview=ai_overview,
-                                videos=videos,
-                                top_stories=top_stories,
-                                related_searches=related_searches,
-                                images=images,
-                                twitter=twitter,
-                                carousel=carousel,
-                                knowledge_graph=knowledge_graph,
-                                intent_label=intent_label,
-                                intent_scores=intent_scores,
-                                model=config["openai_model"],
-                                api_key=config["openai_key"],
-                                temperature=config["openai_temperature"],
-                            )
-                            logger.info(f"Outline generado con OpenAI: {len(outline_md)} caracteres")
-                        except Exception as e:
-                            logger.error(f"Error generando outline con OpenAI: {str(e)}")
-                            st.warning(f"Outline con OpenAI falló ({e}). Usando outline heurístico.")
-                            outline_md = None
-                
-                if not outline_md:
-                    logger.info("Usando método heurístico para generar outline...")
-                    outline_md = build_outline(
-                        kw, 
-                        scraped=df, 
-                        paa=paa, 
-                        related=related or auto, 
-                        ai_overview=ai_overview,
-                        videos=videos,
-                        top_stories=top_stories,
-                        related_searches=related_searches,
-                        images=images,
-                        twitter=twitter,
-                        carousel=carousel,
-                        knowledge_graph=knowledge_graph
-                    )
-                    logger.info(f"Outline generado con método heurístico: {len(outline_md)} caracteres")
-
-                # Agregar sugerencias de video y top stories al markdown para exportación
-                video_suggestions_md = generate_video_suggestions_markdown(videos)
-                top_stories_md = generate_top_stories_markdown(top_stories)
-                
-                full_outline_md = outline_md
-                if video_suggestions_md:
-                    full_outline_md += "\n\n" + video_suggestions_md
-                if top_stories_md:
-                    full_outline_md += "\n\n" + top_stories_md
-                
-                # Mostrar outline
-                logger.info("Mostrando outline final...")
-                st.markdown("### Outline recomendado")
-                st.markdown(outline_md)
-
-                # Sugerencias de video
-                display_video_suggestions(videos)
-
-                # Botones de descarga
-                create_download_links(full_outline_md, df, kw)
+            placeholders[kw] = tab.empty()
+            placeholders[kw].info(f"⏳ Analizando «{kw}»…")
 
-                # # SOLO generación automática de artículo según config
-                # if config.get("auto_generate_article") and config.get("article_type"):
-                #     st.markdown("---")
-                #     st.subheader("🚀 Artículo Generado Automáticamente")
-                #     if config["article_type"] == "IA (OpenAI)":
-                #         if config.get("use_openai") and config.get("openai_key"):
-                #             with st.spinner("Generando artículo con IA... ⏳"):
-                #                 try:
-                #                     logger.info(f"Llamando a generate_article_with_openai para '{kw}'")
-                #                     article_content = generate_article_with_openai(
-                #                         kw,
-                #                         outline=outline_md,
-                #                         df=df,
-                #                         paa=paa,
-                #                         related=related or auto or [],
-                #                         ai_overview=ai_overview,
-                #                         videos=videos,
-                #                         top_stories=top_stories,
-                #                         related_searches=related_searches,
-                #                         images=images,
-                #                         twitter=twitter,
-                #                         carousel=carousel,
-                #                         knowledge_graph=knowledge_graph,
-                #                         intent_label=intent_label,
-                #                         intent_scores=intent_scores,
-                #                         model=config["openai_model"],
-                #                         api_key=config["openai_key"],
-                #                         temperature=config["openai_temperature"],
-                #                     )
-                #                     logger.info(f"Artículo generado con IA para '{kw}': {len(article_content)} caracteres")
-                #                     st.success("✅ ¡Artículo generado con IA!")
-                #                     st.markdown("### 📄 Artículo Completo (IA)")
-                #                     st.markdown(article_content)
-                #                     create_article_download_button(article_content, kw, 'ia')
-                #                 except Exception as e:
-                #                     logger.error(f"Error generando artículo con OpenAI para '{kw}': {str(e)}")
-                #                     # Si la función genera un response_raw, loguéalo
-                #                     if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                #                         logger.error(f"Respuesta cruda OpenAI: {e.response.text}")
-                #                     st.error(f"❌ Error: {str(e)}")
-                #         else:
-                #             st.warning("⚠️ Configura OpenAI en la barra lateral")
-                #     elif config["article_type"] == "Básico (Heurístico)":
-                #         with st.spinner("Generando artículo básico... ⏳"):
-                #             try:
-                #                 article_content = generate_article_heuristic(
-                #                     kw,
-                #                     outline=outline_md,
-                #                     df=df,
-                #                     paa=paa,
-                #                     related=related or auto or []
-                #                 )
-                #                 st.success("✅ ¡Artículo básico generado!")
-                #                 st.markdown("### 📄 Artículo Básico")
-                #                 st.markdown(article_content)
-                #                 create_article_download_button(article_content, kw, 'basico')
-                #             except Exception as e:
-                #                 logger.error(f"Error generando artículo básico para '{kw}': {str(e)}")
-                #                 st.error(f"❌ Error: {str(e)}")
+        # Los keywords se procesan en paralelo; cada pestaña se completa apenas termina el suyo
+        progress = st.progress(0.0, text=f"0/{len(keywords)} keywords analizados")
+        # El outline de OpenAI se va mostrando a medida que llega (como máximo ~5 repintados/s)
+        registry = scrape_registry(config)
+        ngram_index = NgramIndex()
+        store = ResultsStore()
+        clusterer = SerpClusterer.from_config(config) if config.get("cluster_serps") and len(keywords) > 1 else None
+        streamed, last_paint, done = {}, {}, 0
+        for kind, kw, payload in keyword_events(keywords, config, registry=registry, ngram_index=ngram_index,
+                                                clusterer=clusterer):
+            if kind == "delta":
+                streamed[kw] = streamed.get(kw, "") + payload
+                if time.monotonic() - last_paint.get(kw, 0.0) >= 0.2:
+                    placeholders[kw].markdown(streamed[kw] + " ▌")
+                    last_paint[kw] = time.monotonic()
+                continue
+            done += 1
+            store.add(payload)
+            with placeholders[kw].container():
+                render_keyword_result(payload, config)
+            progress.progress(done / len(keywords), text=f"{done}/{len(keywords)} keywords analizados")
 
-                logger.info(f"=== PROCESAMIENTO COMPLETADO PARA: {kw} ===")
+        cache_stats = serp_cache().stats()
+        logger.info(f"Caché SERP: {cache_stats}")
+        st.caption(f"Caché SERP: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                   f"({cache_stats['entries']} entradas, {cache_stats['size_bytes'] / 1e6:.1f} MB)")
+        llm_cache = get_llm_cache()
+        if llm_cache and config.get("use_openai"):
+            llm_stats = llm_cache.stats()
+            logger.info(f"Caché LLM: {llm_stats}")
+            st.caption(f"Caché LLM: {llm_stats['hits']} hits / {llm_stats['misses']} misses "
+                       f"({llm_stats['entries']} respuestas, {llm_stats['size_bytes'] / 1e6:.1f} MB)")
+        if config.get("use_openai") and config.get("openai_key"):
+            llm_dispatch = get_dispatcher(config["openai_key"]).stats()
+            logger.info(f"Despachador OpenAI: {llm_dispatch}")
+            if llm_dispatch["requests"]:
+                st.caption(f"OpenAI: {llm_dispatch['requests']} pedidos, espera en cola media "
+                           f"{llm_dispatch['avg_queue_wait_s']:.1f}s (máx. {llm_dispatch['max_queue_wait_s']:.1f}s), "
+                           f"{llm_dispatch['retries']} reintentos")
+        scrape_stats = registry.stats()
+        logger.info(f"Registro de scraping: {scrape_stats}")
+        if scrape_stats["fetches_saved"]:
+            st.caption(f"Scraping: {scrape_stats['fetches']} descargas para {scrape_stats['requests']} URLs "
+                       f"({scrape_stats['fetches_saved']} compartidas entre keywords)")
+        logger.info(f"Índice de n-gramas: {ngram_index.stats()}")
+        if clusterer is not None:
+            clusters = clusterer.clusters()["clusters"]
+            logger.info(f"Clustering SERP: {clusterer.stats()}")
+            st.caption(f"Clusters: {len(clusters)} outlines para {len(keywords)} keywords")
+            with st.expander("🔗 Clusters de keywords"):
+                st.dataframe(pd.DataFrame([{"cluster": c["id"], "representante": c["representative"],
+                                            "keywords": ", ".join(c["keywords"]), "tamaño": c["size"]}
+                                           for c in clusters]))
+        if len(keywords) > 1:
+            # Temas dominantes en títulos y headings de todas las páginas de la corrida
+            with st.expander("🔤 N-gramas de la corrida"):
+                st.dataframe(pd.DataFrame(ngram_index.top(None, 30, fields=OUTLINE_NGRAM_FIELDS),
+                                          columns=["n-grama", "frecuencia"]))
+        logger.info(f"Resultados de la corrida: {store.stats()}")
+        create_run_download(store)
 
     logger.info("=== APLICACIÓN FINALIZADA ===")
 
@@ -0,0 +1,451 @@
+# batch_runner.py
+# Ejecución por lotes sin UI: keywords desde CSV/JSONL/TXT → pipeline → resultados en disco.
+#
+# Uso:
+#   python batch_runner.py keywords.csv --out runs/2024-05 [--parquet] [--openai | --openai-batch]
+#
+# Las credenciales se leen de DATAFORSEO_LOGIN / DATAFORSEO_PASSWORD (y OPENAI_API_KEY).
+# Cada keyword terminado se agrega a <out>/results.jsonl y se marca en <out>/checkpoint.json;
+# si la corrida se interrumpe, volver a lanzarla con el mismo --out retoma desde ahí sin
+# repetir llamadas pagas (las SERP además quedan en la caché persistente).
+#
+# Con --openai-batch los outlines se piden a la Batch API de OpenAI (más barata, sin
+# latencia interactiva): cada keyword se guarda primero con el outline heurístico y su
+# petición se agrega a <out>/openai_batch_input.jsonl; al final se envía el batch y,
+# cuando termina, se reemplazan los outlines en results.jsonl. Si se corta mientras el
+# batch está en curso, la próxima corrida lo retoma por su id sin reenviarlo.
+#
+# Con --cluster se consultan primero todas las SERP y los keywords con resultados
+# orgánicos casi iguales comparten el outline de un representante (ver
+# serp_clustering.py); la asignación queda en cada registro y en <out>/clusters.json.
+#
+# Con --parquet la corrida se exporta además como dataset Parquet (zstd) en <out>/dataset:
+# pages/ (páginas con texto completo) y serp/ (features) se vuelcan por tandas de
+# DATASET_FLUSH_EVERY keywords, y outlines/ se regenera al final desde results.jsonl.
+# Si el proceso muere de golpe se pierden las filas de la tanda sin volcar (results.jsonl
+# queda completo); ver results_store.py para leerlo.
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from config import DEFAULT_CONFIG, COUNTRY_ISO_TO_NAME
+from dataforseo_api import get_client, serp_cache
+from keyword_expansion import expand_keywords
+from llm_cache import get_llm_cache
+from llm_dispatcher import get_dispatcher
+from openai_batch import (BATCH_FINAL_STATUSES, batch_client, batch_line, batch_results, custom_id,
+                          submit_batch, wait_for_batch)
+from page_cache import get_page_cache
+from analytics import NgramIndex
+from pipeline import OUTLINE_NGRAM_FIELDS, openai_outline_args, run_keywords, scrape_registry
+from serp_clustering import SerpClusterer
+from results_store import ResultsStore, outlines_table, write_outlines
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FILE = "results.jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+DATASET_DIR = "dataset"
+DATASET_FLUSH_EVERY = 100
+OPENAI_BATCH_INPUT = "openai_batch_input.jsonl"
+CLUSTERS_FILE = "clusters.json"
+
+# Columnas del scraping que se copian al JSONL (el texto completo va solo al dataset Parquet)
+_SCRAPED_SUMMARY_COLUMNS = ["rank", "source_type", "url", "site", "title", "len_words", "error"]
+
+
+def read_keywords(path: str, column: str = "keyword") -> List[str]:
+    """Lee keywords de un CSV (columna `column` o la primera), JSONL ({"keyword": ...}) o TXT.
+
+    Descarta vacíos y duplicados conservando el orden.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    keywords = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if ext == ".csv":
+            reader = csv.reader(f)
+            header = next(reader, [])
+            if column in header:
+                index = header.index(column)
+            else:
+                # Sin encabezado reconocible: la primera fila también es un keyword
+                index = 0
+                keywords.append(header[0] if header else "")
+            keywords += [row[index] for row in reader if len(row) > index]
+        elif ext in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    keywords.append(record.get(column, "") if isinstance(record, dict) else str(record))
+        else:
+            keywords = f.read().splitlines()
+
+    seen: Set[str] = set()
+    unique = []
+    for kw in keywords:
+        kw = kw.strip()
+        if kw and kw not in seen:
+            seen.add(kw)
+            unique.append(kw)
+    return unique
+
+
+class Checkpoint:
+    """Registro de keywords terminados de una corrida, persistido en <out>/checkpoint.json.
+
+    El resultado se escribe en results.jsonl antes de marcar el checkpoint; al retomar
+    también se cuentan como terminados los keywords presentes en results.jsonl, así un
+    corte entre ambas escrituras no repite el keyword.
+    """
+
+    def __init__(self, out_dir: str):
+        self.path = os.path.join(out_dir, CHECKPOINT_FILE)
+        self.results_path = os.path.join(out_dir, RESULTS_FILE)
+        self.done: Set[str] = set()
+        self.failed: Dict[str, str] = {}
+        # Estado de los batches de OpenAI: {"submitted_lines": n, "batches": [{"id", "applied"}]}
+        self.openai_batch: Dict[str, Any] = {"submitted_lines": 0, "batches": []}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.failed = data.get("failed", {})
+            self.openai_batch = data.get("openai_batch", self.openai_batch)
+        for record in self._results():
+            if not record.get("error"):
+                self.done.add(record["keyword"])
+                self.failed.pop(record["keyword"], None)
+
+    def _results(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.results_path):
+            return
+        with open(self.results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Última línea cortada por una interrupción a mitad de escritura
+                    logger.warning(f"Línea inválida en {self.results_path}, se ignora")
+
+    def pending(self, keywords: List[str], retry_failed: bool = True) -> List[str]:
+        return [kw for kw in keywords
+                if kw not in self.done and (retry_failed or kw not in self.failed)]
+
+    def mark(self, keyword: str, error: Optional[str]):
+        if error:
+            self.failed[keyword] = error
+        else:
+            self.done.add(keyword)
+            self.failed.pop(keyword, None)
+        self.save()
+
+    def save(self):
+        # Escritura atómica para no dejar un checkpoint corrupto
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed,
+                       "openai_batch": self.openai_batch}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def records(self) -> List[Dict[str, Any]]:
+        return list(self._results())
+
+    def rewrite_results(self, records: List[Dict[str, Any]]):
+        """Reemplaza results.jsonl de forma atómica (ej. al aplicar outlines del batch)."""
+        tmp_path = self.results_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp_path, self.results_path)
+
+
+def result_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte el resultado de analyze_keyword en un registro serializable a JSON."""
+    features = result.get("features") or {}
+    df = result.get("df")
+    scraped = []
+    if df is not None and not df.empty:
+        columns = [c for c in _SCRAPED_SUMMARY_COLUMNS if c in df.columns]
+        scraped = df[columns].to_dict("records")
+    return {
+        "keyword": result["keyword"],
+        "error": result.get("error"),
+        "warnings": result.get("warnings", []),
+        "intent_label": result.get("intent_label"),
+        "intent_scores": result.get("intent_scores"),
+        "outline_source": result.get("outline_source"),
+        "llm_cache": result.get("llm_cache"),
+        "outline_md": result.get("full_outline_md"),
+        "paa": features.get("paa", []),
+        "related_searches": features.get("related_searches", []),
+        "autocomplete": result.get("auto", []),
+        "serp_features": {k: len(v) for k, v in features.items()},
+        "cluster": result.get("cluster"),
+        "scraped": scraped,
+        "timings": result.get("timings", {}),
+    }
+
+
+def submit_pending_batch(out_dir: str, checkpoint: Checkpoint, client) -> Optional[str]:
+    """Envía como un batch nuevo las peticiones agregadas desde el último envío."""
+    with open(os.path.join(out_dir, OPENAI_BATCH_INPUT), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    submitted = checkpoint.openai_batch["submitted_lines"]
+    # Si un corte dejó la petición de un keyword repetida, quedarse con la última
+    pending = {json.loads(line)["custom_id"]: line for line in lines[submitted:] if line.strip()}
+    if not pending:
+        return None
+    part_path = os.path.join(out_dir, f"openai_batch_part{len(checkpoint.openai_batch['batches']) + 1}.jsonl")
+    with open(part_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(pending.values()) + "\n")
+    batch_id = submit_batch(client, part_path, metadata={"out_dir": os.path.basename(os.path.abspath(out_dir))})
+    checkpoint.openai_batch["submitted_lines"] = len(lines)
+    checkpoint.openai_batch["batches"].append({"id": batch_id, "requests": len(pending), "path": part_path,
+                                               "applied": False})
+    checkpoint.save()
+    return batch_id
+
+
+def apply_openai_batches(out_dir: str, checkpoint: Checkpoint, config: Dict[str, Any],
+                         **wait_kwargs) -> Dict[str, int]:
+    """Envía lo pendiente, espera los batches abiertos y aplica sus outlines a results.jsonl.
+
+    Los keywords cuyo pedido falla conservan el outline heurístico (build_outline) y
+    reciben un warning. Un batch que no termina antes del timeout queda para la
+    próxima corrida.
+    """
+    stats = {"outlines": 0, "failed": 0, "batches_pending": 0}
+    if not os.path.exists(os.path.join(out_dir, OPENAI_BATCH_INPUT)):
+        return stats
+    client = batch_client(config["openai_key"])
+    submit_pending_batch(out_dir, checkpoint, client)
+    for entry in checkpoint.openai_batch["batches"]:
+        if entry["applied"]:
+            continue
+        batch = wait_for_batch(client, entry["id"], **wait_kwargs)
+        if batch.status not in BATCH_FINAL_STATUSES:
+            stats["batches_pending"] += 1
+            continue
+        results = batch_results(client, batch)
+        # Guardar los outlines completos en la caché del LLM, como en el modo interactivo
+        llm_cache = get_llm_cache()
+        if llm_cache and entry.get("path") and os.path.exists(entry["path"]):
+            with open(entry["path"], encoding="utf-8") as f:
+                for line in f:
+                    request = json.loads(line)
+                    text, _, status = results.get(request["custom_id"], (None, None, None))
+                    if text and status == "completed":
+                        llm_cache.set(request["body"], text)
+        records = checkpoint.records()
+        for record in records:
+            # Los miembros de un cluster reciben el outline pedido para su representante
+            key = custom_id((record.get("cluster") or {}).get("representative") or record["keyword"])
+            if key not in results or record.get("outline_source") == "openai_batch":
+                continue
+            text, error, status = results[key]
+            extras_md = record.pop("outline_extras_md", "")
+            if text:
+                record["outline_md"] = text + extras_md
+                record["outline_source"] = "openai_batch"
+                stats["outlines"] += 1
+                if status != "completed":
+                    record.setdefault("warnings", []).append(
+                        f"Outline con OpenAI (batch) con status {status}: puede estar incompleto.")
+            else:
+                record.setdefault("warnings", []).append(
+                    f"Outline con OpenAI (batch) falló ({error}). Se mantiene el outline heurístico.")
+                stats["failed"] += 1
+        checkpoint.rewrite_results(records)
+        entry["applied"] = True
+        entry["status"] = batch.status
+        checkpoint.save()
+    return stats
+
+
+def build_config(args: argparse.Namespace) -> Dict[str, Any]:
+    """Misma configuración que arma la barra lateral, a partir de argumentos y variables de entorno."""
+    openai_key = os.getenv("OPENAI_API_KEY", "")
+    return {
+        **DEFAULT_CONFIG,
+        "dfs_login": os.getenv("DATAFORSEO_LOGIN", ""),
+        "dfs_password": os.getenv("DATAFORSEO_PASSWORD", ""),
+        "openai_key": openai_key,
+        "openai_model": args.model,
+        "openai_temperature": DEFAULT_CONFIG["openai_temperature"],
+        "use_openai": args.openai and bool(openai_key),
+        "country_iso_code": args.country,
+        "lang_iso_code": args.lang,
+        "language_code": args.language_code,
+        "location_name": COUNTRY_ISO_TO_NAME.get(args.country, "Argentina"),
+        "device": args.device,
+        "top_n": args.top_n,
+        "keyword_workers": args.workers,
+        "force_regenerate": args.force_regenerate,
+        "cluster_serps": args.cluster,
+    }
+
+
+def run_batch(keywords: List[str], config: Dict[str, Any], out_dir: str, *,
+              parquet: bool = False, retry_failed: bool = True, openai_batch: bool = False,
+              batch_wait: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Procesa los keywords pendientes escribiendo cada resultado apenas termina.
+
+    Con `openai_batch` el pipeline usa el outline heurístico y los outlines de OpenAI
+    se piden al final por la Batch API (`batch_wait` se pasa a wait_for_batch).
+    Devuelve estadísticas de la corrida (throughput, errores, uso de cachés y API).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    dataset_dir = os.path.join(out_dir, DATASET_DIR)
+    store = ResultsStore() if parquet else None
+    checkpoint = Checkpoint(out_dir)
+    pending = checkpoint.pending(keywords, retry_failed=retry_failed)
+    logger.info(f"{len(keywords)} keywords, {len(keywords) - len(pending)} ya procesados, "
+                f"{len(pending)} pendientes")
+
+    stats: Dict[str, Any] = {"keywords": len(keywords), "skipped": len(keywords) - len(pending),
+                             "processed": 0, "errors": 0, "urls_scraped": 0, "scrape_errors": 0}
+    stage_totals: Dict[str, float] = {}
+    started = time.perf_counter()
+    registry = scrape_registry(config)
+    ngram_index = NgramIndex()
+    clusterer = SerpClusterer.from_config(config) if config.get("cluster_serps") else None
+    shared_outlines: Dict[str, str] = {}
+    llm_cache = get_llm_cache()
+    pipeline_config = dict(config, use_openai=False) if openai_batch else config
+    try:
+        with open(os.path.join(out_dir, RESULTS_FILE), "a", encoding="utf-8") as results_file:
+            for kw, result in run_keywords(pending, pipeline_config, registry=registry, ngram_index=ngram_index,
+                                           clusterer=clusterer):
+                record = result_record(result)
+                if openai_batch and not result.get("error"):
+                    extras_md = result["full_outline_md"][len(result["outline_md"]):]
+                    representative = (result.get("cluster") or {}).get("representative", kw)
+                    if representative != kw:
+                        # Comparte el pedido del representante (llega antes que sus miembros)
+                        cached = shared_outlines.get(representative)
+                    else:
+                        line = batch_line(kw, openai_outline_args(result, config))
+                        cached = llm_cache.get(line["body"], force=config.get("force_regenerate", False)) \
+                            if llm_cache else None
+                        if cached is None:
+                            # La petición va antes que el resultado: al retomar no se pierde ninguna
+                            with open(os.path.join(out_dir, OPENAI_BATCH_INPUT), "a", encoding="utf-8") as batch_file:
+                                batch_file.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+                        else:
+                            shared_outlines[kw] = cached
+                    if cached is not None:
+                        record.update(outline_md=cached + extras_md, outline_source="openai", llm_cache="hit")
+                    else:
+                        record["outline_extras_md"] = extras_md
+                results_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                results_file.flush()
+                os.fsync(results_file.fileno())
+                checkpoint.mark(kw, result.get("error"))
+
+                stats["processed"] += 1
+                stats["errors"] += bool(result.get("error"))
+                stats["urls_scraped"] += len(record["scraped"])
+                stats["scrape_errors"] += sum(1 for row in record["scraped"] if row.get("error"))
+                for stage, seconds in record["timings"].items():
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+                logger.info(f"[{stats['processed']}/{len(pending)}] {kw}: "
+                            f"{'ERROR ' + result['error'] if result.get('error') else 'ok'}")
+                if store is not None:
+                    store.add(result)
+                    if stats["processed"] % DATASET_FLUSH_EVERY == 0:
+                        store.write_dataset(dataset_dir, outlines=False)
+    finally:
+        # Lo que quedó sin volcar (también si la corrida se interrumpe con una excepción)
+        if store is not None:
+            store.write_dataset(dataset_dir, outlines=False)
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_s"] = round(elapsed, 2)
+    stats["keywords_per_min"] = round(stats["processed"] / elapsed * 60, 2) if elapsed else 0.0
+    stats["urls_per_s"] = round(stats["urls_scraped"] / elapsed, 2) if elapsed else 0.0
+    stats["avg_stage_s"] = {stage: round(total / stats["processed"], 3)
+                            for stage, total in stage_totals.items()} if stats["processed"] else {}
+    if openai_batch:
+        stats["openai_batch"] = apply_openai_batches(out_dir, checkpoint, config, **(batch_wait or {}))
+    if config.get("use_openai") and config.get("openai_key"):
+        stats["openai"] = get_dispatcher(config["openai_key"]).stats()
+    if store is not None:
+        # Outlines desde results.jsonl: incluye los de corridas anteriores y los del batch
+        records = {record["keyword"]: record for record in checkpoint.records()}
+        stats["dataset"] = dict(store.stats(), outlines=write_outlines(dataset_dir, outlines_table(records.values())),
+                                path=dataset_dir)
+    stats["scrape_registry"] = registry.stats()
+    stats["ngram_index"] = ngram_index.stats()
+    if clusterer is not None and clusterer.stats()["keywords"]:
+        clusters = clusterer.clusters()["clusters"]
+        with open(os.path.join(out_dir, CLUSTERS_FILE), "w", encoding="utf-8") as f:
+            json.dump(clusters, f, ensure_ascii=False, indent=2)
+        stats["clusters"] = dict(clusterer.stats(), clusters=len(clusters),
+                                 shared=sum(c["size"] - 1 for c in clusters))
+    stats["ngrams_top"] = dict(ngram_index.top(None, 30, fields=OUTLINE_NGRAM_FIELDS))
+    stats["serp_cache"] = serp_cache().stats()
+    page_cache = get_page_cache()
+    if page_cache:
+        stats["page_cache"] = page_cache.stats()
+    if config["dfs_login"]:
+        stats["dataforseo"] = get_client(config["dfs_login"], config["dfs_password"]).stats()
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Genera outlines para una lista de keywords sin la UI de Streamlit.")
+    parser.add_argument("input", help="Archivo de keywords (.csv, .jsonl o .txt, uno por línea)")
+    parser.add_argument("--out", required=True, help="Directorio de salida (se reutiliza para retomar)")
+    parser.add_argument("--column", default="keyword", help="Columna/campo del keyword en CSV o JSONL")
+    parser.add_argument("--country", default=DEFAULT_CONFIG["country_iso_code"])
+    parser.add_argument("--lang", default=DEFAULT_CONFIG["lang_iso_code"])
+    parser.add_argument("--language-code", default=DEFAULT_CONFIG["language_code"])
+    parser.add_argument("--device", default=DEFAULT_CONFIG["device"], choices=["desktop", "mobile"])
+    parser.add_argument("--top-n", type=int, default=DEFAULT_CONFIG["top_n"])
+    parser.add_argument("--workers", type=int, default=DEFAULT_CONFIG["keyword_workers"],
+                        help="Keywords procesados en paralelo")
+    parser.add_argument("--openai", action="store_true", help="Generar el outline con OpenAI (requiere OPENAI_API_KEY)")
+    parser.add_argument("--openai-batch", action="store_true",
+                        help="Generar los outlines con la Batch API de OpenAI (más barata, hasta 24 h)")
+    parser.add_argument("--batch-timeout", type=float, default=26 * 3600,
+                        help="Segundos a esperar el batch; 0 = enviarlo y retomarlo en otra corrida")
+    parser.add_argument("--force-regenerate", action="store_true",
+                        help="Ignorar la caché del LLM y pedir outlines nuevos")
+    parser.add_argument("--model", default=os.getenv("OPENAI_MODEL", DEFAULT_CONFIG["openai_model"]))
+    parser.add_argument("--parquet", action="store_true", help="Exportar también el dataset Parquet (páginas, SERP y outlines) en <out>/dataset")
+    parser.add_argument("--skip-failed", action="store_true", help="No reintentar keywords que fallaron antes")
+    parser.add_argument("--limit", type=int, help="Procesar como máximo N keywords del archivo")
+    parser.add_argument("--expand", type=int, default=0, metavar="DEPTH",
+                        help="Expandir los keywords (autocompletado, relacionadas, PAA) antes de analizarlos")
+    parser.add_argument("--cluster", action="store_true",
+                        help="Un solo outline por grupo de keywords con SERP parecida")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config = build_config(args)
+    if not (config["dfs_login"] and config["dfs_password"]):
+        parser.error("Faltan DATAFORSEO_LOGIN / DATAFORSEO_PASSWORD en el entorno")
+    if args.openai and not config["use_openai"]:
+        logger.warning("--openai sin OPENAI_API_KEY: se usará el outline heurístico")
+    if args.openai_batch and not config["openai_key"]:
+        parser.error("--openai-batch requiere OPENAI_API_KEY")
+
+    keywords = read_keywords(args.input, args.column)[:args.limit]
+    if args.expand:
+        keywords = expand_keywords(keywords, config, max_depth=args.expand)
+        logger.info(f"Keywords tras la expansión: {len(keywords)}")
+    stats = run_batch(keywords, config, args.out, parquet=args.parquet,
+                      retry_failed=not args.skip_failed, openai_batch=args.openai_batch,
+                      batch_wait={"timeout": args.batch_timeout})
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# bench_boilerplate.py
+# Benchmark de la limpieza de boilerplate del motor BeautifulSoup: strip_boilerplate
+# (un solo recorrido del árbol) contra los pases sucesivos anteriores (etiquetas,
+# comentarios y dos find_all por cada patrón de clase/id). Verifica que parse_article
+# dé la misma salida con ambas versiones. Usa las mismas páginas que bench_extract.py.
+#
+# Uso:
+#   python bench_boilerplate.py --pages 200
+#   python bench_boilerplate.py --html-dir paginas_guardadas/
+
+import argparse
+import logging
+import re
+import sys
+import time
+from typing import List, Optional
+from unittest import mock
+
+from bs4 import BeautifulSoup, Comment
+
+import scraper
+from bench_extract import load_pages, synthetic_pages
+from scraper import UNWANTED_PATTERNS, UNWANTED_TAGS, strip_boilerplate
+
+
+def multipass_strip_boilerplate(soup: BeautifulSoup) -> None:
+    """Limpieza anterior, como referencia (~32 recorridos del árbol por página)."""
+    for element in soup(list(UNWANTED_TAGS)):
+        element.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    for pattern in UNWANTED_PATTERNS:
+        for element in soup.find_all(attrs={"class": re.compile(pattern, re.I)}):
+            element.decompose()
+        for element in soup.find_all(attrs={"id": re.compile(pattern, re.I)}):
+            element.decompose()
+
+
+def time_strip(bodies: List[bytes], strip) -> float:
+    """Segundos de limpieza (sin contar el parseo) sobre todas las páginas."""
+    total = 0.0
+    for body in bodies:
+        soup = BeautifulSoup(body, "lxml")
+        started = time.perf_counter()
+        strip(soup)
+        total += time.perf_counter() - started
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara strip_boilerplate con la limpieza por pases.")
+    parser.add_argument("--pages", type=int, default=200, help="Páginas sintéticas a generar")
+    parser.add_argument("--html-dir", help="Usar páginas HTML guardadas en este directorio")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    pages = load_pages(args.html_dir) if args.html_dir else synthetic_pages(args.pages)
+    if not pages:
+        parser.error("no hay páginas para comparar")
+    bodies = [body for _, body, _ in pages]
+
+    def parse_all(strip):
+        with mock.patch.object(scraper, "strip_boilerplate", strip):
+            started = time.perf_counter()
+            results = [scraper.parse_article(f"https://example.com/{name}", body, engine="bs4",
+                                             content_type=content_type)
+                       for name, body, content_type in pages]
+            return time.perf_counter() - started, results
+
+    old_parse_s, old_results = parse_all(multipass_strip_boilerplate)
+    new_parse_s, new_results = parse_all(strip_boilerplate)
+    old_strip_s = time_strip(bodies, multipass_strip_boilerplate)
+    new_strip_s = time_strip(bodies, strip_boilerplate)
+
+    different = [name for (name, _, _), a, b in zip(pages, old_results, new_results) if a != b]
+    print(f"{len(pages)} páginas ({'de ' + args.html_dir if args.html_dir else 'sintéticas'})")
+    print(f"  limpieza      {old_strip_s * 1000 / len(pages):8.2f} -> {new_strip_s * 1000 / len(pages):8.2f} ms/página")
+    print(f"  parse_article {old_parse_s:8.2f} -> {new_parse_s:8.2f} s en total")
+    if different:
+        print(f"  salida distinta en {len(different)} páginas (ej. {different[0]})")
+        return 1
+    print("  misma salida de parse_article en todas las páginas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# bench_extract.py
+# Compara los dos motores de extracción de scraper.parse_article (BeautifulSoup y
+# lxml) sobre un corpus de páginas HTML: tiempo por página y diferencias campo por
+# campo. Sin --html-dir se usan páginas sintéticas con el ruido típico de un sitio
+# real (menús, sidebars, ads, comentarios HTML, <script>/<style> dentro de títulos
+# y headings, tablas, listas, entidades y charsets distintos).
+#
+# Uso:
+#   python bench_extract.py --pages 400
+#   python bench_extract.py --html-dir paginas_guardadas/
+
+import argparse
+import glob
+import logging
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import scraper
+
+_WORDS = ("seguro auto casa precio cuotas opiniones mejor plan hogar viaje salud tarjeta crédito "
+          "banco cuenta online gratis envío oferta descuento modelo marca servicio guía pasos "
+          "receta pan harina horno tiempo ciudad barrio local sucursal horario atención").split()
+_INLINE_NOISE = ("<script>var a = 1;</script>", "<style>.a{color:red}</style>", "<noscript>sin JS</noscript>",
+                 "<template><b>plantilla</b></template>", "<!-- comentario -->", "<span> extra </span>",
+                 "<em>énfasis</em>", " &amp; ", "&nbsp;")
+_BOILERPLATE = ('<nav><a href="/">Inicio</a> <a href="/b">Blog</a></nav>',
+                '<div class="sidebar-widget"><h3>Populares</h3><p>Otras notas del sitio</p></div>',
+                '<div id="ad-slot-1"><p>Publicidad</p></div>',
+                '<div class="share-buttons"><button>Compartir</button></div>',
+                '<aside><h2>Relacionados</h2><ul><li>Nota uno</li></ul></aside>',
+                '<form><input name="q"><button>Buscar</button></form>',
+                '<iframe src="https://video.example/embed"></iframe>')
+
+
+def synthetic_pages(count: int, seed: int = 10) -> List[Tuple[str, bytes, str]]:
+    """Páginas de prueba: [(nombre, cuerpo en bytes, Content-Type)]."""
+    rng = random.Random(seed)
+
+    def words(n: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+    def noisy(text: str) -> str:
+        parts = text.split(" ")
+        for _ in range(rng.randint(0, 2)):
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(_INLINE_NOISE))
+        return " ".join(parts)
+
+    pages = []
+    for i in range(count):
+        charset = rng.choice(["utf-8", "utf-8", "windows-1252"])
+        head = f'<meta charset="{charset}"><title>{noisy(words(6).capitalize())}</title>'
+        if rng.random() < 0.3:
+            head += "<script>window.dataLayer = [];</script><style>body{margin:0}</style>"
+        sections = []
+        for _ in range(rng.randint(2, 6)):
+            section = [f"<h2>{noisy(words(4).capitalize())}</h2>"]
+            for _ in range(rng.randint(1, 4)):
+                section.append(f"<p>{noisy(words(rng.randint(10, 60)))}</p>")
+            if rng.random() < 0.5:
+                section.append(f"<h3>{noisy(words(3).capitalize())}</h3><p>{words(30)}</p>")
+            if rng.random() < 0.3:
+                section.append("<ul>" + "".join(f"<li>{words(5)}</li>" for _ in range(4)) + "</ul>")
+            if rng.random() < 0.2:
+                section.append("<table><tr><th>Plan</th><th>Precio</th></tr>"
+                               f"<tr><td>{words(2)}</td><td>$ {rng.randint(10, 999)}</td></tr></table>")
+            if rng.random() < 0.3:
+                section.append(rng.choice(_BOILERPLATE))
+            sections.append("<section>" + "".join(section) + "</section>")
+        content = "".join(sections)
+        wrapper = rng.choice(["<article>{}</article>", '<main role="main">{}</main>',
+                              '<div class="post-content">{}</div>', "<div>{}</div>"])
+        body = ("<header><h1>Sitio de prueba</h1></header>" + "".join(rng.sample(_BOILERPLATE, 2))
+                + f"<h1>{words(5).capitalize()}</h1>" + wrapper.format(content)
+                + '<div class="comments"><h3>Comentarios</h3><p>Muy buena nota</p></div>'
+                + "<footer><p>© Sitio</p></footer>")
+        html = f"<!DOCTYPE html><html><head>{head}</head><body>{body}</body></html>"
+        pages.append((f"sintetica-{i:04d}.html", html.encode(charset, "replace"), f"text/html; charset={charset}"))
+    return pages
+
+
+def load_pages(html_dir: str) -> List[Tuple[str, bytes, Optional[str]]]:
+    """Páginas guardadas en disco (*.html, recursivo); el charset lo detecta cada motor."""
+    paths = sorted(glob.glob(os.path.join(html_dir, "**", "*.htm*"), recursive=True))
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append((os.path.relpath(path, html_dir), f.read(), None))
+    return pages
+
+
+def extract_all(pages: List[Tuple[str, bytes, Optional[str]]], engine: str) -> Tuple[float, List[Dict[str, Any]]]:
+    started = time.perf_counter()
+    results = [scraper.parse_article(f"https://example.com/{name}", body, engine=engine, content_type=content_type)
+               for name, body, content_type in pages]
+    return time.perf_counter() - started, results
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return re.sub(r"\s+", "", value)
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def compare(names: List[str], left: List[Dict[str, Any]], right: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Páginas cuyo resultado difiere, por campo (sin contar espacios en blanco ni len_words)."""
+    diffs: Dict[str, List[str]] = {}
+    for name, a, b in zip(names, left, right):
+        for field in a:
+            if field != "len_words" and _normalize(a[field]) != _normalize(b.get(field)):
+                diffs.setdefault(field, []).append(name)
+    return diffs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara los motores bs4 y lxml de parse_article.")
+    parser.add_argument("--pages", type=int, default=400, help="Páginas sintéticas a generar")
+    parser.add_argument("--html-dir", help="Usar páginas HTML guardadas en este directorio")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    pages = load_pages(args.html_dir) if args.html_dir else synthetic_pages(args.pages)
+    if not pages:
+        parser.error("no hay páginas para comparar")
+    names = [name for name, _, _ in pages]
+    bs4_s, bs4_results = extract_all(pages, "bs4")
+    lxml_s, lxml_results = extract_all(pages, "lxml")
+
+    diffs = compare(names, bs4_results, lxml_results)
+    word_diff = max(abs(a["len_words"] - b["len_words"]) / max(1, a["len_words"])
+                    for a, b in zip(bs4_results, lxml_results))
+    print(f"{len(pages)} páginas ({'de ' + args.html_dir if args.html_dir else 'sintéticas'})")
+    for name, seconds in (("bs4", bs4_s), ("lxml", lxml_s)):
+        print(f"  {name:<5} {seconds * 1000 / len(pages):8.1f} ms/página")
+    print(f"  diferencia máxima de len_words: {word_diff:.1%}")
+    if diffs:
+        for field, where in diffs.items():
+            print(f"  {field}: difiere en {len(where)} páginas (ej. {where[0]})")
+        return 1
+    print("  misma salida en todas las páginas (sin contar espacios en blanco)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
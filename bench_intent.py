@@ -0,0 +1,89 @@
+# bench_intent.py
+# Benchmark del clasificador de intent: guess_intent_batch (una pasada Aho-Corasick +
+# matrices) contra llamar a guess_intent keyword por keyword y contra la versión
+# anterior por substrings, sobre SERP sintéticas con títulos/snippets/PAA realistas.
+#
+# Uso:
+#   python bench_intent.py --serps 10000
+
+import argparse
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import analytics
+from analytics import INTENT_CUES, guess_intent, guess_intent_batch
+
+_WORDS = ("seguro auto casa precio cuotas opiniones mejor plan hogar viaje salud tarjeta crédito "
+          "banco cuenta online gratis envío oferta descuento modelo marca servicio guía pasos "
+          "receta pan harina horno tiempo ciudad barrio local sucursal horario atención").split()
+_FEATURES = ("videos", "top_stories", "shopping", "local_pack", "ai_overview", "knowledge_graph")
+
+
+def substring_guess_intent(serp_snippets: List[Dict[str, Any]], paa: List[str]) -> Tuple[str, Dict[str, float]]:
+    """Clasificador anterior (substrings sin bordes de palabra, sin features), como referencia."""
+    text = " ".join([(x.get("title") or "") + " " + (x.get("snippet") or "")
+                     for x in serp_snippets]).lower()
+    text += " " + " ".join(paa).lower()
+    scores = {}
+    for label, (weight, cues) in INTENT_CUES.items():
+        scores[label] = weight if any(cue in text for cue in cues) else 0.0
+    label = max(scores, key=scores.get)
+    total = sum(scores.values()) or 1.0
+    return label, {k: v / total for k, v in scores.items()}
+
+
+def synthetic_serps(count: int, top_n: int = 10, seed: int = 7) -> List[Dict[str, Any]]:
+    """SERP de prueba: top_n orgánicos con título y snippet, PAA y un mix de features."""
+    rng = random.Random(seed)
+    cues = [cue for _, phrases in INTENT_CUES.values() for cue in phrases]
+
+    def sentence(words: int) -> str:
+        tokens = [rng.choice(_WORDS) for _ in range(words)]
+        for _ in range(rng.randint(0, 2)):
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(cues))
+        return " ".join(tokens).capitalize()
+
+    serps = []
+    for _ in range(count):
+        serp = {
+            "organic": [{"title": sentence(8), "snippet": sentence(25)} for _ in range(top_n)],
+            "paa": [sentence(6) + "?" for _ in range(rng.randint(0, 4))],
+        }
+        for name in _FEATURES:
+            serp[name] = [{}] if rng.random() < 0.2 else []
+        serps.append(serp)
+    return serps
+
+
+def _timed(fn) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara guess_intent_batch con la clasificación keyword por keyword.")
+    parser.add_argument("--serps", type=int, default=10000)
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    serps = synthetic_serps(args.serps, args.top_n)
+    substring_s, substring = _timed(lambda: [substring_guess_intent(s["organic"], s["paa"]) for s in serps])
+    single_s, single = _timed(lambda: [guess_intent(s["organic"], s["paa"], s) for s in serps])
+    batch_s, batch = _timed(lambda: guess_intent_batch(serps))
+
+    assert [label for label, _ in single] == [label for label, _ in batch]
+    agreement = sum(a[0] == b[0] for a, b in zip(substring, batch)) / len(serps)
+    matcher = "Aho-Corasick (pyahocorasick)" if analytics.ahocorasick else "str.find (sin pyahocorasick)"
+    print(f"{len(serps)} SERP (top {args.top_n}), búsqueda de frases: {matcher}")
+    for name, seconds in (("substrings (anterior)", substring_s), ("guess_intent x N", single_s),
+                          ("guess_intent_batch", batch_s)):
+        print(f"  {name:<22} {seconds:7.3f}s  {len(serps) / seconds:10.0f} SERP/s")
+    print(f"  mismo label que la versión anterior: {agreement:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# bench_serp_decode.py
+# Memoria y tiempo de decodificar una respuesta live/advanced de DataForSEO: json.loads
+# del cuerpo completo contra decode_serp_stream (ijson, descarta los tipos de item que
+# parse_serp_features no usa). Las respuestas son sintéticas: `--organic` resultados
+# orgánicos más items de tipos no consumidos (ads, shopping de otro formato, etc.)
+# hasta llegar a cada tamaño de `--sizes`.
+#
+# Uso:
+#   python bench_serp_decode.py --sizes 300 1300
+
+import argparse
+import io
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import dataforseo_api
+from dataforseo_api import decode_serp_stream, parse_serp_features
+
+_UNUSED_TYPES = ("paid", "featured_snippet", "hotels_pack", "jobs", "scholarly_articles", "recipes")
+
+
+def synthetic_response(target_kb: int, organic: int = 80) -> bytes:
+    """Cuerpo JSON de live/advanced de ~`target_kb` KB con `organic` resultados orgánicos."""
+    items: List[Dict[str, Any]] = [
+        {"type": "organic", "rank_group": i + 1, "rank_absolute": i + 1, "domain": f"sitio{i}.com",
+         "title": f"Resultado orgánico {i + 1}", "url": f"https://sitio{i}.com/nota-{i}",
+         "description": "Descripción del resultado " * 6, "breadcrumb": f"https://sitio{i}.com › nota",
+         "links": None, "faq": None, "rating": None}
+        for i in range(organic)]
+    items.append({"type": "people_also_ask", "items": [{"type": "people_also_ask_element", "title": f"Pregunta {i}"}
+                                                         for i in range(4)]})
+    items.append({"type": "related_searches", "items": [f"búsqueda relacionada {i}" for i in range(8)]})
+
+    def body() -> bytes:
+        return json.dumps({"status_code": 20000, "tasks": [{"id": "t1", "status_code": 20000, "data": {"keyword": "kw"},
+                                                             "result": [{"keyword": "kw", "items": items}]}]}).encode()
+
+    i = 0
+    while len(body()) < target_kb * 1024:
+        # Items no consumidos por parse_serp_features, de ~2 KB
+        items.insert(len(items) // 2, {"type": _UNUSED_TYPES[i % len(_UNUSED_TYPES)], "rank_group": i,
+                                       "title": f"Bloque {i}", "description": "x" * 1500,
+                                       "items": [{"title": f"sub {j}", "url": f"https://e{j}.com"} for j in range(10)]})
+        i += 1
+    return body()
+
+
+def _load_json(stream) -> Dict[str, Any]:
+    return json.loads(stream.read().decode())
+
+
+def measure(decoder: Callable, body: bytes, repeat: int = 5) -> Tuple[float, float, Dict[str, Any]]:
+    """(pico de memoria en MB, segundos por decodificación, features) de decoder + parse_serp_features."""
+    tracemalloc.start()
+    features = parse_serp_features(decoder(io.BytesIO(body)))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse_serp_features(decoder(io.BytesIO(body)))
+    return peak / 1e6, (time.perf_counter() - started) / repeat, features
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara json.loads con decode_serp_stream sobre respuestas SERP.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1300], help="Tamaños del cuerpo en KB")
+    parser.add_argument("--organic", type=int, default=80)
+    args = parser.parse_args(argv)
+
+    if dataforseo_api.ijson is None:
+        print("ijson no instalado: decode_serp_stream usa json.load + filtrado")
+    for size in args.sizes:
+        body = synthetic_response(size, args.organic)
+        full_mb, full_s, full = measure(_load_json, body)
+        stream_mb, stream_s, streamed = measure(decode_serp_stream, body)
+        assert streamed == full, "parse_serp_features da otro resultado"
+        print(f"cuerpo {len(body) / 1024:7.0f} KB  pico {full_mb:5.2f} MB -> {stream_mb:5.2f} MB  "
+              f"tiempo {full_s * 1000:6.1f} ms -> {stream_s * 1000:6.1f} ms  (misma salida)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
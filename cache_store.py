@@ -0,0 +1,177 @@
+# cache_store.py
+# Caché persistente clave → JSON sobre SQLite, compartible entre procesos/réplicas
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_last_access ON cache(last_access);
+"""
+
+
+class SQLiteCache:
+    """Caché en disco de valores JSON (comprimidos con zlib) con TTL y desalojo LRU.
+
+    Varios procesos pueden abrir el mismo archivo (ej. un volumen compartido entre
+    réplicas de Streamlit). Cuando el tamaño total supera `max_bytes` se eliminan
+    primero las entradas usadas hace más tiempo. `stats()` devuelve hits/misses.
+
+    El tamaño total se lleva en memoria (se lee una vez al abrir y se actualiza en
+    cada alta/baja de este proceso). Para contar también lo que escriben otros
+    procesos se recalcula con SUM al pasar el límite y, como mucho, una vez cada
+    `RESYNC_SECONDS`.
+    """
+
+    RESYNC_SECONDS = 60
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._total = self._stored_size()
+        self._synced_at = time.monotonic()
+
+    def _stored_size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def _delete_key(self, key: str):
+        row = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._total -= row[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve el valor guardado o None si no existe o venció."""
+        return self._get(key, raw=False)
+
+    def _get(self, key: str, raw: bool):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._delete_key(key)
+                self._stats["misses"] += 1
+                self._stats["expired"] += 1
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._stats["hits"] += 1
+        data = zlib.decompress(value)
+        return data if raw else json.loads(data)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Como get() pero para valores guardados con set_bytes()."""
+        return self._get(key, raw=True)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Guarda `value` (serializable a JSON); `ttl` en segundos, None = sin vencimiento."""
+        self._set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"), ttl)
+
+    def set_bytes(self, key: str, value: bytes, ttl: Optional[float] = None):
+        """Guarda bytes sin pasar por JSON (ej. cuerpos HTML)."""
+        self._set(key, value, ttl)
+
+    def _set(self, key: str, data: bytes, ttl: Optional[float]):
+        blob = zlib.compress(data)
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, blob, len(blob), now, expires_at, now))
+            self._total += len(blob) - (replaced[0] if replaced else 0)
+            self._stats["writes"] += 1
+            if time.monotonic() - self._synced_at > self.RESYNC_SECONDS:
+                self._total = self._stored_size()
+                self._synced_at = time.monotonic()
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def touch(self, key: str, ttl: Optional[float] = None) -> bool:
+        """Renueva el vencimiento (y el uso para LRU) de una entrada sin reescribirla."""
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE cache SET expires_at = ?, last_access = ? WHERE key = ?", (expires_at, now, key))
+        return cursor.rowcount > 0
+
+    def delete(self, key: str):
+        with self._lock:
+            self._delete_key(key)
+
+    def _evict(self):
+        # Otros procesos pueden haber escrito o desalojado: se resincroniza el total
+        self._total = self._stored_size()
+        self._synced_at = time.monotonic()
+        if self._total <= self.max_bytes:
+            return
+        self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                           (time.time(),))
+        total = self._stored_size()
+        # Desalojar por LRU hasta bajar al 90% del límite para no hacerlo en cada escritura
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM cache ORDER BY last_access").fetchall()
+        removed = []
+        for key, size in rows:
+            if total <= target:
+                break
+            removed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", removed)
+        self._total = total
+        self._stats["evictions"] += len(removed)
+        logger.info(f"Caché {self.path}: {len(removed)} entradas desalojadas (LRU)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso de este proceso más el tamaño actual en disco."""
+        with self._lock:
+            stats = dict(self._stats)
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = entries
+        stats["size_bytes"] = size
+        return stats
+
+
+_caches: Dict[str, SQLiteCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path: str, max_bytes: int = 512 * 1024 * 1024) -> SQLiteCache:
+    """Devuelve la instancia compartida (por proceso) de la caché en `path`."""
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = SQLiteCache(path, max_bytes)
+        return cache
@@ -43,11 +43,74 @@ DEFAULT_CONFIG = {
     "device": "desktop",
     "top_n": 5,
     "safe": "off",
-    "pause": 0.8,
+    "pause": 0.8,  # Pausa mínima entre peticiones al mismo dominio
+    "max_workers": 6,  # Hilos de scraping concurrente
+    "keyword_workers": 4,  # Keywords procesados en paralelo
+    "serp_concurrency": 4,  # Keywords consultando DataForSEO a la vez
+    "scrape_concurrency": 3,  # Keywords scrapeando a la vez
+    "llm_concurrency": 2,  # Keywords esperando al LLM a la vez
+    "cluster_serps": False,  # Un outline por grupo de keywords con SERP parecidas
     "openai_model": "gpt-5-nano",
     "openai_temperature": 0.4,
 }
 
+# Caché persistente (SQLite) de respuestas SERP y autocompletado.
+# Apuntar SERP_CACHE_PATH a un volumen compartido para reutilizarla entre réplicas.
+SERP_CACHE_CONFIG = {
+    "path": os.getenv("SERP_CACHE_PATH", os.path.join(".cache", "serp_cache.sqlite3")),
+    "max_bytes": int(os.getenv("SERP_CACHE_MAX_MB", "512")) * 1024 * 1024,
+    "ttl_top_stories": 2 * 3600,  # SERP con noticias: cambia rápido
+    "ttl_evergreen": 7 * 24 * 3600,  # SERP sin noticias
+    "ttl_autocomplete": 24 * 3600,
+}
+
+# Scraping de páginas de competidores
+SCRAPER_CONFIG = {
+    "engine": os.getenv("SCRAPER_ENGINE", "lxml"),  # "lxml" (bytes → lxml.html) o "bs4" (BeautifulSoup)
+    "max_bytes": int(float(os.getenv("SCRAPER_MAX_MB", "2")) * 1024 * 1024),  # Se trunca al superar
+    "chunk_size": 64 * 1024,
+    # Procesos para parsear HTML en paralelo a la descarga (0 = parsear en los hilos de scraping).
+    # Por defecto deja un núcleo libre para el proceso principal.
+    "parse_processes": int(os.getenv("SCRAPER_PARSE_PROCESSES", str(min(4, (os.cpu_count() or 1) - 1)))),
+    # Tipos de contenido que se descargan; el resto (PDF, video, imágenes...) se omite
+    "allowed_content_types": ("text/html", "application/xhtml+xml"),
+}
+
+# Caché persistente de páginas scrapeadas (revalidada con ETag / Last-Modified)
+PAGE_CACHE_CONFIG = {
+    "enabled": os.getenv("PAGE_CACHE_ENABLED", "1") != "0",
+    "path": os.getenv("PAGE_CACHE_PATH", os.path.join(".cache", "page_cache.sqlite3")),
+    "max_bytes": int(os.getenv("PAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+    "ttl": 30 * 24 * 3600,  # Sin uso durante un mes: se descarta
+}
+
+# Caché persistente de respuestas del LLM (outlines/artículos), por hash del pedido completo
+LLM_CACHE_CONFIG = {
+    "enabled": os.getenv("LLM_CACHE_ENABLED", "1") != "0",
+    "path": os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3")),
+    "max_bytes": int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    "ttl": 30 * 24 * 3600,
+}
+
+# Límites del despachador de llamadas a OpenAI (compartido por todo el proceso).
+# Ajustar a los límites de la cuenta / tier: requests y tokens por minuto.
+LLM_DISPATCH_CONFIG = {
+    "rpm": float(os.getenv("OPENAI_RPM", "500")),
+    "tpm": float(os.getenv("OPENAI_TPM", "200000")),
+    "max_concurrency": int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+    "max_retries": int(os.getenv("OPENAI_MAX_RETRIES", "5")),
+    "expected_output_tokens": 2000,  # Para estimar tokens de un pedido antes de enviarlo
+}
+
+# Agrupación de keywords con SERP parecidas (comparten outline). Jaccard de las top
+# URLs orgánicas: con top 10, 0.5 ≈ 7 URLs en común.
+SERP_CLUSTER_CONFIG = {
+    "threshold": float(os.getenv("SERP_CLUSTER_THRESHOLD", "0.5")),
+    "top_n": int(os.getenv("SERP_CLUSTER_TOP_N", "10")),
+    "num_perm": 128,  # Permutaciones MinHash
+    "bands": 32,  # Bandas LSH (4 filas c/u → umbral de candidatos ≈ 0.42)
+}
+
 # Modelos de OpenAI que NO soportan temperature
 OPENAI_NO_TEMPERATURE_MODELS = [
     "o1", "o1-preview", "o1-mini",
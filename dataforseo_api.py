@@ -1,63 +1,438 @@
 # dataforseo_api.py
 # Cliente para interactuar con las APIs de DataForSEO
 
-import requests, json
+import requests, json, os, re
+import hashlib
 import logging
-from typing import List, Dict, Any
-import streamlit as st
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
 from dfs_client import RestClient
+from cache_store import get_cache
+from config import SERP_CACHE_CONFIG
+
+try:
+    import ijson
+except Exception:
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+# Feature de parse_serp_features → tipos de item de DataForSEO que la alimentan. Es la
+# única fuente: el filtro de decode_serp_stream y las ramas del parser salen de acá.
+SERP_FEATURE_TYPES = {
+    "organic": ("organic",),
+    "paa": ("people_also_ask",),
+    "videos": ("video", "video_carousel"),
+    "ai_overview": ("ai_overview", "generative_overview", "ai_overview_box"),
+    "related_searches": ("related_searches",),
+    "images": ("images",),
+    "top_stories": ("top_stories",),
+    "twitter": ("twitter",),
+    "carousel": ("carousel",),
+    "knowledge_graph": ("knowledge_graph",),
+    "shopping": ("shopping", "popular_products", "commercial_units"),
+    "local_pack": ("local_pack", "map"),
+}
+SERP_FEATURE_OF_TYPE = {tpe: feature for feature, types in SERP_FEATURE_TYPES.items() for tpe in types}
+# Tipos de item que consume parse_serp_features; el resto se descarta al decodificar
+SERP_ITEM_TYPES = frozenset(SERP_FEATURE_OF_TYPE)
+# Las SERP se cachean ya filtradas: si cambian los tipos, la clave cambia y se vuelven a pedir
+_SERP_CACHE_KIND = "serp-" + hashlib.sha1(",".join(sorted(SERP_ITEM_TYPES)).encode("utf-8")).hexdigest()[:8]
+_SERP_ITEM_PREFIX = "tasks.item.result.item.items.item"
+
+SERP_LIVE_ENDPOINT = "/v3/serp/google/organic/live/advanced"
+SERP_TASK_POST_ENDPOINT = "/v3/serp/google/organic/task_post"
+SERP_TASKS_READY_ENDPOINT = "/v3/serp/google/organic/tasks_ready"
+SERP_TASK_GET_ENDPOINT = "/v3/serp/google/organic/task_get/advanced/{}"
+MAX_TASKS_PER_POST = 100
+
+AUTOCOMPLETE_URL = "https://suggestqueries.google.com/complete/search"
+
+# Clientes compartidos por credenciales para reutilizar conexiones keep-alive
+_clients: Dict[tuple, RestClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(login: str, password: str) -> RestClient:
+    """Devuelve el RestClient (con pool de conexiones) compartido para estas credenciales.
+
+    DATAFORSEO_BASE_URL permite redirigir las llamadas a un servidor local de pruebas.
+    """
+    with _clients_lock:
+        client = _clients.get((login, password))
+        if client is None:
+            client = _clients[(login, password)] = RestClient(
+                login, password, base_url=os.getenv("DATAFORSEO_BASE_URL") or None)
+        return client
+
+
+_autocomplete_session: Optional[requests.Session] = None
+
+
+def autocomplete_session() -> requests.Session:
+    """Sesión HTTP compartida (keep-alive) para Google Autocomplete.
+
+    AUTOCOMPLETE_BASE_URL permite redirigir las llamadas a un servidor local de pruebas.
+    """
+    global _autocomplete_session
+    with _clients_lock:
+        if _autocomplete_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _autocomplete_session = session
+        return _autocomplete_session
+
+
+def serp_cache():
+    """Caché persistente compartida de respuestas SERP y autocompletado."""
+    return get_cache(SERP_CACHE_CONFIG["path"], SERP_CACHE_CONFIG["max_bytes"])
+
+
+def _cache_key(kind: str, query: str, *params: str) -> str:
+    """Clave normalizada: keyword en minúsculas y sin espacios repetidos + parámetros."""
+    normalized = [re.sub(r"\s+", " ", query).strip().lower()]
+    normalized += [(p or "").strip().lower() for p in params]
+    digest = hashlib.sha1("\x1f".join(normalized).encode("utf-8")).hexdigest()
+    return f"{kind}:{digest}"
+
+
+def _serp_key(query: str, *, location_name: str, language_code: str, device: str, safe: str) -> str:
+    return _cache_key(_SERP_CACHE_KIND, query, location_name, language_code, device, safe)
+
+
+def _serp_ttl(js: Dict[str, Any]) -> float:
+    """TTL según la SERP: corto si hay top stories (noticias), largo si es evergreen."""
+    for task in js.get("tasks") or []:
+        for res in task.get("result") or []:
+            if any(it.get("type") == "top_stories" for it in res.get("items") or []):
+                return SERP_CACHE_CONFIG["ttl_top_stories"]
+    return SERP_CACHE_CONFIG["ttl_evergreen"]
+
+
+def _store_serp(key: str, js: Dict[str, Any]):
+    if is_task_ok(js):
+        serp_cache().set(key, js, ttl=_serp_ttl(js))
+
 
-@st.cache_data(show_spinner=False)
 def dfs_live_serp(query: str, *, login: str, password: str, location_name: str, 
                   language_code:str, device: str, safe: str) -> Dict[str, Any]:
     """Call DataForSEO Google Organic (live/advanced). Returns JSON.
     Docs: https://api.dataforseo.com/v3/serp/google/organic/live/advanced
     """
+    key = _serp_key(query, location_name=location_name, language_code=language_code,
+                    device=device, safe=safe)
+    cached = serp_cache().get(key)
+    if cached is not None:
+        logger.info(f"SERP desde caché para: '{query}'")
+        return cached
+
     logger.info(f"Consultando SERP para: '{query}', location: {location_name}, device: {device}")
-    client = RestClient(login, password)
+    client = get_client(login, password)
+    
+    payload = [_serp_task(query, location_name=location_name, language_code=language_code,
+                          device=device, safe=safe)]
     
-    payload = [{
+    try:
+        response = client.post(SERP_LIVE_ENDPOINT, payload, decoder=decode_serp_stream)
+        logger.info(f"Respuesta SERP recibida para '{query}': {type(response)}, bytes: {client.last_transfer()}")
+        _store_serp(key, response)
+        return response
+    except Exception as e:
+        logger.error(f"Error consultando SERP para '{query}': {str(e)}")
+        raise
+
+
+def decode_serp_stream(stream, item_types=SERP_ITEM_TYPES) -> Dict[str, Any]:
+    """Decodifica una respuesta SERP de forma incremental conservando solo los items útiles.
+
+    Con ijson se recorre el stream evento a evento y cada item de
+    tasks[].result[].items[] se arma por separado: si su `type` no está en
+    `item_types` se descarta sin materializarlo. Así nunca conviven en memoria el
+    cuerpo completo, el árbol completo y el árbol filtrado. Sin ijson se cae a
+    json.load + filtrado.
+    """
+    if ijson is None:
+        js = json.load(stream)
+        for task in js.get("tasks") or []:
+            for res in task.get("result") or []:
+                if res.get("items"):
+                    res["items"] = [it for it in res["items"] if it.get("type") in item_types]
+        return js
+
+    root = ijson.ObjectBuilder()
+    item = None  # Builder del item en curso
+    depth = 0
+    skipping = False
+    type_prefix = _SERP_ITEM_PREFIX + ".type"
+    for prefix, event, value in ijson.parse(stream, use_float=True, buf_size=16 * 1024):
+        if item is None and not skipping:
+            if prefix == _SERP_ITEM_PREFIX and event == "start_map":
+                item, depth = ijson.ObjectBuilder(), 0
+            else:
+                root.event(event, value)
+                continue
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        if skipping:
+            if depth == 0:
+                skipping = False
+            continue
+        item.event(event, value)
+        if depth == 1 and prefix == type_prefix and value not in item_types:
+            item, skipping = None, True
+        elif depth == 0:
+            if item.value.get("type") in item_types:
+                root.event("string", item.value)  # Agrega el item ya armado a la lista
+            item = None
+    return root.value
+
+
+def _serp_task(query: str, *, location_name: str, language_code: str, device: str, safe: str) -> Dict[str, Any]:
+    return {
         "keyword": query,
         "location_name": location_name,
         "language_code": language_code,
         "device": device,
         "safe": safe,
-    }]
-    
+    }
+
+
+def _split_tasks(js: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Separa una respuesta multi-task en respuestas de un solo task (mismo formato que dfs_live_serp)."""
+    envelope = {k: v for k, v in js.items() if k != "tasks"}
+    return [dict(envelope, tasks=[task], tasks_count=1) for task in js.get("tasks") or []]
+
+
+def _error_response(query: str, status_code: int, message: str) -> Dict[str, Any]:
+    """Respuesta sintética para un keyword fallido; parse_serp_features la trata como SERP vacía."""
+    return {
+        "status_code": status_code,
+        "status_message": message,
+        "tasks_count": 1,
+        "tasks_error": 1,
+        "tasks": [{"status_code": status_code, "status_message": message,
+                   "data": {"keyword": query}, "result": None}],
+    }
+
+
+def is_task_ok(js: Dict[str, Any]) -> bool:
+    """True si la respuesta (de un solo task) terminó con status 20000."""
+    tasks = js.get("tasks") or []
+    return bool(tasks) and all(t.get("status_code") == 20000 for t in tasks)
+
+
+def dfs_live_serp_batch(keywords: List[str], *, login: str, password: str, location_name: str,
+                        language_code: str, device: str, safe: str,
+                        chunk_size: int = MAX_TASKS_PER_POST, retries: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Consulta SERP para muchos keywords empaquetando hasta `chunk_size` tasks por POST.
+
+    Los chunks se envían en paralelo (hasta el tamaño del pool del cliente). Devuelve
+    {keyword: respuesta} donde cada respuesta tiene un único task y puede pasarse tal
+    cual a parse_serp_features. Los tasks fallidos se reintentan `retries` veces; si
+    siguen fallando se devuelve una respuesta de error (ver is_task_ok).
+    """
+    client = get_client(login, password)
+    results: Dict[str, Dict[str, Any]] = {}
+    keys = {q: _serp_key(q, location_name=location_name, language_code=language_code,
+                         device=device, safe=safe) for q in keywords if q}
+    pending = []
+    for q, key in keys.items():
+        cached = serp_cache().get(key)
+        if cached is not None:
+            results[q] = cached
+        else:
+            pending.append(q)
+    if results:
+        logger.info(f"Batch SERP: {len(results)} keywords desde caché")
+    chunk_size = max(1, min(chunk_size, MAX_TASKS_PER_POST))
+
+    def post_chunk(chunk: List[str]) -> List[Dict[str, Any]]:
+        payload = [_serp_task(q, location_name=location_name, language_code=language_code,
+                              device=device, safe=safe) for q in chunk]
+        try:
+            js = client.post(SERP_LIVE_ENDPOINT, payload, decoder=decode_serp_stream)
+        except Exception as e:
+            logger.error(f"Error en batch SERP de {len(chunk)} keywords: {str(e)}")
+            return [_error_response(q, 0, str(e)) for q in chunk]
+        responses = _split_tasks(js)
+        if len(responses) != len(chunk):
+            logger.warning(f"Batch SERP: {len(chunk)} tasks enviados, {len(responses)} recibidos")
+        by_keyword = {}
+        for resp in responses:
+            data = resp["tasks"][0].get("data") or {}
+            by_keyword.setdefault(data.get("keyword"), resp)
+        matched = []
+        for i, q in enumerate(chunk):
+            resp = by_keyword.get(q)
+            if resp is None and len(responses) == len(chunk):
+                resp = responses[i]  # Sin eco del keyword: los tasks vuelven en el orden enviado
+            matched.append(resp or _error_response(q, js.get("status_code", 0),
+                                                   js.get("status_message") or "task faltante en la respuesta"))
+        return matched
+
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        logger.info(f"Batch SERP (intento {attempt + 1}): {len(pending)} keywords en {len(chunks)} POSTs")
+        with ThreadPoolExecutor(max_workers=max(1, min(client.pool_size, len(chunks)))) as pool:
+            chunk_responses = list(pool.map(post_chunk, chunks))
+        failed = []
+        for chunk, responses in zip(chunks, chunk_responses):
+            for q, resp in zip(chunk, responses):
+                results[q] = resp
+                if is_task_ok(resp):
+                    _store_serp(keys[q], resp)
+                else:
+                    failed.append(q)
+        if failed:
+            logger.warning(f"Batch SERP: {len(failed)} tasks fallidos" + (", reintentando" if attempt < retries else ""))
+        pending = failed
+
+    return results
+
+
+def dfs_serp_tasks(keywords: List[str], *, login: str, password: str, location_name: str,
+                   language_code: str, device: str, safe: str, client: Optional[RestClient] = None,
+                   on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                   poll_min: float = 2.0, poll_max: float = 60.0, backoff: float = 1.5,
+                   timeout: float = 3600.0) -> Dict[str, Dict[str, Any]]:
+    """Modo encolado (task_post → tasks_ready → task_get/advanced) para listas grandes.
+
+    Más barato que live/advanced cuando no hace falta respuesta inmediata. Publica los
+    tasks en POSTs de hasta 100, consulta tasks_ready con backoff adaptativo (vuelve a
+    `poll_min` cuando aparecen resultados, crece hasta `poll_max` cuando no) y descarga
+    los resultados listos en paralelo. Cada respuesta tiene el mismo formato que
+    dfs_live_serp y se entrega a `on_result` apenas llega (desde los hilos de descarga,
+    por lo que el callback debe ser thread-safe). Los keywords que no se
+    pudieron publicar o que no terminan antes de `timeout` quedan como respuestas de error.
+    """
+    client = client or get_client(login, password)
+    results: Dict[str, Dict[str, Any]] = {}
+    task_ids: Dict[str, str] = {}
+    keys = {q: _serp_key(q, location_name=location_name, language_code=language_code,
+                         device=device, safe=safe) for q in keywords if q}
+
+    def deliver(query: str, js: Dict[str, Any]):
+        results[query] = js
+        if on_result:
+            on_result(query, js)
+
+    pending = []
+    for q, key in keys.items():
+        cached = serp_cache().get(key)
+        if cached is not None:
+            deliver(q, cached)
+        else:
+            pending.append(q)
+
+    def post_chunk(chunk: List[str]) -> Dict[str, Any]:
+        payload = [_serp_task(q, location_name=location_name, language_code=language_code,
+                              device=device, safe=safe) for q in chunk]
+        return client.post(SERP_TASK_POST_ENDPOINT, payload)
+
+    chunks = [pending[i:i + MAX_TASKS_PER_POST] for i in range(0, len(pending), MAX_TASKS_PER_POST)]
+    with ThreadPoolExecutor(max_workers=max(1, min(client.pool_size, len(chunks) or 1))) as pool:
+        posted = list(pool.map(lambda c: (c, _safe_call(post_chunk, c)), chunks))
+    for chunk, (js, error) in posted:
+        if error:
+            logger.error(f"Error publicando {len(chunk)} tasks SERP: {error}")
+            for q in chunk:
+                deliver(q, _error_response(q, 0, error))
+            continue
+        tasks = js.get("tasks") or []
+        for i, q in enumerate(chunk):
+            task = next((t for t in tasks if (t.get("data") or {}).get("keyword") == q), None)
+            if task is None and len(tasks) == len(chunk):
+                task = tasks[i]
+            if task and task.get("id") and task.get("status_code") == 20100:
+                task_ids[task["id"]] = q
+            else:
+                deliver(q, _error_response(q, (task or {}).get("status_code", 0),
+                                           (task or {}).get("status_message") or "task no creado"))
+    logger.info(f"Tasks SERP publicados: {len(task_ids)} de {len(pending)}")
+
+    def fetch(task_id: str):
+        q = task_ids[task_id]
+        js, error = _safe_call(client.get, SERP_TASK_GET_ENDPOINT.format(task_id), decode_serp_stream)
+        if error:
+            js = _error_response(q, 0, error)
+        else:
+            _store_serp(keys[q], js)
+        deliver(q, js)
+
+    deadline = time.monotonic() + timeout
+    interval = poll_min
+    waiting = set(task_ids)
+    with ThreadPoolExecutor(max_workers=client.pool_size) as pool:
+        while waiting and time.monotonic() < deadline:
+            js, error = _safe_call(client.get, SERP_TASKS_READY_ENDPOINT)
+            ready = []
+            if error:
+                logger.warning(f"Error consultando tasks_ready: {error}")
+            else:
+                for t in js.get("tasks") or []:
+                    for item in t.get("result") or []:
+                        if item.get("id") in waiting:
+                            ready.append(item["id"])
+            if ready:
+                waiting.difference_update(ready)
+                for task_id in ready:
+                    pool.submit(fetch, task_id)
+                interval = poll_min
+                logger.info(f"Tasks SERP listos: {len(ready)}, pendientes: {len(waiting)}")
+            else:
+                interval = min(poll_max, interval * backoff)
+            if waiting:
+                time.sleep(max(0.0, min(interval, deadline - time.monotonic())))
+
+    for task_id in waiting:
+        q = task_ids[task_id]
+        logger.warning(f"Task SERP sin resultado antes del timeout: '{q}' ({task_id})")
+        deliver(q, _error_response(q, 0, f"timeout esperando task {task_id}"))
+    return results
+
+
+def _safe_call(func, *args):
+    """Ejecuta func(*args) y devuelve (resultado, None) o (None, mensaje de error)."""
     try:
-        response = client.post("/v3/serp/google/organic/live/advanced", payload)
-        logger.info(f"Respuesta SERP recibida para '{query}': {type(response)}")
-        return response
+        return func(*args), None
     except Exception as e:
-        logger.error(f"Error consultando SERP para '{query}': {str(e)}")
-        raise
+        return None, str(e)
 
 
-@st.cache_data(show_spinner=False)
 def get_autocomplete(query: str, *, contry_iso_code: str, lang_iso: str) -> List[str]:
     """Google Autocomplete endpoint
     Receives query, country ISO code (gl), language ISO code (hl)."""
+    key = _cache_key("autocomplete", query, contry_iso_code, lang_iso)
+    cached = serp_cache().get(key)
+    if cached is not None:
+        return cached
     try:
         
         params = {"output": "chrome",
                   "q": query,
                   "gl": contry_iso_code,
                   "hl": lang_iso}
-        base_url = "https://suggestqueries.google.com/complete/search"        
-        response = requests.get(base_url, params=params, timeout=30)
+        base_url = os.getenv("AUTOCOMPLETE_BASE_URL") or AUTOCOMPLETE_URL
+        response = autocomplete_session().get(base_url, params=params, timeout=30)
         results = json.loads(response.text)
+        serp_cache().set(key, results[1], ttl=SERP_CACHE_CONFIG["ttl_autocomplete"])
         return results[1]
     except Exception:
         return []
 
 
 def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
-    """Extract all SERP features: organic, PAA, videos, AI overview, related searches, images, top stories, twitter, carousel, knowledge graph."""
+    """Extract all SERP features: organic, PAA, videos, AI overview, related searches, images, top stories, twitter, carousel, knowledge graph, shopping, local pack."""
     organic, paa, videos, ai_overview, related_searches, images = [], [], [], [], [], []
-    top_stories, twitter, carousel, knowledge_graph = [], [], [], []
+    top_stories, twitter, carousel, knowledge_graph, shopping, local_pack = [], [], [], [], [], []
     
     tasks = js.get("tasks", [])
     
@@ -65,38 +440,38 @@ def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
         for res in t.get("result", []) or []:
             items = res.get("items", []) or []
             for it in items:
-                tpe = it.get("type")
+                feature = SERP_FEATURE_OF_TYPE.get(it.get("type"))
                 
-                if tpe == "organic":
+                if feature == "organic":
                     link = it.get("url")
                     title = it.get("title")
                     snippet = (it.get("description") or "").strip()
                     if link and title:
                         organic.append({"title": title, "url": link, "snippet": snippet})
                 
-                elif tpe == "people_also_ask":
+                elif feature == "paa":
                     for q in it.get("items", []) or []:
                         qtext = q.get("title") or q.get("question")
                         if qtext:
                             paa.append(qtext)
                 
-                elif tpe in ("video", "video_carousel"):
+                elif feature == "videos":
                     for v in (it.get("items") or [{"title": it.get("title"), "url": it.get("url")}]):
                         if v and v.get("url"):
                             videos.append({"title": v.get("title"), "url": v.get("url")})
                 
-                elif tpe in ("ai_overview", "generative_overview", "ai_overview_box"):
+                elif feature == "ai_overview":
                     content = it.get("text") or it.get("description") or it.get("content")
                     if content:
                         ai_overview.append(content)
                 
-                elif tpe == "related_searches":
+                elif feature == "related_searches":
                     search_items = it.get("items", []) or []
                     for search_term in search_items:
                         if isinstance(search_term, str) and search_term.strip():
                             related_searches.append(search_term.strip())
                 
-                elif tpe == "images":
+                elif feature == "images":
                     for img in it.get("items", []) or []:
                         if img and img.get("image_url"):
                             images.append({
@@ -105,7 +480,7 @@ def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
                                 "image_url": img.get("image_url")
                             })
                 
-                elif tpe == "top_stories":
+                elif feature == "top_stories":
                     for story in it.get("items", []) or []:
                         if story and story.get("url"):
                             top_stories.append({
@@ -118,7 +493,7 @@ def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
                                 "badges": story.get("badges", [])
                             })
                 
-                elif tpe == "twitter":
+                elif feature == "twitter":
                     for tweet in it.get("items", []) or []:
                         if tweet and tweet.get("url"):
                             twitter.append({
@@ -128,7 +503,7 @@ def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
                                 "timestamp": tweet.get("timestamp", "")
                             })
                 
-                elif tpe == "carousel":
+                elif feature == "carousel":
                     carousel_title = it.get("title", "")
                     carousel_items = []
                     for item in it.get("items", []) or []:
@@ -145,7 +520,7 @@ def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
                             "items": carousel_items
                         })
                 
-                elif tpe == "knowledge_graph":
+                elif feature == "knowledge_graph":
                     kg_data = {
                         "title": it.get("title", ""),
                         "subtitle": it.get("subtitle", ""),
@@ -165,6 +540,25 @@ def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
                     if structured_data:
                         kg_data["structured_data"] = structured_data
                     knowledge_graph.append(kg_data)
+
+                elif feature == "shopping":
+                    for product in it.get("items") or [it]:
+                        if product and product.get("title"):
+                            shopping.append({
+                                "title": product.get("title", ""),
+                                "url": product.get("url", ""),
+                                "price": product.get("price"),
+                                "source": product.get("source", "")
+                            })
+
+                elif feature == "local_pack":
+                    if it.get("title"):
+                        local_pack.append({
+                            "title": it.get("title", ""),
+                            "url": it.get("url", ""),
+                            "domain": it.get("domain", ""),
+                            "phone": it.get("phone", "")
+                        })
     
     return {
         "organic": organic, 
@@ -176,5 +570,7 @@ def parse_serp_features(js: Dict[str, Any]) -> Dict[str, Any]:
         "top_stories": top_stories,
         "twitter": twitter,
         "carousel": carousel,
-        "knowledge_graph": knowledge_graph
+        "knowledge_graph": knowledge_graph,
+        "shopping": shopping,
+        "local_pack": local_pack
     }
\ No newline at end of file
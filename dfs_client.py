@@ -1,34 +1,227 @@
-from http.client import HTTPSConnection
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit
 from base64 import b64encode
 from json import loads
 from json import dumps
+import gzip
+import logging
+import queue
+import select
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Errores que indican que el servidor cerró una conexión keep-alive reutilizada
+_STALE_CONNECTION_ERRORS = (HTTPException, ConnectionResetError, BrokenPipeError,
+                            ConnectionAbortedError)
+
+# Métodos que se pueden repetir si la conexión se cayó después de enviar el pedido.
+# Un POST (ej. task_post) solo se reintenta si falló al enviarse: si el servidor ya
+# lo recibió, repetirlo podría crear los tasks dos veces.
+_IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+
+
+class _CountingReader:
+    """Envuelve la respuesta HTTP contando los bytes leídos del socket."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size=None):
+        chunk = self.raw.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def _load_json(stream):
+    return loads(stream.read().decode())
+
 
 class RestClient:
+    """Cliente DataForSEO con pool de conexiones HTTPS persistentes (thread-safe).
+
+    Las conexiones se reutilizan entre llamadas (keep-alive) y se reabren de forma
+    transparente si el servidor las cerró. `pool_size` acota las conexiones abiertas
+    en simultáneo; `stats()` expone contadores de uso y reutilización.
+
+    El transporte va comprimido: los cuerpos POST se envían en gzip, se pide
+    `Accept-Encoding: gzip` y la respuesta se descomprime a medida que se lee.
+    `last_transfer()` devuelve los bytes (en red y sin comprimir) de la última
+    petición del hilo actual; `stats()` los acumula.
+
+    `base_url` permite apuntar a otro host (ej. "http://127.0.0.1:8080" para un
+    servidor local que imite la API).
+
+    Antes de reutilizar una conexión inactiva se descarta si el servidor ya la cerró
+    (el socket quedó legible: EOF) o si lleva más de `max_idle` segundos sin uso, así
+    un POST (que no se reintenta una vez enviado) no sale por una conexión muerta.
+    """
     domain = "api.dataforseo.com"
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, pool_size=4, timeout=120, base_url=None, max_idle=60.0):
+        self.secure = True
+        self.port = None
+        if base_url:
+            parts = urlsplit(base_url)
+            self.domain = parts.hostname
+            self.port = parts.port
+            self.secure = parts.scheme != "http"
         self.username = username
         self.password = password
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        base64_bytes = b64encode(
+            ("%s:%s" % (self.username, self.password)).encode("ascii")
+            ).decode("ascii")
+        self._auth_header = 'Basic %s' % base64_bytes
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "connections_opened": 0, "reused": 0, "reconnects": 0,
+                       "idle_dropped": 0, "bytes_sent": 0, "bytes_sent_raw": 0,
+                       "bytes_received": 0, "bytes_received_raw": 0}
+        self._local = threading.local()
 
-    def request(self, path, method, data=None):
-        connection = HTTPSConnection(self.domain)
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _new_connection(self):
+        self._count("connections_opened")
+        connection_class = HTTPSConnection if self.secure else HTTPConnection
+        return connection_class(self.domain, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        while True:
+            try:
+                connection, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._new_connection(), False
+            if time.monotonic() - released_at <= self.max_idle and self._is_open(connection):
+                return connection, True
+            connection.close()
+            self._count("idle_dropped")
+
+    @staticmethod
+    def _is_open(connection):
+        """Una conexión keep-alive inactiva no debería tener nada para leer: si el socket
+        está legible, el servidor la cerró (EOF) y no sirve para un nuevo pedido."""
+        sock = connection.sock
+        if sock is None:
+            return False
         try:
-            base64_bytes = b64encode(
-                ("%s:%s" % (self.username, self.password)).encode("ascii")
-                ).decode("ascii")
-            headers = {'Authorization' : 'Basic %s' %  base64_bytes, 'Content-Encoding' : 'gzip'}
-            connection.request(method, path, headers=headers, body=data)
-            response = connection.getresponse()
-            return loads(response.read().decode())
-        finally:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def _release(self, connection, response):
+        if response.will_close:
             connection.close()
+        else:
+            self._idle.put((connection, time.monotonic()))
+
+    def _read_body(self, response, decoder):
+        """Decodifica la respuesta leyendo (y descomprimiendo si corresponde) en streaming.
 
-    def get(self, path):
-        return self.request(path, 'GET')
+        Devuelve (objeto, bytes en red, bytes descomprimidos).
+        """
+        counter = _CountingReader(response)
+        if (response.getheader('Content-Encoding') or '').lower() == 'gzip':
+            with gzip.GzipFile(fileobj=counter) as stream:
+                decoded = _CountingReader(stream)
+                result = decoder(decoded)
+        else:
+            decoded = counter
+            result = decoder(decoded)
+        counter.read()  # Drenar lo que el decoder no haya leído para poder reutilizar la conexión
+        return result, counter.bytes_read, decoded.bytes_read
+
+    def request(self, path, method, data=None, decoder=None):
+        """Ejecuta la petición y devuelve el JSON decodificado.
+
+        `decoder` recibe un stream binario con el cuerpo ya descomprimido; permite
+        decodificar de forma incremental (por defecto se lee todo y se usa json.loads).
+        """
+        decoder = decoder or _load_json
+        headers = {'Authorization': self._auth_header, 'Accept-Encoding': 'gzip'}
+        raw_size = 0
+        if data is not None:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            raw_size = len(data)
+            data = gzip.compress(data)
+            headers['Content-Encoding'] = 'gzip'
+            headers['Content-Type'] = 'application/json'
+        self._count("requests")
+        with self._slots:
+            connection, reused = self._acquire()
+            try:
+                sent = False
+                try:
+                    connection.request(method, path, headers=headers, body=data)
+                    sent = True
+                    response = connection.getresponse()
+                except _STALE_CONNECTION_ERRORS:
+                    if not reused or (sent and method.upper() not in _IDEMPOTENT_METHODS):
+                        raise
+                    # El servidor cerró la conexión keep-alive: reintentar con una nueva
+                    connection.close()
+                    self._count("reconnects")
+                    connection, reused = self._new_connection(), False
+                    connection.request(method, path, headers=headers, body=data)
+                    response = connection.getresponse()
+                if reused:
+                    self._count("reused")
+                result, wire_size, body_size = self._read_body(response, decoder)
+            except BaseException:
+                connection.close()
+                raise
+            self._release(connection, response)
+        transfer = {
+            "bytes_sent": len(data) if data is not None else 0,
+            "bytes_sent_raw": raw_size,
+            "bytes_received": wire_size,
+            "bytes_received_raw": body_size,
+        }
+        self._local.last_transfer = transfer
+        for key, amount in transfer.items():
+            self._count(key, amount)
+        logger.debug(f"{method} {path}: enviados {transfer['bytes_sent']}/{raw_size} B, "
+                     f"recibidos {wire_size}/{body_size} B (comprimido/original)")
+        return result
+
+    def last_transfer(self):
+        """Bytes de la última petición hecha desde este hilo (comprimidos y originales)."""
+        return dict(getattr(self._local, "last_transfer", {}))
 
-    def post(self, path, data):
+    def get(self, path, decoder=None):
+        return self.request(path, 'GET', decoder=decoder)
+
+    def post(self, path, data, decoder=None):
         if isinstance(data, str):
             data_str = data
         else:
             data_str = dumps(data)
-        return self.request(path, 'POST', data_str)
+        return self.request(path, 'POST', data_str, decoder=decoder)
+
+    def stats(self):
+        """Contadores de uso del pool: peticiones, conexiones abiertas, reutilizaciones."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["bytes_saved"] = (stats["bytes_sent_raw"] - stats["bytes_sent"]
+                                + stats["bytes_received_raw"] - stats["bytes_received"])
+        stats["pool_size"] = self.pool_size
+        stats["idle_connections"] = self._idle.qsize()
+        return stats
+
+    def close(self):
+        """Cierra todas las conexiones inactivas del pool."""
+        while True:
+            try:
+                self._idle.get_nowait()[0].close()
+            except queue.Empty:
+                break
@@ -0,0 +1,197 @@
+# keyword_expansion.py
+# Expansión del universo de keywords: autocompletado (alfabeto + modificadores) y saltos
+# por búsquedas relacionadas y PAA de la SERP, en paralelo y con deduplicación.
+#
+# Uso:
+#   python keyword_expansion.py "seguro de auto" --depth 2 --out keywords.txt
+#   python batch_runner.py keywords.txt --out runs/seguros
+#
+# Las respuestas de autocompletado y SERP pasan por la caché persistente, así que
+# volver a expandir los mismos seeds no repite llamadas.
+
+import argparse
+import logging
+import os
+import re
+import string
+import sys
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from config import DEFAULT_CONFIG, COUNTRY_ISO_TO_NAME
+from dataforseo_api import dfs_live_serp, get_autocomplete, parse_serp_features
+from scraper import DomainThrottle
+
+logger = logging.getLogger(__name__)
+
+# Sufijos "kw a", "kw b"... y prefijos de pregunta/comparación para el primer nivel
+ALPHABET_SUFFIXES = list(string.ascii_lowercase) + ["ñ"]
+MODIFIER_PREFIXES = ["qué", "cómo", "cuál", "cuándo", "dónde", "por qué", "para qué", "mejor"]
+MODIFIER_SUFFIXES = ["para", "vs", "precio", "opiniones", "gratis", "online"]
+
+
+def fold_keyword(text: str) -> str:
+    """Clave de deduplicación: sin tildes, minúsculas, sin signos y espacios colapsados.
+
+    "¿Cómo  hacer Pan?" y "como hacer pan" quedan iguales (la ñ se conserva).
+    """
+    text = text.lower().replace("ñ", "\0")
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]+", " ", text.replace("\0", "ñ"))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def seed_variants(keyword: str) -> List[str]:
+    """Consultas de autocompletado para un seed: el keyword, alfabeto y modificadores."""
+    return ([keyword] + [f"{keyword} {c}" for c in ALPHABET_SUFFIXES]
+            + [f"{m} {keyword}" for m in MODIFIER_PREFIXES]
+            + [f"{keyword} {m}" for m in MODIFIER_SUFFIXES])
+
+
+class KeywordExpander:
+    """Recorre el espacio de keywords en anchura a partir de uno o más seeds.
+
+    Nivel 0: los seeds y sus variantes de autocompletado (alfabeto/modificadores).
+    Cada nivel siguiente toma los keywords nuevos y agrega su autocompletado y,
+    si `use_serp`, las búsquedas relacionadas y PAA de su SERP, hasta `max_depth`.
+    Los keywords se deduplican con fold_keyword; `max_keywords` y `max_serp_calls`
+    acotan el tamaño y el gasto en DataForSEO. El autocompletado se espacía con un
+    DomainThrottle (`autocomplete_rate` consultas por segundo).
+    """
+
+    def __init__(self, config: Dict[str, Any], *, max_depth: int = 1, max_keywords: int = 500,
+                 use_serp: bool = True, max_serp_calls: int = 50, workers: int = 8,
+                 autocomplete_rate: float = 10.0):
+        self.config = config
+        self.max_depth = max_depth
+        self.max_keywords = max_keywords
+        self.use_serp = use_serp and bool(config.get("dfs_login"))
+        self.max_serp_calls = max_serp_calls
+        self.workers = workers
+        self._throttle = DomainThrottle(1.0 / autocomplete_rate if autocomplete_rate else 0.0)
+        self._serp_slots = threading.BoundedSemaphore(config.get("serp_concurrency", 4))
+        self._lock = threading.Lock()
+        self._found: Dict[str, Dict[str, Any]] = {}
+        self._serp_calls = 0
+        self._stats = {"autocomplete_calls": 0, "serp_calls": 0, "candidates": 0, "duplicates": 0}
+
+    def _autocomplete(self, query: str) -> List[str]:
+        self._throttle.wait("autocomplete")
+        with self._lock:
+            self._stats["autocomplete_calls"] += 1
+        return get_autocomplete(query, contry_iso_code=self.config["country_iso_code"],
+                                lang_iso=self.config["lang_iso_code"])
+
+    def _serp_children(self, keyword: str) -> List[tuple]:
+        with self._lock:
+            if self._serp_calls >= self.max_serp_calls:
+                return []
+            self._serp_calls += 1
+            self._stats["serp_calls"] += 1
+        try:
+            with self._serp_slots:
+                js = dfs_live_serp(
+                    keyword,
+                    login=self.config["dfs_login"],
+                    password=self.config["dfs_password"],
+                    location_name=self.config["location_name"],
+                    language_code=self.config["language_code"],
+                    device=self.config["device"],
+                    safe=self.config["safe"]
+                )
+            features = parse_serp_features(js)
+        except Exception as e:
+            logger.error(f"Error consultando SERP para expandir '{keyword}': {str(e)}")
+            return []
+        return ([(kw, "related_searches") for kw in features["related_searches"]]
+                + [(kw, "paa") for kw in features["paa"]])
+
+    def _expand(self, keyword: str, depth: int) -> List[tuple]:
+        """Candidatos (keyword, origen) que salen de un keyword del nivel `depth`."""
+        queries = seed_variants(keyword) if depth == 0 else [keyword]
+        children = [(kw, "autocomplete") for q in queries for kw in self._autocomplete(q)]
+        if self.use_serp:
+            children += self._serp_children(keyword)
+        return children
+
+    def _add(self, keyword: str, depth: int, source: str, parent: Optional[str]) -> bool:
+        key = fold_keyword(keyword)
+        with self._lock:
+            self._stats["candidates"] += 1
+            if not key or key in self._found:
+                self._stats["duplicates"] += 1
+                return False
+            if len(self._found) >= self.max_keywords:
+                return False
+            self._found[key] = {"keyword": keyword.strip(), "depth": depth,
+                                "source": source, "parent": parent}
+            return True
+
+    def expand(self, seeds: List[str]) -> List[Dict[str, Any]]:
+        """Devuelve [{keyword, depth, source, parent}] en orden de descubrimiento (seeds primero)."""
+        frontier = [s.strip() for s in seeds if self._add(s, 0, "seed", None)]
+        depth = 0
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="expand") as pool:
+            while frontier and depth < self.max_depth:
+                next_frontier = []
+                for keyword, children in zip(frontier, pool.map(self._expand, frontier, [depth] * len(frontier))):
+                    for child, source in children:
+                        if self._add(child, depth + 1, source, keyword):
+                            next_frontier.append(child.strip())
+                logger.info(f"Expansión nivel {depth}: {len(frontier)} keywords → {len(next_frontier)} nuevos")
+                if len(self._found) >= self.max_keywords:
+                    break
+                frontier = next_frontier
+                depth += 1
+        return list(self._found.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, keywords=len(self._found))
+
+
+def expand_keywords(seeds: List[str], config: Dict[str, Any], **kwargs) -> List[str]:
+    """Lista de keywords expandida (incluye los seeds), lista para run_keywords."""
+    return [item["keyword"] for item in KeywordExpander(config, **kwargs).expand(seeds)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Expande seeds con autocompletado, búsquedas relacionadas y PAA.")
+    parser.add_argument("seeds", nargs="+", help="Keywords semilla")
+    parser.add_argument("--depth", type=int, default=1, help="Saltos a partir de los seeds")
+    parser.add_argument("--max-keywords", type=int, default=500)
+    parser.add_argument("--max-serp-calls", type=int, default=50, help="Tope de consultas SERP (pagas)")
+    parser.add_argument("--no-serp", action="store_true", help="Solo autocompletado")
+    parser.add_argument("--country", default=DEFAULT_CONFIG["country_iso_code"])
+    parser.add_argument("--lang", default=DEFAULT_CONFIG["lang_iso_code"])
+    parser.add_argument("--language-code", default=DEFAULT_CONFIG["language_code"])
+    parser.add_argument("--out", help="Archivo de salida (un keyword por línea); por defecto stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config = {
+        **DEFAULT_CONFIG,
+        "dfs_login": os.getenv("DATAFORSEO_LOGIN", ""),
+        "dfs_password": os.getenv("DATAFORSEO_PASSWORD", ""),
+        "country_iso_code": args.country,
+        "lang_iso_code": args.lang,
+        "language_code": args.language_code,
+        "location_name": COUNTRY_ISO_TO_NAME.get(args.country, "Argentina"),
+    }
+    expander = KeywordExpander(config, max_depth=args.depth, max_keywords=args.max_keywords,
+                               use_serp=not args.no_serp, max_serp_calls=args.max_serp_calls)
+    keywords = [item["keyword"] for item in expander.expand(args.seeds)]
+    output = "\n".join(keywords) + "\n"
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+    logger.info(f"Expansión completada: {expander.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# llm_cache.py
+# Caché persistente de respuestas del LLM direccionada por contenido
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from cache_store import get_cache
+from config import LLM_CACHE_CONFIG
+
+
+def _canonical(value: Any) -> Any:
+    """Los mensajes con JSON (payload del usuario) se comparan por contenido, no por formato."""
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            return value
+        return parsed if isinstance(parsed, (dict, list)) else value
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def request_key(api_params: Dict[str, Any]) -> str:
+    """Hash de modelo, temperatura, prompt de sistema y payload JSON canonicalizado.
+
+    Cualquier otro parámetro de responses.create también entra en la clave.
+    """
+    canonical = json.dumps(_canonical(api_params), sort_keys=True, ensure_ascii=False,
+                           separators=(",", ":"), default=str)
+    return "llm:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Respuestas de texto del LLM por request_key, sobre SQLiteCache (TTL + desalojo LRU por tamaño).
+
+    `last_lookup()` indica si la última consulta del hilo actual fue "hit", "miss"
+    o "bypass" (regeneración forzada), para mostrarlo en la UI.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_CONFIG["path"],
+                 max_bytes: int = LLM_CACHE_CONFIG["max_bytes"]):
+        self.store = get_cache(path, max_bytes)
+        self._local = threading.local()
+
+    def get(self, api_params: Dict[str, Any], force: bool = False) -> Optional[str]:
+        if force:
+            self._local.last_lookup = "bypass"
+            return None
+        text = self.store.get(request_key(api_params))
+        self._local.last_lookup = "hit" if text is not None else "miss"
+        return text
+
+    def set(self, api_params: Dict[str, Any], text: str):
+        if text:
+            self.store.set(request_key(api_params), text, ttl=LLM_CACHE_CONFIG["ttl"])
+
+    def last_lookup(self) -> Optional[str]:
+        return getattr(self._local, "last_lookup", None)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Instancia compartida de la caché del LLM, o None si está desactivada."""
+    global _llm_cache
+    if not LLM_CACHE_CONFIG["enabled"]:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
@@ -0,0 +1,222 @@
+# llm_dispatcher.py
+# Despachador de llamadas a OpenAI compartido por todo el proceso: un cliente con pool de
+# conexiones por API key, límites de requests/tokens por minuto (token buckets), tope de
+# concurrencia y reintentos con backoff exponencial + jitter ante 429 / errores transitorios.
+
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+from config import LLM_DISPATCH_CONFIG
+
+try:
+    import openai
+    from openai import OpenAI
+except Exception:
+    openai = None
+    OpenAI = None
+
+logger = logging.getLogger(__name__)
+
+_NO_SLOT = nullcontext()
+
+# Errores que vale la pena reintentar (además de los 5xx)
+_RETRYABLE_ERRORS = tuple(getattr(openai, name) for name in
+                          ("RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError")
+                          if openai and hasattr(openai, name))
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate_per_min` unidades por minuto, ráfagas de hasta `capacity`.
+
+    `acquire(n)` bloquea hasta que hay `n` unidades y devuelve la espera en segundos.
+    El saldo puede quedar negativo con `adjust()` (consumo real mayor al estimado),
+    lo que frena a los siguientes pedidos hasta recuperarlo.
+    """
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return now - started
+                missing = (amount - self._tokens) / self.rate
+            time.sleep(min(missing, 1.0))
+
+    def adjust(self, amount: float):
+        """Descuenta (o devuelve, si es negativo) `amount` sin esperar."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+def estimate_tokens(api_params: Dict[str, Any]) -> int:
+    """Estimación gruesa de tokens de un pedido: ~4 caracteres por token más la salida esperada."""
+    prompt_chars = len(json.dumps(api_params.get("input", ""), ensure_ascii=False))
+    output = api_params.get("max_output_tokens") or LLM_DISPATCH_CONFIG["expected_output_tokens"]
+    return prompt_chars // 4 + output
+
+
+class LLMDispatcher:
+    """Encola las llamadas a responses.create respetando RPM, TPM y concurrencia máxima.
+
+    Un único cliente OpenAI (con su pool de conexiones httpx) por API key. Los 429 y
+    errores transitorios se reintentan con backoff exponencial y jitter completo,
+    respetando Retry-After cuando viene. `last_wait()` devuelve el tiempo en cola del
+    último pedido del hilo actual; `stats()` acumula esperas, reintentos y tokens.
+    """
+
+    def __init__(self, api_key: str, *, rpm: float = LLM_DISPATCH_CONFIG["rpm"],
+                 tpm: float = LLM_DISPATCH_CONFIG["tpm"],
+                 max_concurrency: int = LLM_DISPATCH_CONFIG["max_concurrency"],
+                 max_retries: int = LLM_DISPATCH_CONFIG["max_retries"],
+                 base_delay: float = 1.0, max_delay: float = 60.0, base_url: Optional[str] = None):
+        if not (OpenAI and api_key):
+            raise RuntimeError("OpenAI SDK not available or API key missing")
+        # Los reintentos los maneja el despachador (con los buckets), no el SDK
+        kwargs = {"api_key": api_key, "max_retries": 0}
+        if base_url:
+            kwargs["base_url"] = base_url
+        self.client = OpenAI(**kwargs)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0,
+                       "queue_wait_s": 0.0, "max_queue_wait_s": 0.0, "tokens_estimated": 0,
+                       "tokens_used": 0}
+
+    def _count(self, **amounts):
+        with self._stats_lock:
+            for key, amount in amounts.items():
+                self._stats[key] += amount
+
+    def _admit(self, estimated: int) -> float:
+        """Espera turno (buckets de requests y tokens). Devuelve la espera en segundos."""
+        waited = self.requests.acquire(1)
+        waited += self.tokens.acquire(estimated)
+        return waited
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            if retry_after:
+                return min(self.max_delay, float(retry_after))
+        except ValueError:
+            pass
+        # Jitter completo: uniforme entre 0 y el backoff exponencial
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if _RETRYABLE_ERRORS and isinstance(error, _RETRYABLE_ERRORS):
+            return True
+        return getattr(error, "status_code", None) in (408, 409, 429) or \
+            (getattr(error, "status_code", None) or 0) >= 500
+
+    def _run(self, api_params: Dict[str, Any], call, acquire_slot: bool = True,
+             queued: Optional[float] = None):
+        estimated = estimate_tokens(api_params)
+        queued = queued or time.monotonic()
+        attempt = 0
+        with self._slots if acquire_slot else _NO_SLOT:
+            while True:
+                self._admit(estimated)
+                wait = time.monotonic() - queued
+                self._local.last_wait = wait
+                try:
+                    result = call()
+                except Exception as e:
+                    if attempt >= self.max_retries or not self._is_retryable(e):
+                        self._count(failures=1)
+                        raise
+                    delay = self._retry_delay(attempt, e)
+                    self._count(retries=1, rate_limited=int(getattr(e, "status_code", 0) == 429))
+                    logger.warning(f"OpenAI: {type(e).__name__}, reintento {attempt + 1}/{self.max_retries} "
+                                   f"en {delay:.1f}s")
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                with self._stats_lock:
+                    self._stats["requests"] += 1
+                    self._stats["queue_wait_s"] += wait
+                    self._stats["max_queue_wait_s"] = max(self._stats["max_queue_wait_s"], wait)
+                    self._stats["tokens_estimated"] += estimated
+                return result, estimated
+
+    def _settle(self, estimated: int, usage):
+        """Corrige el bucket de tokens con el consumo real informado por la API."""
+        used = getattr(usage, "total_tokens", None) if usage is not None else None
+        if used:
+            self.tokens.adjust(used - estimated)
+            self._count(tokens_used=used)
+
+    def create(self, api_params: Dict[str, Any]):
+        """responses.create con límites y reintentos."""
+        resp, estimated = self._run(api_params, lambda: self.client.responses.create(**api_params))
+        self._settle(estimated, getattr(resp, "usage", None))
+        return resp
+
+    def stream(self, api_params: Dict[str, Any]) -> Iterator[Any]:
+        """responses.create(stream=True): entrega los eventos.
+
+        Solo se reintenta la apertura del stream; el cupo de concurrencia se ocupa
+        hasta terminar de leerlo.
+        """
+        queued = time.monotonic()
+        with self._slots:
+            events, estimated = self._run(
+                api_params, lambda: self.client.responses.create(**api_params, stream=True),
+                acquire_slot=False, queued=queued)
+            for event in events:
+                if getattr(event, "type", "") == "response.completed":
+                    self._settle(estimated, getattr(event.response, "usage", None))
+                yield event
+
+    def last_wait(self) -> Optional[float]:
+        """Segundos en cola (límites + reintentos) del último pedido de este hilo."""
+        return getattr(self._local, "last_wait", None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_queue_wait_s"] = round(stats["queue_wait_s"] / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["queue_wait_s"] = round(stats["queue_wait_s"], 3)
+        stats["max_queue_wait_s"] = round(stats["max_queue_wait_s"], 3)
+        return stats
+
+
+_dispatchers: Dict[str, LLMDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(api_key: str) -> LLMDispatcher:
+    """Despachador compartido (por proceso) para esta API key."""
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(api_key)
+        if dispatcher is None:
+            dispatcher = _dispatchers[api_key] = LLMDispatcher(api_key)
+        return dispatcher
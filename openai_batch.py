@@ -0,0 +1,156 @@
+# openai_batch.py
+# Modo batch de OpenAI para generar outlines en bloque (corridas nocturnas).
+#
+# Las peticiones (mismo prompt de sistema y payload JSON que generate_outline_with_openai)
+# se escriben en un JSONL, se suben con la Files API y se procesan con la Batch API,
+# que cuesta una fracción del modo interactivo a cambio de latencia (hasta 24 h).
+# `base_url` permite apuntar a un servidor local que imite los endpoints.
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from outline_generator import build_outline_request
+
+try:
+    from openai import OpenAI
+except Exception:
+    OpenAI = None
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/responses"
+BATCH_COMPLETION_WINDOW = "24h"
+# Estados en los que el batch ya no va a avanzar
+BATCH_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+def custom_id(keyword: str) -> str:
+    """Identificador estable del keyword dentro del batch."""
+    return "kw-" + hashlib.sha1(keyword.encode("utf-8")).hexdigest()[:16]
+
+
+def batch_line(keyword: str, openai_args: Dict[str, Any]) -> Dict[str, Any]:
+    """Línea del JSONL de entrada para un keyword (argumentos de generate_outline_with_openai)."""
+    args = {k: v for k, v in openai_args.items() if k not in ("api_key", "force_regenerate")}
+    return {"custom_id": custom_id(keyword), "method": "POST", "url": BATCH_ENDPOINT,
+            "body": build_outline_request(keyword, **args)}
+
+
+def write_batch_file(path: str, lines: Iterable[Dict[str, Any]]) -> int:
+    """Escribe las líneas del batch en `path` y devuelve cuántas se escribieron."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+            count += 1
+    return count
+
+
+def batch_client(api_key: str, base_url: Optional[str] = None):
+    if not (OpenAI and api_key):
+        raise RuntimeError("OpenAI SDK not available or API key missing")
+    return OpenAI(api_key=api_key, base_url=base_url) if base_url else OpenAI(api_key=api_key)
+
+
+def submit_batch(client, path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+    """Sube el JSONL y crea el batch. Devuelve el id del batch."""
+    with open(path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                  completion_window=BATCH_COMPLETION_WINDOW, metadata=metadata)
+    logger.info(f"Batch OpenAI creado: {batch.id} (archivo {input_file.id})")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id: str, *, poll_min: float = 10.0, poll_max: float = 300.0,
+                   backoff: float = 1.5, timeout: float = 26 * 3600.0):
+    """Consulta el batch con backoff creciente hasta que termina o vence `timeout`.
+
+    Vuelve a `poll_min` cada vez que avanza la cantidad de requests completados.
+    Devuelve el último estado del batch (puede no ser final si venció el timeout).
+    """
+    deadline = time.monotonic() + timeout
+    interval = poll_min
+    last_done = -1
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        done = (counts.completed + counts.failed) if counts else 0
+        logger.info(f"Batch {batch_id}: {batch.status}"
+                    + (f" ({counts.completed} ok, {counts.failed} fallidos de {counts.total})" if counts else ""))
+        if batch.status in BATCH_FINAL_STATUSES or time.monotonic() + interval > deadline:
+            return batch
+        interval = poll_min if done > last_done else min(poll_max, interval * backoff)
+        last_done = done
+        time.sleep(interval)
+
+
+def response_text(body: Dict[str, Any]) -> str:
+    """Equivalente a `output_text` del SDK sobre el JSON crudo de una respuesta."""
+    return "".join(content.get("text", "")
+                   for item in body.get("output") or [] if item.get("type") == "message"
+                   for content in item.get("content") or [] if content.get("type") == "output_text")
+
+
+def batch_results(client, batch) -> Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """{custom_id: (texto, error, status)} a partir de los archivos de salida y de errores del batch.
+
+    `status` es el de la respuesta ("completed", "incomplete"...): un texto con status
+    "incomplete" quedó cortado (ej. por max_output_tokens).
+    """
+    results: Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+    for file_id in (getattr(batch, "output_file_id", None), getattr(batch, "error_file_id", None)):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            error = record.get("error")
+            text = None
+            if not error and response.get("status_code") == 200:
+                text = response_text(response.get("body") or {}) or None
+                if text is None:
+                    error = "respuesta sin texto"
+            elif not error:
+                error = f"HTTP {response.get('status_code')}: {(response.get('body') or {}).get('error')}"
+            results[record["custom_id"]] = (text, error if isinstance(error, str) or error is None
+                                            else json.dumps(error, ensure_ascii=False),
+                                            (response.get("body") or {}).get("status"))
+    return results
+
+
+def generate_outlines_batch(requests: Dict[str, Dict[str, Any]], *, api_key: str, path: str,
+                            base_url: Optional[str] = None, batch_id: Optional[str] = None,
+                            on_submit=None, client=None, **wait_kwargs) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Genera los outlines de `requests` ({keyword: argumentos de generate_outline_with_openai}).
+
+    Escribe el JSONL en `path`, lo envía y espera el resultado. Con `batch_id` retoma un
+    batch ya enviado (no se vuelve a pagar); `on_submit(batch_id)` permite guardarlo para
+    eso. Devuelve {keyword: (outline, error)}; los keywords sin outline traen el error,
+    y el llamador decide el fallback (ej. build_outline). `client` reemplaza al cliente
+    OpenAI (ej. uno falso en los tests).
+    """
+    client = client or batch_client(api_key, base_url)
+    if not batch_id:
+        count = write_batch_file(path, (batch_line(kw, args) for kw, args in requests.items()))
+        if not count:
+            return {}
+        batch_id = submit_batch(client, path)
+        if on_submit:
+            on_submit(batch_id)
+    batch = wait_for_batch(client, batch_id, **wait_kwargs)
+    by_id = batch_results(client, batch)
+    results = {}
+    for kw in requests:
+        text, error, _ = by_id.get(custom_id(kw), (None, None, None))
+        if text is None and error is None:
+            error = f"sin resultado (batch {batch.status})"
+        results[kw] = (text, error)
+    ok = sum(1 for text, _ in results.values() if text)
+    logger.info(f"Batch {batch_id}: {ok} outlines generados, {len(results) - ok} fallidos")
+    return results
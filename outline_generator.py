@@ -2,18 +2,24 @@
 # Generación de outlines usando OpenAI y métodos heurísticos
 
 import json
+import logging
 import re
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 import pandas as pd
-import numpy as np
-from analytics import ngrams_top
+from analytics import median_length_words, ngrams_top
+from results_store import pages_frame
 from config import OPENAI_SYSTEM_PROMPT, OPENAI_ARTICLE_PROMPT
+from llm_cache import get_llm_cache
+from llm_dispatcher import LLMDispatcher, get_dispatcher
 
 try:
     from openai import OpenAI
 except Exception:
     OpenAI = None
 
+logger = logging.getLogger(__name__)
+
 # Definir qué funciones están disponibles para importar
 __all__ = [
     'generate_outline_with_openai',
@@ -21,7 +27,11 @@ __all__ = [
     'generate_video_suggestions_markdown',
     'generate_top_stories_markdown',
     'generate_article_with_openai',
-    'generate_article_heuristic'
+    'generate_article_heuristic',
+    'stream_outline_with_openai',
+    'build_outline_request',
+    'stream_article_with_openai',
+    'collect_stream',
 ]
 
 
@@ -94,13 +104,65 @@ def generate_outline_with_openai(keyword: str, *, df: pd.DataFrame, paa: list,
                                related_searches: list = None, images: list = None, twitter: list = None,
                                carousel: list = None, knowledge_graph: list = None,
                                intent_label: str, intent_scores: dict, model: str, 
-                               api_key: str, temperature: float = None) -> str:
-    """Genera outline usando OpenAI"""
+                               api_key: str, temperature: float = None,
+                               force_regenerate: bool = False) -> str:
+    """Genera outline usando OpenAI.
+
+    La respuesta se guarda en la caché del LLM; un pedido idéntico (mismo modelo,
+    temperatura, prompt y payload) se responde desde ahí salvo `force_regenerate`.
+    """
+    dispatcher = _dispatcher(api_key)
+    api_params = build_outline_request(
+        keyword, df=df, paa=paa, related=related, ai_overview=ai_overview, videos=videos,
+        top_stories=top_stories, related_searches=related_searches, images=images,
+        twitter=twitter, carousel=carousel, knowledge_graph=knowledge_graph,
+        intent_label=intent_label, intent_scores=intent_scores, model=model,
+        temperature=temperature)
+
+    cache = get_llm_cache()
+    cached = cache.get(api_params, force=force_regenerate) if cache else None
+    if cached is not None:
+        logger.info(f"Outline de '{keyword}' desde caché LLM")
+        return cached
+
+    resp = dispatcher.create(api_params)
+
+    # Extraer contenido del texto (soporta nueva estructura SDK)
+    try:
+        content = resp.output_text
+    except Exception:
+        # Fallback para SDKs más antiguos
+        content = resp.choices[0].message.content if getattr(resp, "choices", None) else str(resp)
+    
+    _cache_if_completed(cache, api_params, content, getattr(resp, "status", None), f"outline '{keyword}'")
+    return content
+
+
+def stream_outline_with_openai(keyword: str, *, api_key: str, force_regenerate: bool = False,
+                               **kwargs) -> Iterator[str]:
+    """Como generate_outline_with_openai (mismos argumentos) pero entrega el texto a medida que llega.
+
+    Es un generador de deltas de texto; su valor de retorno (ver collect_stream) es el
+    outline completo, idéntico al de la versión sin streaming.
+    """
+    dispatcher = _dispatcher(api_key)
+    return _cached_stream(dispatcher, build_outline_request(keyword, **kwargs), f"outline '{keyword}'",
+                          force_regenerate)
+
+
+def _dispatcher(api_key: str) -> LLMDispatcher:
     if not (OpenAI and api_key):
         raise RuntimeError("OpenAI SDK not available or API key missing")
-    
-    client = OpenAI(api_key=api_key)
+    return get_dispatcher(api_key)
 
+
+def build_outline_request(keyword: str, *, df: pd.DataFrame, paa: list, related: list,
+                          ai_overview: list, videos: list, top_stories: list = None,
+                          related_searches: list = None, images: list = None, twitter: list = None,
+                          carousel: list = None, knowledge_graph: list = None, intent_label: str,
+                          intent_scores: dict, model: str, temperature: float = None) -> Dict[str, Any]:
+    """Parámetros de responses.create para el outline (también se usan en el modo batch)."""
+    df = pages_frame(df)
     # Construir payload compacto para el modelo
     payload = {
         "keyword": keyword,
@@ -118,7 +180,7 @@ def generate_outline_with_openai(keyword: str, *, df: pd.DataFrame, paa: list,
             "knowledge_graph": (knowledge_graph or [])[:5],
         },
         "scraped_summary": {
-            "median_length_words": int(df["len_words"].replace(0, np.nan).median(skipna=True) or 0),
+            "median_length_words": median_length_words(df),
             "has_tables": int(df["has_tables"].sum()),
             "has_lists": int(df["has_lists"].sum()),
             "titles": [t for t in df["title"].dropna().tolist() if t][:20],
@@ -139,31 +201,103 @@ def generate_outline_with_openai(keyword: str, *, df: pd.DataFrame, paa: list,
     # Solo agregar temperature si el modelo lo soporta
     if temperature is not None:
         api_params["temperature"] = temperature
-
-    resp = client.responses.create(**api_params)
-
-    # Extraer contenido del texto (soporta nueva estructura SDK)
-    try:
-        content = resp.output_text
-    except Exception:
-        # Fallback para SDKs más antiguos
-        content = resp.choices[0].message.content if getattr(resp, "choices", None) else str(resp)
-    
-    return content
+    return api_params
+
+
+def _stream_text(dispatcher: LLMDispatcher, api_params: Dict[str, Any], label: str) -> Iterator[str]:
+    """Llama a responses.create con stream=True (vía el despachador) y entrega los deltas de texto.
+
+    Registra el tiempo hasta el primer token y la latencia total. Devuelve
+    (texto, status): el `output_text` de la respuesta final (o los deltas unidos si
+    no llega) y su status ("completed", "incomplete" o None si el stream se cortó).
+    """
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    final_text = None
+    status = None
+    for event in dispatcher.stream(api_params):
+        event_type = getattr(event, "type", "")
+        if event_type == "response.output_text.delta":
+            if first_token is None:
+                first_token = time.perf_counter() - started
+                logger.info(f"OpenAI {label}: primer token en {first_token:.2f}s")
+            parts.append(event.delta)
+            yield event.delta
+        elif event_type == "response.completed":
+            final_text = event.response.output_text
+            status = "completed"
+        elif event_type == "response.incomplete":
+            # Como en la ruta sin streaming: se devuelve lo generado (p. ej. cortado por max_output_tokens)
+            details = getattr(event.response, "incomplete_details", None)
+            logger.warning(f"OpenAI {label}: respuesta incompleta ({getattr(details, 'reason', details)}), "
+                           f"se usa el texto recibido")
+            final_text = getattr(event.response, "output_text", None)
+            status = "incomplete"
+        elif event_type in ("response.failed", "error"):
+            raise RuntimeError(f"OpenAI streaming falló ({event_type}): {getattr(event, 'response', event)}")
+    text = "".join(parts)
+    if final_text is not None and final_text != text:
+        logger.warning(f"OpenAI {label}: el texto final difiere de los deltas recibidos")
+    logger.info(f"OpenAI {label}: {len(text)} caracteres en {time.perf_counter() - started:.2f}s "
+                f"(primer token {first_token or 0:.2f}s)")
+    return (final_text if final_text is not None else text), status
+
+
+def _cached_stream(dispatcher: LLMDispatcher, api_params: Dict[str, Any], label: str,
+                   force_regenerate: bool = False) -> Iterator[str]:
+    """_stream_text pasando por la caché del LLM: un hit se entrega como un único delta."""
+    cache = get_llm_cache()
+    cached = cache.get(api_params, force=force_regenerate) if cache else None
+    if cached is not None:
+        logger.info(f"OpenAI {label}: desde caché LLM")
+        yield cached
+        return cached
+    text, status = yield from _stream_text(dispatcher, api_params, label)
+    _cache_if_completed(cache, api_params, text, status, label)
+    return text
+
+
+def _cache_if_completed(cache, api_params: Dict[str, Any], text: str, status: Optional[str], label: str):
+    """Guarda la respuesta en la caché del LLM solo si terminó ("completed"): un texto
+    cortado (ej. por max_output_tokens) no debe volver como hit en las próximas corridas."""
+    if status != "completed":
+        logger.warning(f"OpenAI {label}: respuesta con status {status}, no se guarda en la caché LLM")
+    elif cache:
+        cache.set(api_params, text)
+
+
+def collect_stream(stream: Iterator[str], on_delta: Optional[Callable[[str], None]] = None) -> str:
+    """Consume un stream de stream_*_with_openai llamando a `on_delta` y devuelve el texto final."""
+    while True:
+        try:
+            delta = next(stream)
+        except StopIteration as stop:
+            return stop.value
+        if on_delta:
+            on_delta(delta)
 
 
 def build_outline(keyword: str, *, scraped: pd.DataFrame, paa: List[str], 
                  related: List[str], ai_overview: List[str], videos: List[dict] = None, 
                  top_stories: List[dict] = None, related_searches: List[str] = None,
                  images: List[dict] = None, twitter: List[dict] = None,
-                 carousel: List[dict] = None, knowledge_graph: List[dict] = None) -> str:
-    """Compose a Markdown outline: H2/H3, PAA, gaps, multimedia suggestions."""
+                 carousel: List[dict] = None, knowledge_graph: List[dict] = None,
+                 grams: Optional[List[Tuple[str, int]]] = None) -> str:
+    """Compose a Markdown outline: H2/H3, PAA, gaps, multimedia suggestions.
+
+    `grams` son los n-gramas dominantes ya calculados (ej. NgramIndex.top); si no
+    vienen se extraen de los títulos de `scraped`. `scraped` puede ser un DataFrame o
+    la tabla Arrow de páginas (se lee sin copiar).
+    """
+    scraped = pages_frame(scraped)
     titles = [t for t in scraped["title"].dropna().tolist() if t]
     heads2 = [h for arr in scraped["h2"].dropna().tolist() for h in (arr or [])]
     heads3 = [h for arr in scraped["h3"].dropna().tolist() for h in (arr or [])]
-    grams = ngrams_top(titles, (1,2), 20)
+    if grams is None:
+        grams = ngrams_top(titles, (1,2), 20)
 
-    avg_len = int(scraped["len_words"].replace(0, np.nan).median(skipna=True) or 0)
+    avg_len = median_length_words(scraped)
     has_tables = scraped["has_tables"].sum() > 0
     has_lists = scraped["has_lists"].sum() > 0
 
@@ -288,13 +422,52 @@ def generate_article_with_openai(keyword: str, outline: str, *, df: pd.DataFrame
                                 top_stories: list = None, related_searches: list = None, 
                                 images: list = None, twitter: list = None, carousel: list = None, 
                                 knowledge_graph: list = None, intent_label: str, intent_scores: dict, 
-                                model: str, api_key: str, temperature: float = None) -> str:
-    """Genera artículo completo usando OpenAI basándose en el outline"""
-    if not (OpenAI and api_key):
-        raise RuntimeError("OpenAI SDK not available or API key missing")
-    
-    client = OpenAI(api_key=api_key)
+                                model: str, api_key: str, temperature: float = None,
+                                force_regenerate: bool = False) -> str:
+    """Genera artículo completo usando OpenAI basándose en el outline (con caché, ver generate_outline_with_openai)"""
+    dispatcher = _dispatcher(api_key)
+    api_params = _article_request(
+        keyword, outline, df=df, paa=paa, related=related, ai_overview=ai_overview,
+        videos=videos, top_stories=top_stories, related_searches=related_searches,
+        images=images, twitter=twitter, carousel=carousel, knowledge_graph=knowledge_graph,
+        intent_label=intent_label, intent_scores=intent_scores, model=model,
+        temperature=temperature)
+
+    cache = get_llm_cache()
+    cached = cache.get(api_params, force=force_regenerate) if cache else None
+    if cached is not None:
+        logger.info(f"Artículo de '{keyword}' desde caché LLM")
+        return cached
+
+    resp = dispatcher.create(api_params)
 
+    # Extraer contenido del texto
+    if hasattr(resp, "output_text") and resp.output_text:
+        content = resp.output_text
+    elif hasattr(resp, 'content') and resp.content:
+        content = resp.content[0].text if hasattr(resp.content[0], 'text') else str(resp.content[0])
+    elif hasattr(resp, 'choices') and resp.choices:
+        content = resp.choices[0].message.content
+    else:
+        raise RuntimeError("Unexpected response format from OpenAI API")
+    _cache_if_completed(cache, api_params, content, getattr(resp, "status", None), f"artículo '{keyword}'")
+    return content
+
+
+def stream_article_with_openai(keyword: str, outline: str, *, api_key: str,
+                               force_regenerate: bool = False, **kwargs) -> Iterator[str]:
+    """Como generate_article_with_openai (mismos argumentos) pero entrega el texto a medida que llega."""
+    dispatcher = _dispatcher(api_key)
+    return _cached_stream(dispatcher, _article_request(keyword, outline, **kwargs), f"artículo '{keyword}'",
+                          force_regenerate)
+
+
+def _article_request(keyword: str, outline: str, *, df: pd.DataFrame, paa: list, related: list,
+                     ai_overview: list, videos: list, top_stories: list = None,
+                     related_searches: list = None, images: list = None, twitter: list = None,
+                     carousel: list = None, knowledge_graph: list = None, intent_label: str,
+                     intent_scores: dict, model: str, temperature: float = None) -> Dict[str, Any]:
+    """Parámetros de responses.create para el artículo."""
     # Preparar contexto para el artículo
     article_context = {
         "keyword": keyword,
@@ -313,7 +486,7 @@ def generate_article_with_openai(keyword: str, outline: str, *, df: pd.DataFrame
             "knowledge_graph": (knowledge_graph or [])[:5],
         },
         "competitor_insights": {
-            "median_length_words": int(df["len_words"].replace(0, np.nan).median(skipna=True) or 0),
+            "median_length_words": median_length_words(df),
             "common_sections": [h for arr in df["h2"].dropna().tolist() for h in (arr or [])][:20],
             "top_titles": [t for t in df["title"].dropna().tolist() if t][:10],
             "content_gaps": "Análisis de contenido competidor incluido en scraping"
@@ -332,18 +505,7 @@ def generate_article_with_openai(keyword: str, outline: str, *, df: pd.DataFrame
     # Solo agregar temperature si el modelo lo soporta
     if temperature is not None:
         api_params["temperature"] = temperature
-
-    resp = client.responses.create(**api_params)
-
-    # Extraer contenido del texto
-    if hasattr(resp, "output_text") and resp.output_text:
-        return resp.output_text
-    elif hasattr(resp, 'content') and resp.content:
-        return resp.content[0].text if hasattr(resp.content[0], 'text') else str(resp.content[0])
-    elif hasattr(resp, 'choices') and resp.choices:
-        return resp.choices[0].message.content
-    else:
-        raise RuntimeError("Unexpected response format from OpenAI API")
+    return api_params
 
 
 def generate_article_heuristic(keyword: str, outline: str, *, df: pd.DataFrame, 
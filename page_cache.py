@@ -0,0 +1,89 @@
+# page_cache.py
+# Caché persistente de páginas scrapeadas con revalidación condicional (ETag / Last-Modified)
+
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from cache_store import get_cache
+from config import PAGE_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Subir cuando cambie la lógica de extracción: invalida los resultados guardados
+# (se re-parsea el cuerpo almacenado sin volver a descargarlo)
+EXTRACTOR_VERSION = 4
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageCache:
+    """Guarda por URL los validadores HTTP, el hash del contenido y el resultado de extract_article.
+
+    Los cuerpos se guardan aparte, direccionados por su hash, así que dos URLs con el
+    mismo HTML comparten una sola copia.
+    """
+
+    def __init__(self, path: str = PAGE_CACHE_CONFIG["path"],
+                 max_bytes: int = PAGE_CACHE_CONFIG["max_bytes"]):
+        self.store = get_cache(path, max_bytes)
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(f"page:{url}")
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Cabeceras If-None-Match / If-Modified-Since para revalidar una entrada."""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def body(self, entry: Dict[str, Any]) -> Optional[bytes]:
+        return self.store.get_bytes(f"body:{entry['content_hash']}")
+
+    def result(self, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Resultado guardado, solo si lo produjo la versión actual del extractor."""
+        if entry and entry.get("extractor_version") == EXTRACTOR_VERSION:
+            return entry.get("result")
+        return None
+
+    def save(self, url: str, *, body: bytes, digest: str, etag: Optional[str],
+             last_modified: Optional[str], content_type: Optional[str], result: Dict[str, Any]):
+        if result.get("error") and not result.get("truncated"):
+            return
+        self.store.set_bytes(f"body:{digest}", body, ttl=PAGE_CACHE_CONFIG["ttl"])
+        self.store.set(f"page:{url}", {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": content_type,
+            "content_hash": digest,
+            "extractor_version": EXTRACTOR_VERSION,
+            "result": result,
+        }, ttl=PAGE_CACHE_CONFIG["ttl"])
+
+    def touch(self, url: str, entry: Dict[str, Any]):
+        """Renueva el TTL de la página y de su cuerpo tras una revalidación sin cambios
+        (304 o mismo hash), así solo vencen las páginas que dejan de consultarse."""
+        self.store.touch(f"page:{url}", ttl=PAGE_CACHE_CONFIG["ttl"])
+        self.store.touch(f"body:{entry['content_hash']}", ttl=PAGE_CACHE_CONFIG["ttl"])
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Instancia compartida de la caché de páginas, o None si está desactivada."""
+    global _page_cache
+    if not PAGE_CACHE_CONFIG["enabled"]:
+        return None
+    if _page_cache is None:
+        _page_cache = PageCache()
+    return _page_cache
@@ -0,0 +1,427 @@
+# pipeline.py
+# Pipeline por keyword (SERP → intent → scraping + autocomplete → outline) y ejecución
+# concurrente de varios keywords con paralelismo acotado por etapa.
+#
+# Nada de este módulo llama a Streamlit: los workers devuelven resultados y la UI
+# (o el runner por lotes) los muestra a medida que terminan.
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+from dataforseo_api import dfs_live_serp, get_autocomplete, parse_serp_features
+from scraper import DomainThrottle, ScrapeRegistry, extract_article, scrape_urls, get_parse_pool
+from analytics import NgramIndex, guess_intent, guess_intent_batch
+from serp_clustering import SerpClusterer
+from results_store import pages_frame, pages_table
+from llm_cache import get_llm_cache
+from llm_dispatcher import get_dispatcher
+from outline_generator import (
+    generate_outline_with_openai,
+    stream_outline_with_openai,
+    collect_stream,
+    build_outline,
+    generate_video_suggestions_markdown,
+    generate_top_stories_markdown,
+)
+
+logger = logging.getLogger(__name__)
+
+# Campos del índice de n-gramas que alimentan los temas del outline heurístico
+# (el cuerpo de texto aporta sobre todo palabras vacías)
+OUTLINE_NGRAM_FIELDS = ("title", "headings")
+
+
+class StageLimits:
+    """Semáforos que acotan cuántos keywords ejecutan cada etapa a la vez.
+
+    Permite, por ejemplo, tener muchos keywords scrapeando mientras solo dos
+    esperan al LLM. `timings` acumula el tiempo de espera y de ejecución por etapa.
+    """
+
+    def __init__(self, serp: int = 4, scrape: int = 3, llm: int = 2):
+        self._semaphores = {
+            "serp": threading.BoundedSemaphore(serp),
+            "scrape": threading.BoundedSemaphore(scrape),
+            "llm": threading.BoundedSemaphore(llm),
+        }
+
+    @contextmanager
+    def stage(self, name: str, timings: Dict[str, float]):
+        queued = time.perf_counter()
+        with self._semaphores[name]:
+            started = time.perf_counter()
+            timings[f"{name}_wait_s"] = round(started - queued, 3)
+            try:
+                yield
+            finally:
+                timings[f"{name}_s"] = round(time.perf_counter() - started, 3)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "StageLimits":
+        return cls(serp=config.get("serp_concurrency", 4),
+                   scrape=config.get("scrape_concurrency", 3),
+                   llm=config.get("llm_concurrency", 2))
+
+
+def urls_to_scrape(features: Dict[str, Any], top_n: int) -> List[Dict[str, Any]]:
+    """Combina los top_n orgánicos y hasta 3 top stories en la lista de URLs a scrapear"""
+    items = [{"title": item["title"], "url": item["url"], "source_type": "organic"}
+             for item in features["organic"][:top_n]]
+    # Agregar URLs de top stories (hasta 3 para no sobrecargar)
+    items += [{"title": story["title"], "url": story["url"], "source_type": "top_stories"}
+              for story in features["top_stories"][:3]]
+    return items
+
+
+def scrape_registry(config: Dict[str, Any]) -> ScrapeRegistry:
+    """Registro de scraping para una corrida, con la pausa por dominio de `config`."""
+    extract = partial(extract_article, engine=config.get("scraper_engine"), parse_pool=get_parse_pool())
+    return ScrapeRegistry(extract, DomainThrottle(config["pause"]))
+
+
+def fetch_features(kw: str, config: Dict[str, Any], limits: StageLimits,
+                   timings: Dict[str, float]) -> Dict[str, Any]:
+    """Consulta la SERP del keyword (dentro del límite de la etapa) y devuelve sus features."""
+    with limits.stage("serp", timings):
+        js = dfs_live_serp(
+            kw,
+            login=config["dfs_login"],
+            password=config["dfs_password"],
+            location_name=config["location_name"],
+            language_code=config["language_code"],
+            device=config["device"],
+            safe=config["safe"]
+        )
+    return parse_serp_features(js)
+
+
+def analyze_keyword(kw: str, config: Dict[str, Any], limits: Optional[StageLimits] = None,
+                    autocomplete_pool: Optional[ThreadPoolExecutor] = None,
+                    registry: Optional[ScrapeRegistry] = None,
+                    on_outline_delta: Optional[Callable[[str], None]] = None,
+                    ngram_index: Optional[NgramIndex] = None,
+                    features: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Ejecuta el análisis completo de un keyword y devuelve todo lo necesario para mostrarlo.
+
+    El autocompletado corre en paralelo al scraping. Con `registry` las URLs que ya
+    bajó (o está bajando) otro keyword de la corrida no se vuelven a descargar.
+    Con `on_outline_delta` el outline de OpenAI se pide en streaming y la función
+    recibe cada fragmento de texto a medida que llega (desde el hilo del worker).
+    Con `ngram_index` las páginas scrapeadas se suman al índice de n-gramas de la
+    corrida y el outline heurístico toma de ahí los temas dominantes (títulos y headings).
+    `features` evita volver a consultar la SERP si ya se obtuvo (ej. para clustering).
+    Las páginas quedan en `pages` (tabla Arrow, ver results_store.py) y en `df`, un
+    DataFrame sobre los mismos buffers.
+    Si falla la SERP el resultado trae `error` y el resto de campos vacíos; los
+    fallos no fatales (ej. OpenAI) quedan en `warnings`.
+    """
+    limits = limits or StageLimits.from_config(config)
+    timings: Dict[str, float] = {}
+    result: Dict[str, Any] = {"keyword": kw, "warnings": [], "timings": timings, "error": None}
+    logger.info(f"--- PROCESANDO KEYWORD: {kw} ---")
+
+    # Consultar SERP via DataForSEO
+    if features is None:
+        try:
+            features = fetch_features(kw, config, limits, timings)
+        except Exception as e:
+            logger.error(f"Error consultando SERP para '{kw}': {str(e)}")
+            result["error"] = f"Error consultando SERP: {str(e)}"
+            return result
+    logger.info(f"Features parseadas para '{kw}': " + ", ".join(f"{k}={len(v)}" for k, v in features.items()))
+
+    organic = features["organic"][:config["top_n"]]
+    result.update(features=features, organic=organic)
+
+    # Análisis de intent
+    intent_label, intent_scores = guess_intent(organic, features["paa"], features)
+    logger.info(f"Intent detectado para '{kw}': {intent_label}")
+    result.update(intent_label=intent_label, intent_scores=intent_scores)
+
+    # Autocomplete en paralelo al scraping
+    fetch_auto = partial(get_autocomplete, kw, contry_iso_code=config["country_iso_code"],
+                         lang_iso=config["lang_iso_code"])
+    auto_future = autocomplete_pool.submit(fetch_auto) if autocomplete_pool else None
+
+    # Scraping de resultados (organic + top stories)
+    all_urls_to_scrape = urls_to_scrape(features, config["top_n"])
+    result["urls_to_scrape"] = all_urls_to_scrape
+    if registry:
+        # La pausa por dominio la aplica el registro, solo en descargas reales
+        scrape_options = dict(pause=0, extract=registry.extract)
+    else:
+        scrape_options = dict(pause=config["pause"],
+                              extract=partial(extract_article, engine=config.get("scraper_engine"),
+                                              parse_pool=get_parse_pool()))
+    with limits.stage("scrape", timings):
+        rows = scrape_urls(all_urls_to_scrape, max_workers=config["max_workers"], **scrape_options)
+    # Tabla Arrow de las páginas; el DataFrame es una vista sobre los mismos buffers
+    pages = pages_table(kw, rows)
+    df = pages_frame(pages)
+    result.update(pages=pages, df=df)
+    if ngram_index is not None:
+        ngram_index.add_pages(kw, rows)
+    logger.info(f"DataFrame de '{kw}': shape={df.shape}")
+
+    try:
+        auto = auto_future.result() if auto_future else fetch_auto()
+    except Exception as e:
+        logger.error(f"Error obteniendo autocomplete para '{kw}': {str(e)}")
+        auto = []
+    result["auto"] = auto
+    related_searches = features["related_searches"]
+    related = related_searches
+
+    # Generar outline
+    outline_md = None
+    if config.get("use_openai") and config.get("openai_key"):
+        try:
+            openai_args = openai_outline_args(result, config)
+            with limits.stage("llm", timings):
+                if on_outline_delta:
+                    outline_md = collect_stream(stream_outline_with_openai(kw, **openai_args),
+                                                on_outline_delta)
+                else:
+                    outline_md = generate_outline_with_openai(kw, **openai_args)
+            result["outline_source"] = "openai"
+            llm_cache = get_llm_cache()
+            result["llm_cache"] = llm_cache.last_lookup() if llm_cache else None
+            if result["llm_cache"] != "hit":
+                # Espera por límites de OpenAI (RPM/TPM, concurrencia, reintentos)
+                timings["llm_queue_s"] = round(get_dispatcher(config["openai_key"]).last_wait() or 0.0, 3)
+        except Exception as e:
+            logger.error(f"Error generando outline con OpenAI para '{kw}': {str(e)}")
+            result["warnings"].append(f"Outline con OpenAI falló ({e}). Usando outline heurístico.")
+            outline_md = None
+
+    if not outline_md:
+        outline_md = build_outline(
+            kw,
+            scraped=df,
+            paa=features["paa"],
+            related=related or auto,
+            ai_overview=features["ai_overview"],
+            videos=features["videos"],
+            top_stories=features["top_stories"],
+            related_searches=related_searches,
+            images=features["images"],
+            twitter=features["twitter"],
+            carousel=features["carousel"],
+            knowledge_graph=features["knowledge_graph"],
+            grams=ngram_index.top(kw, 20, fields=OUTLINE_NGRAM_FIELDS) if ngram_index is not None else None
+        )
+        result["outline_source"] = "heuristic"
+
+    result.update(outline_md=outline_md, full_outline_md=full_outline(outline_md, features))
+
+    logger.info(f"=== PROCESAMIENTO COMPLETADO PARA: {kw} === tiempos: {timings}")
+    return result
+
+
+def openai_outline_args(result: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """Argumentos de generate_outline_with_openai para un resultado de analyze_keyword."""
+    features = result["features"]
+    return dict(
+        df=result["df"],
+        paa=features["paa"],
+        related=features["related_searches"] or result["auto"] or [],
+        ai_overview=features["ai_overview"],
+        videos=features["videos"],
+        top_stories=features["top_stories"],
+        related_searches=features["related_searches"],
+        images=features["images"],
+        twitter=features["twitter"],
+        carousel=features["carousel"],
+        knowledge_graph=features["knowledge_graph"],
+        intent_label=result["intent_label"],
+        intent_scores=result["intent_scores"],
+        model=config["openai_model"],
+        api_key=config["openai_key"],
+        temperature=config["openai_temperature"],
+        force_regenerate=config.get("force_regenerate", False),
+    )
+
+
+def full_outline(outline_md: str, features: Dict[str, Any]) -> str:
+    """Outline más sugerencias de video y top stories, para exportación."""
+    full_outline_md = outline_md
+    video_suggestions_md = generate_video_suggestions_markdown(features["videos"])
+    top_stories_md = generate_top_stories_markdown(features["top_stories"])
+    if video_suggestions_md:
+        full_outline_md += "\n\n" + video_suggestions_md
+    if top_stories_md:
+        full_outline_md += "\n\n" + top_stories_md
+    return full_outline_md
+
+
+def run_keywords(keywords: List[str], config: Dict[str, Any], max_parallel: Optional[int] = None,
+                 registry: Optional[ScrapeRegistry] = None,
+                 on_outline_delta: Optional[Callable[[str, str], None]] = None,
+                 ngram_index: Optional[NgramIndex] = None,
+                 clusterer: Optional[SerpClusterer] = None,
+                 serp_features: Optional[Dict[str, Dict[str, Any]]] = None
+                 ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Analiza varios keywords en paralelo y entrega (keyword, resultado) a medida que terminan.
+
+    `max_parallel` (o config["keyword_workers"]) acota los keywords en vuelo; cada
+    etapa tiene además su propio límite (StageLimits.from_config). Todos los keywords
+    comparten `registry` (por defecto uno nuevo con scrape_registry(config)); pasarlo
+    permite consultar sus stats al terminar. `on_outline_delta(keyword, texto)` recibe
+    el outline en streaming (ver analyze_keyword). Con `ngram_index` las páginas de
+    todos los keywords se indexan a medida que se scrapean (consultable al terminar).
+    Con `clusterer` primero se consultan todas las SERP y solo se analiza el
+    representante de cada cluster (ver run_clustered). `serp_features` ({keyword:
+    features}) evita volver a pedir SERP ya obtenidas.
+    """
+    limits = StageLimits.from_config(config)
+    registry = registry or scrape_registry(config)
+    max_parallel = max_parallel or config.get("keyword_workers", 4)
+    if clusterer is not None:
+        yield from run_clustered(keywords, config, clusterer, limits=limits, max_parallel=max_parallel,
+                                 registry=registry, on_outline_delta=on_outline_delta,
+                                 ngram_index=ngram_index)
+        return
+    serp_features = serp_features or {}
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="keyword") as pool, \
+            ThreadPoolExecutor(max_workers=2, thread_name_prefix="autocomplete") as auto_pool:
+        futures = {pool.submit(analyze_keyword, kw, config, limits, auto_pool, registry,
+                               partial(on_outline_delta, kw) if on_outline_delta else None,
+                               ngram_index, serp_features.get(kw)): kw
+                   for kw in keywords}
+        for future in as_completed(futures):
+            kw = futures[future]
+            try:
+                yield kw, future.result()
+            except Exception as e:
+                logger.error(f"Error inesperado procesando '{kw}': {str(e)}")
+                yield kw, {"keyword": kw, "warnings": [], "timings": {},
+                           "error": f"Error inesperado: {str(e)}"}
+
+
+def fetch_all_features(keywords: List[str], config: Dict[str, Any], limits: Optional[StageLimits] = None
+                       ) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Dict[str, float]]]:
+    """Consulta las SERP de todos los keywords en paralelo: entrega (keyword, features, tiempos).
+
+    `features` es None si la consulta falló (el keyword se reintenta al analizarlo).
+    """
+    limits = limits or StageLimits.from_config(config)
+
+    def fetch(kw: str):
+        timings: Dict[str, float] = {}
+        try:
+            return kw, fetch_features(kw, config, limits, timings), timings
+        except Exception as e:
+            logger.error(f"Error consultando SERP para '{kw}': {str(e)}")
+            return kw, None, timings
+
+    with ThreadPoolExecutor(max_workers=max(1, config.get("serp_concurrency", 4)),
+                            thread_name_prefix="serp") as pool:
+        yield from pool.map(fetch, keywords)
+
+
+def cluster_member_result(kw: str, features: Dict[str, Any], intent: Tuple[str, Dict[str, float]],
+                          shared: Dict[str, Any], cluster: Dict[str, Any], config: Dict[str, Any],
+                          timings: Dict[str, float]) -> Dict[str, Any]:
+    """Resultado de un keyword que reutiliza el análisis y el outline de su representante.
+
+    Conserva SERP e intent propios; scraping, autocompletado y outline vienen del
+    representante (`shared`).
+    """
+    if shared.get("error"):
+        return {"keyword": kw, "warnings": [], "timings": timings, "cluster": cluster,
+                "error": f"Falló el representante del cluster «{cluster['representative']}»: {shared['error']}"}
+    organic = features["organic"][:config["top_n"]]
+    intent_label, intent_scores = intent
+    result = dict(shared, keyword=kw, warnings=list(shared["warnings"]), timings=timings,
+                  features=features, organic=organic, intent_label=intent_label,
+                  intent_scores=intent_scores, cluster=cluster)
+    result["full_outline_md"] = full_outline(shared["outline_md"], features)
+    return result
+
+
+def run_clustered(keywords: List[str], config: Dict[str, Any], clusterer: SerpClusterer, *,
+                  limits: Optional[StageLimits] = None, **kwargs) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Consulta todas las SERP, agrupa los keywords con resultados orgánicos parecidos y
+    analiza solo un representante por cluster.
+
+    Cada resultado trae `cluster` ({id, representative, size, similarity}); los demás
+    keywords del cluster se entregan justo después de su representante, con su SERP e
+    intent propios y el outline compartido. Los keywords cuya SERP falló se analizan
+    solos (se reintenta la consulta). `kwargs` van a run_keywords.
+    """
+    limits = limits or StageLimits.from_config(config)
+    features_by_kw: Dict[str, Dict[str, Any]] = {}
+    serp_timings: Dict[str, Dict[str, float]] = {}
+    for kw, features, timings in fetch_all_features(keywords, config, limits):
+        serp_timings[kw] = timings
+        if features is not None:
+            features_by_kw[kw] = features
+            clusterer.add(kw, features["organic"])
+    clustering = clusterer.clusters()
+    clusters = {c["representative"]: c for c in clustering["clusters"]}
+    # Intent de todos los keywords en una sola pasada
+    intents = dict(zip(features_by_kw, guess_intent_batch(
+        [dict(features, organic=features["organic"][:config["top_n"]]) for features in features_by_kw.values()])))
+    logger.info(f"Clustering SERP: {len(features_by_kw)} keywords → {len(clusters)} clusters "
+                f"({clusterer.stats()})")
+
+    def cluster_info(cluster: Dict[str, Any], kw: str) -> Dict[str, Any]:
+        return {"id": cluster["id"], "representative": cluster["representative"],
+                "size": cluster["size"], "similarity": cluster["similarity"][kw]}
+
+    # Los fallidos también van, sin features: analyze_keyword reintenta la SERP
+    to_analyze = list(clusters) + [kw for kw in keywords if kw not in features_by_kw]
+    for kw, result in run_keywords(to_analyze, config, serp_features=features_by_kw, **kwargs):
+        cluster = clusters.get(kw)
+        if kw in features_by_kw:
+            result.setdefault("timings", {}).update(serp_timings[kw])
+        if cluster is None:
+            yield kw, result
+            continue
+        result["cluster"] = cluster_info(cluster, kw)
+        yield kw, result
+        for member in cluster["keywords"]:
+            if member != kw:
+                yield member, cluster_member_result(member, features_by_kw[member], intents[member], result,
+                                                    cluster_info(cluster, member), config,
+                                                    dict(serp_timings[member]))
+
+
+def keyword_events(keywords: List[str], config: Dict[str, Any], **kwargs) -> Iterator[Tuple[str, str, Any]]:
+    """Como run_keywords pero también entrega el outline en streaming, en el hilo que itera.
+
+    Produce ("delta", keyword, texto) por cada fragmento del outline de OpenAI y
+    ("done", keyword, resultado) cuando el keyword termina. Pensado para la UI, que
+    solo puede actualizar la página desde su propio hilo. Con `clusterer` los
+    keywords que comparten outline no generan "delta" propios (ver run_clustered).
+
+    Si la corrida falla en el hilo productor, la excepción se vuelve a lanzar acá, en
+    el hilo que itera, en vez de terminar como si la corrida hubiera concluido.
+    """
+    events: "queue.Queue[Optional[Tuple[str, str, Any]]]" = queue.Queue()
+
+    def produce():
+        try:
+            for kw, result in run_keywords(keywords, config, **kwargs,
+                                           on_outline_delta=lambda kw, text: events.put(("delta", kw, text))):
+                events.put(("done", kw, result))
+        except BaseException as e:
+            events.put(("error", "", e))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=produce, name="keyword-events", daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            return
+        if event[0] == "error":
+            raise event[2]
+        yield event
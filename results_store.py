@@ -0,0 +1,243 @@
+# results_store.py
+# Modelo columnar (Arrow) de los resultados de una corrida: páginas scrapeadas, features
+# de SERP y outlines de todos los keywords.
+#
+# Las filas del scraping se convierten una sola vez a una tabla Arrow con esquema fijo
+# (h2/h3 como list<string>, texto como large_string); el DataFrame que usa el resto de
+# la app es una vista pd.ArrowDtype sobre los mismos buffers, sin copiar. La corrida se
+# exporta como un dataset Parquet comprimido (zstd):
+#
+#   <dir>/pages/part-NNNNN.parquet     una fila por página (keyword, url, texto, headings...)
+#   <dir>/serp/part-NNNNN.parquet      una fila por elemento de SERP (keyword, feature, posición)
+#   <dir>/outlines/outlines.parquet    una fila por keyword (intent, outline, cluster)
+
+import io
+import logging
+import os
+import threading
+import zipfile
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+PARQUET_COMPRESSION = "zstd"
+
+PAGES_SCHEMA = pa.schema([
+    ("keyword", pa.string()),
+    ("rank", pa.int32()),
+    ("source_type", pa.string()),
+    ("url", pa.string()),
+    ("site", pa.string()),
+    ("title", pa.string()),
+    ("text", pa.large_string()),
+    ("h2", pa.list_(pa.string())),
+    ("h3", pa.list_(pa.string())),
+    ("len_words", pa.int32()),
+    ("has_tables", pa.bool_()),
+    ("has_lists", pa.bool_()),
+    ("truncated", pa.bool_()),
+    ("error", pa.string()),
+    ("wait_time_s", pa.float64()),
+    ("fetch_time_s", pa.float64()),
+])
+
+SERP_SCHEMA = pa.schema([
+    ("keyword", pa.string()),
+    ("feature", pa.string()),
+    ("position", pa.int32()),
+    ("title", pa.string()),
+    ("url", pa.string()),
+    ("text", pa.string()),
+])
+
+OUTLINES_SCHEMA = pa.schema([
+    ("keyword", pa.string()),
+    ("error", pa.string()),
+    ("intent_label", pa.string()),
+    ("intent_scores", pa.map_(pa.string(), pa.float64())),
+    ("outline_source", pa.string()),
+    ("llm_cache", pa.string()),
+    ("outline_md", pa.large_string()),
+    ("cluster_id", pa.int32()),
+    ("cluster_representative", pa.string()),
+])
+
+
+def pages_table(keyword: str, rows: List[Dict[str, Any]]) -> pa.Table:
+    """Tabla Arrow de las filas de scrape_urls de un keyword (columnas de PAGES_SCHEMA)."""
+    return pa.Table.from_pylist([dict(row, keyword=keyword) for row in rows], schema=PAGES_SCHEMA)
+
+
+def pages_frame(pages: Any) -> pd.DataFrame:
+    """DataFrame respaldado por Arrow (pd.ArrowDtype) sobre los buffers de la tabla, sin copiar.
+
+    Un DataFrame se devuelve tal cual, así las funciones de análisis aceptan ambos.
+    """
+    if isinstance(pages, pa.Table):
+        return pages.to_pandas(types_mapper=pd.ArrowDtype)
+    return pages
+
+
+def parquet_bytes(table: Any, compression: str = PARQUET_COMPRESSION) -> bytes:
+    """Tabla Arrow (o DataFrame) serializada como Parquet en memoria."""
+    if not isinstance(table, pa.Table):
+        table = pa.Table.from_pandas(table, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression=compression)
+    return sink.getvalue().to_pybytes()
+
+
+def serp_table(keyword: str, features: Dict[str, Any]) -> pa.Table:
+    """Features de parse_serp_features en formato largo: una fila por elemento."""
+    rows = []
+    for feature, items in features.items():
+        for position, item in enumerate(items or [], 1):
+            if isinstance(item, dict):
+                text = item.get("snippet") or item.get("description") or item.get("tweet") or item.get("alt")
+                rows.append({"keyword": keyword, "feature": feature, "position": position,
+                             "title": item.get("title"), "url": item.get("url"), "text": text})
+            else:
+                rows.append({"keyword": keyword, "feature": feature, "position": position,
+                             "title": None, "url": None, "text": str(item)})
+    return pa.Table.from_pylist(rows, schema=SERP_SCHEMA)
+
+
+def outlines_table(results: Iterable[Dict[str, Any]]) -> pa.Table:
+    """Una fila por keyword a partir de resultados de analyze_keyword o registros de batch_runner."""
+    rows = []
+    for result in results:
+        cluster = result.get("cluster") or {}
+        rows.append({
+            "keyword": result["keyword"],
+            "error": result.get("error"),
+            "intent_label": result.get("intent_label"),
+            "intent_scores": list((result.get("intent_scores") or {}).items()),
+            "outline_source": result.get("outline_source"),
+            "llm_cache": result.get("llm_cache"),
+            # Los resultados traen el outline completo en full_outline_md; los registros, en outline_md
+            "outline_md": result.get("full_outline_md") or result.get("outline_md"),
+            "cluster_id": cluster.get("id"),
+            "cluster_representative": cluster.get("representative"),
+        })
+    return pa.Table.from_pylist(rows, schema=OUTLINES_SCHEMA)
+
+
+def write_outlines(dataset_dir: str, outlines: pa.Table) -> int:
+    """Reemplaza <dataset_dir>/outlines/outlines.parquet (escritura atómica). Devuelve las filas."""
+    if not outlines.num_rows:
+        return 0
+    table_dir = os.path.join(dataset_dir, "outlines")
+    os.makedirs(table_dir, exist_ok=True)
+    tmp_path = os.path.join(table_dir, "outlines.parquet.tmp")
+    pq.write_table(outlines, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, os.path.join(table_dir, "outlines.parquet"))
+    return outlines.num_rows
+
+
+def load_table(dataset_dir: str, name: str, keyword: Optional[str] = None) -> pa.Table:
+    """Lee una tabla del dataset Parquet (opcionalmente solo las filas de un keyword)."""
+    dataset = ds.dataset(os.path.join(dataset_dir, name), format="parquet")
+    return dataset.to_table(filter=ds.field("keyword") == keyword if keyword is not None else None)
+
+
+class ResultsStore:
+    """Acumula páginas, SERP y outlines de una corrida como chunks de tablas Arrow.
+
+    Las páginas de un keyword agrupado por SERP quedan bajo su representante (ver la
+    columna cluster_representative de outlines).
+
+    `pages(keyword)` devuelve la tabla del keyword y `pages()` la de toda la corrida
+    (pa.concat_tables: encadena chunks, no copia). `write_dataset()` agrega a disco lo
+    nuevo desde la última escritura, así se puede volcar por tandas en corridas largas.
+    """
+
+    TABLES = ("pages", "serp")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunks: Dict[str, List[pa.Table]] = {name: [] for name in self.TABLES}
+        self._written = {name: 0 for name in self.TABLES}
+        self._pages: Dict[str, pa.Table] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, result: Dict[str, Any]):
+        """Agrega un resultado de analyze_keyword (usa result["pages"] si ya es Arrow)."""
+        keyword = result["keyword"]
+        pages = result.get("pages")
+        if pages is None:
+            df = result.get("df")
+            pages = pages_table(keyword, df.to_dict("records") if df is not None else [])
+        serp = serp_table(keyword, result.get("features") or {})
+        # Los miembros de un cluster comparten las páginas del representante: se guardan una vez
+        representative = (result.get("cluster") or {}).get("representative")
+        with self._lock:
+            if representative in (None, keyword):
+                self._chunks["pages"].append(pages)
+            self._chunks["serp"].append(serp)
+            self._pages[keyword] = pages
+            # Para outlines solo hace falta el resumen, no el DataFrame ni las features
+            self._results[keyword] = {k: result.get(k) for k in (
+                "keyword", "error", "intent_label", "intent_scores", "outline_source", "llm_cache",
+                "full_outline_md", "outline_md", "cluster")}
+
+    def pages(self, keyword: Optional[str] = None) -> pa.Table:
+        with self._lock:
+            if keyword is not None:
+                return self._pages.get(keyword, PAGES_SCHEMA.empty_table())
+            chunks = list(self._chunks["pages"])
+        return pa.concat_tables(chunks) if chunks else PAGES_SCHEMA.empty_table()
+
+    def serp(self) -> pa.Table:
+        with self._lock:
+            chunks = list(self._chunks["serp"])
+        return pa.concat_tables(chunks) if chunks else SERP_SCHEMA.empty_table()
+
+    def outlines(self) -> pa.Table:
+        with self._lock:
+            results = list(self._results.values())
+        return outlines_table(results)
+
+    def write_dataset(self, dataset_dir: str, outlines: bool = True) -> Dict[str, int]:
+        """Escribe en `dataset_dir` las páginas y SERP nuevas desde la última llamada (un
+        part-NNNNN.parquet por tabla) y, con `outlines`, reemplaza outlines.parquet.
+
+        Devuelve las filas escritas por tabla.
+        """
+        written = {}
+        for name in self.TABLES:
+            with self._lock:
+                chunks = self._chunks[name][self._written[name]:]
+                self._written[name] += len(chunks)
+            table = pa.concat_tables(chunks) if chunks else None
+            written[name] = table.num_rows if table is not None else 0
+            if not written[name]:
+                continue
+            table_dir = os.path.join(dataset_dir, name)
+            os.makedirs(table_dir, exist_ok=True)
+            part = len([f for f in os.listdir(table_dir) if f.endswith(".parquet")])
+            pq.write_table(table, os.path.join(table_dir, f"part-{part:05d}.parquet"),
+                           compression=PARQUET_COMPRESSION)
+        if outlines:
+            written["outlines"] = write_outlines(dataset_dir, self.outlines())
+        logger.info(f"Dataset Parquet en {dataset_dir}: {written}")
+        return written
+
+    def to_zip(self) -> bytes:
+        """pages/serp/outlines como Parquet dentro de un zip en memoria (para descargar)."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+            for name, table in (("pages", self.pages()), ("serp", self.serp()), ("outlines", self.outlines())):
+                archive.writestr(f"{name}.parquet", parquet_bytes(table))
+        return buffer.getvalue()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"keywords": len(self._results),
+                    "pages": sum(t.num_rows for t in self._chunks["pages"]),
+                    "serp_items": sum(t.num_rows for t in self._chunks["serp"]),
+                    "arrow_bytes": sum(t.nbytes for chunks in self._chunks.values() for t in chunks)}
@@ -1,25 +1,228 @@
 # scraper.py
 # Funciones para extraer contenido de páginas web
 
-import random
+import codecs
 import requests, urllib
 import logging
+import threading
+import time
+import multiprocessing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from curl_cffi import requests as curl_requests
-from typing import Dict, Any
-from bs4 import BeautifulSoup, Comment
+from typing import Dict, Any, List, Optional, Callable, Iterator
+from bs4 import BeautifulSoup, Comment, Tag, NavigableString, CData
+import lxml.html
+from lxml import etree
 import re
-from config import USER_AGENTS
+from config import SCRAPER_CONFIG
+from page_cache import get_page_cache, content_hash
 
 logger = logging.getLogger(__name__)
 
 
-def http_get(url: str, timeout: int = 30) -> str:
-    """Realiza una petición HTTP GET con User-Agent aleatorio"""
-    headers = {"User-Agent": random.choice(USER_AGENTS)}
-    r = curl_requests.get(url, impersonate='chrome', timeout=timeout)
-    if r.status_code != 200:
-        raise ValueError(f"Error al realizar la petición: {r.status_code}") 
-    return r.text
+class SkippedPage(Exception):
+    """La URL no se descarga (tipo de contenido no HTML)"""
+
+
+class FetchedPage:
+    """Respuesta descargada en streaming: status, cabeceras, cuerpo y motivo de truncado"""
+
+    __slots__ = ("status_code", "headers", "content", "truncated")
+
+    def __init__(self, status_code: int, headers, content: bytes, truncated: Optional[str] = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.truncated = truncated
+
+
+def _truncate_html(body: bytes, limit: int) -> bytes:
+    """Corta en el último '>' antes del límite para no dejar una etiqueta a medias"""
+    cut = body.rfind(b">", 0, limit)
+    return body[:cut + 1] if cut != -1 else body[:limit]
+
+
+def http_fetch(url: str, timeout: int = 30, headers: Optional[Dict[str, str]] = None,
+               max_bytes: Optional[int] = None) -> FetchedPage:
+    """GET en streaming con impersonación de Chrome; acepta 200 y 304 (revalidación condicional).
+
+    Antes de bajar el cuerpo revisa Content-Type (omite lo que no es HTML) y
+    Content-Length; corta la descarga al llegar a `max_bytes` y trunca en un
+    límite de etiqueta seguro.
+    """
+    max_bytes = max_bytes or SCRAPER_CONFIG["max_bytes"]
+    r = curl_requests.get(url, impersonate='chrome', timeout=timeout, headers=headers or None,
+                          stream=True)
+    try:
+        if r.status_code not in (200, 304):
+            raise ValueError(f"Error al realizar la petición: {r.status_code}") 
+        if r.status_code == 304:
+            return FetchedPage(304, r.headers, b"")
+
+        content_type = (r.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type and content_type not in SCRAPER_CONFIG["allowed_content_types"]:
+            raise SkippedPage(f"Omitida: Content-Type {content_type} no es HTML")
+        declared = int(r.headers.get("Content-Length") or 0)
+        if declared > max_bytes:
+            logger.info(f"Content-Length {declared} supera el límite de {max_bytes} bytes: {url}")
+
+        chunks, size, truncated = [], 0, None
+        for chunk in r.iter_content(chunk_size=SCRAPER_CONFIG["chunk_size"]):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                truncated = (f"Truncada: el cuerpo supera {max_bytes // 1024} KB"
+                             + (f" (Content-Length {declared})" if declared else ""))
+                break
+        body = b"".join(chunks)
+        if truncated:
+            body = _truncate_html(body, max_bytes)
+            logger.warning(f"{truncated}: {url}")
+        return FetchedPage(r.status_code, r.headers, body, truncated)
+    finally:
+        r.close()
+
+
+# Elementos no deseados (scripts, styles, navigation, etc.)
+UNWANTED_TAGS = frozenset([
+    "script", "style", "nav", "header", "footer", "aside",
+    "noscript", "iframe", "form", "button"
+])
+
+# Clases/ids comunes de navegación, ads, etc. (búsqueda parcial, sin distinguir mayúsculas)
+UNWANTED_PATTERNS = [
+    'nav', 'navigation', 'menu', 'sidebar', 'footer', 'header',
+    'ad', 'ads', 'advertisement', 'promo', 'banner',
+    'social', 'share', 'related', 'comment', 'widget'
+]
+_UNWANTED_ATTR_RE = re.compile("|".join(UNWANTED_PATTERNS), re.I)
+
+
+def _is_boilerplate(tag: Tag) -> bool:
+    """True si la etiqueta o alguna de sus clases / su id coincide con UNWANTED_TAGS / UNWANTED_PATTERNS"""
+    if tag.name in UNWANTED_TAGS:
+        return True
+    classes = tag.get("class")
+    if classes:
+        if not isinstance(classes, str):
+            classes = " ".join(classes)
+        if _UNWANTED_ATTR_RE.search(classes):
+            return True
+    tag_id = tag.get("id")
+    return bool(tag_id and _UNWANTED_ATTR_RE.search(tag_id))
+
+
+def strip_boilerplate(soup: BeautifulSoup) -> None:
+    """Elimina en un único recorrido del árbol los elementos no deseados y los comentarios.
+
+    Equivale a los pases sucesivos de find_all por etiqueta, por comentario y por
+    cada patrón de clase/id: un elemento eliminado se descarta con todo su subárbol,
+    así que no se visitan sus descendientes.
+    """
+    stack = [soup]
+    while stack:
+        node = stack.pop()
+        for child in list(node.contents):
+            if isinstance(child, Tag):
+                if _is_boilerplate(child):
+                    child.decompose()
+                else:
+                    stack.append(child)
+            elif isinstance(child, Comment):
+                child.extract()
+
+
+# Elementos que cortan el texto en bloques (párrafos) al extraer el contenido principal
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "br", "caption", "dd", "details",
+    "dialog", "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th",
+    "thead", "tr", "ul",
+])
+
+
+class _BlockCollector:
+    """Acumula texto inline y lo corta en un bloque nuevo en cada límite de bloque"""
+
+    def __init__(self):
+        self.blocks = []
+        self._buffer = []
+
+    def add(self, text):
+        if text:
+            self._buffer.append(text)
+
+    def flush(self):
+        if self._buffer:
+            block = re.sub(r'\s+', ' ', "".join(self._buffer)).strip()
+            if block:
+                self.blocks.append(block)
+            self._buffer = []
+
+
+def _block_texts_bs4(root) -> List[str]:
+    """Recorre el árbol de BeautifulSoup una vez y devuelve el texto por bloques.
+
+    Cada nodo de texto se emite una sola vez (a diferencia de get_text sobre cada
+    div anidado), así que el costo es lineal en el tamaño del documento.
+    """
+    collector = _BlockCollector()
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        if closing:
+            collector.flush()
+        elif isinstance(node, Tag):
+            if node.name in BLOCK_TAGS:
+                collector.flush()
+                stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.contents))
+        elif type(node) in (NavigableString, CData):
+            collector.add(str(node))
+    collector.flush()
+    return collector.blocks
+
+
+def _block_texts_lxml(root) -> List[str]:
+    """Versión lxml de _block_texts_bs4, con iterwalk (eventos de apertura y cierre)
+
+    Como BeautifulSoup, no emite el texto que queda dentro de <template>.
+    """
+    collector = _BlockCollector()
+    in_template = 0
+    for event, element in etree.iterwalk(root, events=("start", "end")):
+        is_element = isinstance(element.tag, str)
+        block = is_element and element.tag in BLOCK_TAGS
+        if event == "start":
+            if block:
+                collector.flush()
+            if element.tag == "template":
+                in_template += 1
+            if is_element and not in_template:
+                collector.add(element.text)
+        else:
+            if block:
+                collector.flush()
+            if element.tag == "template":
+                in_template -= 1
+            if element is not root and not in_template:
+                collector.add(element.tail)
+    collector.flush()
+    return collector.blocks
+
+
+def compose_text(blocks: List[str]) -> str:
+    """Une los bloques de texto en párrafos separados por línea en blanco.
+
+    Descarta bloques muy cortos (menús, etiquetas sueltas); si no queda suficiente
+    texto, usa todo el texto visible del contenido principal.
+    """
+    text = "\n\n".join(b for b in blocks if len(b) > 20)  # Filtrar textos muy cortos
+    if len(text.split()) < 50:
+        text = "\n\n".join(blocks)
+    return text
+
 
 def extract_domain(url: str) -> str:
     """Extrae el dominio base de una URL"""
@@ -38,15 +241,145 @@ def extract_domain(url: str) -> str:
         return ""
 
 
-def extract_article(url: str) -> Dict[str, Any]:
-    """Extrae contenido de una página web usando solo curl_cffi y BeautifulSoup"""
+# Parámetros de seguimiento que no cambian el contenido de la página
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|msclkid|mc_cid|mc_eid|_ga|ref_src)$", re.I)
+
+
+def normalize_url(url: str) -> str:
+    """Forma canónica de una URL para detectar la misma página entre keywords.
+
+    Esquema y host en minúsculas, sin puerto por defecto, sin fragmento, sin
+    parámetros de seguimiento (utm_*, gclid...) y con la query ordenada.
+    """
+    try:
+        parts = urllib.parse.urlsplit(url.strip())
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = urllib.parse.urlencode(sorted(
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k)))
+    return urllib.parse.urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def extract_article(url: str, use_cache: bool = True, engine: Optional[str] = None,
+                    parse_pool: Optional[Executor] = None) -> Dict[str, Any]:
+    """Extrae contenido de una página web usando curl_cffi y el motor de parseo elegido.
+
+    Con la caché de páginas activa, revalida con If-None-Match / If-Modified-Since:
+    ante un 304 (o un cuerpo con el mismo hash) devuelve el resultado guardado sin
+    volver a parsear. Con `parse_pool` (ver get_parse_pool) el parseo, que es CPU,
+    se hace en otro proceso y el hilo actual solo descarga.
+    """
     logger.info(f"Iniciando extracción de: {url}")
+    cache = get_page_cache() if use_cache else None
+    try:
+        if cache is None:
+            r = http_fetch(url)
+            logger.info(f"HTML obtenido: {len(r.content)} bytes")
+            return _mark_truncated(_parse(url, r.content, engine, r.headers.get("Content-Type"),
+                                          parse_pool), r)
+
+        entry = cache.lookup(url)
+        r = http_fetch(url, headers=cache.conditional_headers(entry))
+        content_type = r.headers.get("Content-Type") or (entry or {}).get("content_type")
+        if r.status_code == 304 and entry:
+            cached = cache.result(entry)
+            if cached is not None:
+                logger.info(f"Página sin cambios (304), usando caché: {url}")
+                cache.touch(url, entry)
+                return cached
+            body = cache.body(entry)
+            if body is None:
+                r = http_fetch(url)
+        if r.status_code == 200:
+            body = r.content
+        logger.info(f"HTML obtenido: {len(body)} bytes")
+        digest = content_hash(body)
+        if entry and entry.get("content_hash") == digest:
+            cached = cache.result(entry)
+            if cached is not None:
+                logger.info(f"Contenido idéntico al guardado, usando caché: {url}")
+                cache.touch(url, entry)
+                return cached
+        result = _mark_truncated(_parse(url, body, engine, content_type, parse_pool), r)
+        cache.save(url, body=body, digest=digest,
+                   etag=r.headers.get("ETag") or (entry or {}).get("etag"),
+                   last_modified=r.headers.get("Last-Modified") or (entry or {}).get("last_modified"),
+                   content_type=content_type, result=result)
+        return result
+    except Exception as e:
+        logger.error(f"Error en extract_article para {url}: {str(e)}")
+        return _failed_extraction(url, e)
+
+
+def _parse(url: str, body: bytes, engine: Optional[str], content_type: Optional[str],
+           parse_pool: Optional[Executor]) -> Dict[str, Any]:
+    engine = engine or SCRAPER_CONFIG["engine"]
+    if parse_pool is not None:
+        try:
+            return parse_pool.submit(parse_article, url, body, engine, content_type).result()
+        except Exception as e:
+            logger.warning(f"Pool de parseo no disponible ({e}), parseando en el hilo actual")
+    return parse_article(url, body, engine=engine, content_type=content_type)
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de procesos compartido para parsear HTML (None si parse_processes es 0).
+
+    Se crea una sola vez por proceso y lo comparten todos los keywords, así el
+    parseo escala con los núcleos disponibles mientras los hilos siguen descargando.
+    """
+    global _parse_pool
+    processes = SCRAPER_CONFIG["parse_processes"]
+    if processes <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn: no hereda hilos ni conexiones abiertas del proceso de Streamlit
+            _parse_pool = ProcessPoolExecutor(max_workers=processes,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return _parse_pool
+
+
+def _mark_truncated(result: Dict[str, Any], page: FetchedPage) -> Dict[str, Any]:
+    """Anota en `error` que el contenido se extrajo de un cuerpo truncado"""
+    if page.truncated and not result.get("error"):
+        result["error"] = page.truncated
+        result["truncated"] = True
+    return result
+
+
+def parse_article(url: str, html, engine: Optional[str] = None,
+                  content_type: Optional[str] = None) -> Dict[str, Any]:
+    """Parsea el HTML (bytes o str) con el motor indicado ("lxml" o "bs4").
+
+    Si el motor lxml falla se reintenta con BeautifulSoup.
+    """
+    engine = engine or SCRAPER_CONFIG["engine"]
+    if engine == "lxml":
+        try:
+            return _parse_with_lxml(url, html, content_type)
+        except Exception as e:
+            logger.warning(f"Motor lxml falló para {url} ({e}), usando BeautifulSoup")
+    return _parse_with_bs4(url, html, content_type)
+
+
+def _parse_with_bs4(url: str, html, content_type: Optional[str] = None) -> Dict[str, Any]:
+    """Parsea el HTML con BeautifulSoup (sobre lxml)"""
     try:
-        html = http_get(url)
-        logger.info(f"HTML obtenido: {len(html)} caracteres")
-        
         # Parsear HTML con BeautifulSoup
-        soup = BeautifulSoup(html, "lxml")
+        if isinstance(html, bytes):
+            soup = BeautifulSoup(html, "lxml", from_encoding=_header_charset(content_type))
+        else:
+            soup = BeautifulSoup(html, "lxml")
         logger.info("HTML parseado con BeautifulSoup")
         
         # Extraer título
@@ -62,27 +395,8 @@ def extract_article(url: str) -> Dict[str, Any]:
             headings = soup.find_all(f"h{i}")
             h_tags[f"h{i}"] = [h.get_text(strip=True) for h in headings if h.get_text(strip=True)]
         
-        # Remover elementos no deseados (scripts, styles, navigation, etc.)
-        for element in soup(["script", "style", "nav", "header", "footer", "aside", 
-                           "noscript", "iframe", "form", "button"]):
-            element.decompose()
-        
-        # Remover comentarios HTML
-        for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
-        
-        # Remover elementos con clases/ids comunes de navegación, ads, etc.
-        unwanted_patterns = [
-            'nav', 'navigation', 'menu', 'sidebar', 'footer', 'header',
-            'ad', 'ads', 'advertisement', 'promo', 'banner',
-            'social', 'share', 'related', 'comment', 'widget'
-        ]
-        
-        for pattern in unwanted_patterns:
-            for element in soup.find_all(attrs={"class": re.compile(pattern, re.I)}):
-                element.decompose()
-            for element in soup.find_all(attrs={"id": re.compile(pattern, re.I)}):
-                element.decompose()
+        # Remover scripts, navegación, comentarios y bloques de ads/menús en una sola pasada
+        strip_boilerplate(soup)
         
         # Buscar el contenido principal
         main_content = None
@@ -112,26 +426,8 @@ def extract_article(url: str) -> Dict[str, Any]:
             if not main_content:
                 main_content = soup
         
-        # Extraer texto del contenido principal
-        text = ""
-        if main_content:
-            # Obtener todos los párrafos y elementos de texto
-            text_elements = main_content.find_all(['p', 'div', 'span', 'li', 'td', 'th'])
-            text_parts = []
-            
-            for element in text_elements:
-                element_text = element.get_text(strip=True)
-                if element_text and len(element_text) > 20:  # Filtrar textos muy cortos
-                    text_parts.append(element_text)
-            
-            text = " ".join(text_parts)
-            
-            # Si no hay suficiente texto, usar todo el texto visible
-            if len(text.split()) < 50:
-                text = main_content.get_text(" ", strip=True)
-        
-        # Limpiar texto
-        text = re.sub(r'\s+', ' ', text).strip()
+        # Extraer texto del contenido principal (una sola pasada, por bloques)
+        text = compose_text(_block_texts_bs4(main_content))
         
         # Detectar elementos estructurales
         has_tables = bool(soup.find_all("table"))
@@ -153,16 +449,331 @@ def extract_article(url: str) -> Dict[str, Any]:
         return result
     
     except Exception as e:
-        logger.error(f"Error en extract_article para {url}: {str(e)}")
-        return {
-            "url": url,
-            "site": extract_domain(url) if url else "",
-            "title": "",
-            "text": "",
-            "h2": [],
-            "h3": [],
-            "has_tables": False,
-            "has_lists": False,
-            "len_words": 0,
-            "error": str(e)
-        }
\ No newline at end of file
+        logger.error(f"Error en _parse_with_bs4 para {url}: {str(e)}")
+        return _failed_extraction(url, e)
+
+
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([-\w.:]+)""", re.I)
+
+# Selectores de contenido principal (mismo orden que content_selectors) compilados a XPath
+_CONTENT_XPATHS = [
+    (selector, etree.XPath(xpath)) for selector, xpath in [
+        ('article', '//article'),
+        ('[role="main"]', '//*[@role="main"]'),
+        ('main', '//main'),
+        ('.content', '//*[contains(concat(" ", normalize-space(@class), " "), " content ")]'),
+        ('.post-content', '//*[contains(concat(" ", normalize-space(@class), " "), " post-content ")]'),
+        ('.entry-content', '//*[contains(concat(" ", normalize-space(@class), " "), " entry-content ")]'),
+        ('.article-content', '//*[contains(concat(" ", normalize-space(@class), " "), " article-content ")]'),
+        ('#content', '//*[@id="content"]'),
+        ('#main-content', '//*[@id="main-content"]'),
+    ]
+]
+_HEADING_XPATHS = {f"h{i}": etree.XPath(f"//h{i}") for i in range(1, 7)}
+
+
+def _header_charset(content_type: Optional[str]) -> Optional[str]:
+    match = re.search(r"charset=([-\w.:]+)", content_type or "", re.I)
+    return match.group(1) if match else None
+
+
+def detect_charset(body: bytes, content_type: Optional[str] = None) -> str:
+    """Charset del documento: cabecera HTTP, BOM, <meta charset> o heurística utf-8 / cp1252"""
+    charset = _header_charset(content_type)
+    if not charset:
+        if body.startswith(b"\xef\xbb\xbf"):
+            charset = "utf-8"
+        elif body.startswith((b"\xff\xfe", b"\xfe\xff")):
+            charset = "utf-16"
+        else:
+            match = _CHARSET_RE.search(body[:4096])
+            charset = match.group(1).decode("ascii", "ignore") if match else None
+    if charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    try:
+        body.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "windows-1252"
+
+
+# get_text de BeautifulSoup no incluye el contenido de estos elementos (no es texto visible)
+_NON_TEXT_TAGS = frozenset(["script", "style", "template"])
+
+
+def _iter_text(element):
+    """Como element.itertext(), pero sin el texto de _NON_TEXT_TAGS ni de comentarios"""
+    if element.text and element.tag not in _NON_TEXT_TAGS:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+            yield from _iter_text(child)
+        if child.tail:
+            yield child.tail
+
+
+def _lxml_text(element, separator: str = "") -> str:
+    """Equivalente a get_text(separator, strip=True) de BeautifulSoup"""
+    return separator.join(s.strip() for s in _iter_text(element) if s.strip())
+
+
+def _is_boilerplate_lxml(element) -> bool:
+    return (element.tag in UNWANTED_TAGS
+            or bool(_UNWANTED_ATTR_RE.search(element.get("class") or ""))
+            or bool(_UNWANTED_ATTR_RE.search(element.get("id") or "")))
+
+
+def _strip_boilerplate_lxml(root):
+    """Versión lxml de strip_boilerplate: un recorrido, descartando subárboles eliminados.
+
+    Devuelve la raíz resultante (vacía si la propia raíz era boilerplate, como
+    ocurre con BeautifulSoup al eliminar <html class="sidebar-...">).
+    """
+    if _is_boilerplate_lxml(root):
+        return etree.Element("html")
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        for child in list(node):
+            if child.tag is etree.Comment:
+                child.drop_tree()  # drop_tree conserva el texto que sigue (tail)
+            elif not isinstance(child.tag, str):
+                continue
+            elif _is_boilerplate_lxml(child):
+                child.drop_tree()
+            else:
+                stack.append(child)
+    return root
+
+
+def _parse_with_lxml(url: str, html, content_type: Optional[str] = None) -> Dict[str, Any]:
+    """Parsea los bytes de la respuesta directamente con lxml.html (sin BeautifulSoup)"""
+    if isinstance(html, str):
+        html, charset = html.encode("utf-8"), "utf-8"
+    else:
+        charset = detect_charset(html, content_type)
+    parser = lxml.html.HTMLParser(encoding=charset)
+    root = lxml.html.document_fromstring(html, parser=parser)
+
+    # Extraer título
+    meta_title = ""
+    title = root.find(".//title")
+    if title is not None:
+        meta_title = _lxml_text(title)
+    else:
+        h1 = root.find(".//h1")
+        if h1 is not None:
+            meta_title = _lxml_text(h1)
+
+    # Extraer headings estructurados
+    h_tags = {}
+    for name, xpath in _HEADING_XPATHS.items():
+        h_tags[name] = [t for t in (_lxml_text(h) for h in xpath(root)) if t]
+
+    root = _strip_boilerplate_lxml(root)
+
+    # Buscar el contenido principal
+    main_content = None
+    for selector, xpath in _CONTENT_XPATHS:
+        found = xpath(root)
+        if found:
+            main_content = found[0]
+            logger.info(f"Contenido encontrado con selector: {selector}")
+            break
+    if main_content is None:
+        main_content = root.find("body")
+        if main_content is None:
+            main_content = root
+
+    # Extraer texto del contenido principal (una sola pasada, por bloques)
+    text = compose_text(_block_texts_lxml(main_content))
+
+    result = {
+        "url": url,
+        "site": extract_domain(url),
+        "title": meta_title,
+        "text": text,
+        "h2": h_tags.get("h2", []),
+        "h3": h_tags.get("h3", []),
+        "has_tables": root.find(".//table") is not None,
+        "has_lists": root.find(".//ul") is not None or root.find(".//ol") is not None,
+        "len_words": len(text.split()),
+    }
+    logger.info(f"Extracción exitosa (lxml): {result['len_words']} palabras, {len(result['h2'])} H2s, {len(result['h3'])} H3s")
+    return result
+
+
+def _failed_extraction(url: str, e: Exception) -> Dict[str, Any]:
+    return {
+        "url": url,
+        "site": extract_domain(url) if url else "",
+        "title": "",
+        "text": "",
+        "h2": [],
+        "h3": [],
+        "has_tables": False,
+        "has_lists": False,
+        "len_words": 0,
+        "error": str(e)
+    }
+
+
+class DomainThrottle:
+    """Espaciado mínimo entre peticiones a un mismo dominio (thread-safe).
+
+    Cada dominio tiene su propio reloj: dominios distintos se scrapean en paralelo,
+    pero dos peticiones al mismo dominio quedan separadas al menos `delay` segundos.
+    `domain_delays` permite reglas específicas por dominio (ej. {"youtube.com": 2.0}).
+    """
+
+    def __init__(self, delay: float = 0.8, domain_delays: Optional[Dict[str, float]] = None):
+        self.delay = delay
+        self.domain_delays = domain_delays or {}
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def delay_for(self, domain: str) -> float:
+        return self.domain_delays.get(domain, self.delay)
+
+    def wait(self, domain: str) -> float:
+        """Reserva el próximo turno del dominio y duerme hasta él. Devuelve la espera en segundos."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = start + self.delay_for(domain)
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class ScrapeRegistry:
+    """Registro de scraping compartido por todos los keywords de una corrida.
+
+    Envuelve `extract` (ej. extract_article): cada URL (normalizada con normalize_url)
+    se descarga y parsea una sola vez por corrida. Si otro keyword pide una URL ya
+    terminada recibe una copia del resultado; si la pide mientras se está bajando,
+    espera esa descarga en lugar de lanzar otra. `throttle` espacía solo las
+    descargas reales, así que la cortesía por dominio vale para toda la corrida.
+    """
+
+    def __init__(self, extract: Callable[[str], Dict[str, Any]] = extract_article,
+                 throttle: Optional[DomainThrottle] = None):
+        self._extract = extract
+        self.throttle = throttle
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "fetches": 0, "shared": 0, "coalesced": 0,
+                       "fetch_errors": 0, "throttle_wait_s": 0.0}
+
+    def extract(self, url: str) -> Dict[str, Any]:
+        key = normalize_url(url)
+        with self._lock:
+            self._stats["requests"] += 1
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self._stats["fetches"] += 1
+            else:
+                self._stats["shared" if future.done() else "coalesced"] += 1
+        if owner:
+            self._fetch(key, url, future)
+        else:
+            logger.info(f"Scraping compartido: {url} (ya {'descargada' if future.done() else 'en curso'})")
+        result = dict(future.result())
+        result["url"] = url
+        return result
+
+    def _fetch(self, key: str, url: str, future: Future):
+        try:
+            if self.throttle:
+                waited = self.throttle.wait(extract_domain(url))
+                with self._lock:
+                    self._stats["throttle_wait_s"] += waited
+            result = self._extract(url)
+        except BaseException as e:
+            # No dejar el error en el registro: un pedido posterior vuelve a intentar
+            with self._lock:
+                self._futures.pop(key, None)
+                self._stats["fetch_errors"] += 1
+            future.set_exception(e)
+            raise
+        if result.get("error"):
+            with self._lock:
+                self._stats["fetch_errors"] += 1
+        future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pedidos, descargas reales y descargas ahorradas (compartidas + coalescidas)."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["unique_urls"] = len(self._futures)
+        stats["fetches_saved"] = stats["shared"] + stats["coalesced"]
+        stats["throttle_wait_s"] = round(stats["throttle_wait_s"], 3)
+        return stats
+
+
+def _error_row(url: str, title: str, error: str) -> Dict[str, Any]:
+    return {
+        "url": url, "site": url, "title": title or "", "text": "",
+        "h2": [], "h3": [], "has_tables": False, "has_lists": False,
+        "len_words": 0, "error": error
+    }
+
+
+def iter_scrape_urls(items: List[Dict[str, Any]], *, max_workers: int = 6, pause: float = 0.8,
+                     domain_delays: Optional[Dict[str, float]] = None,
+                     extract: Callable[[str], Dict[str, Any]] = extract_article) -> Iterator[Dict[str, Any]]:
+    """Scrapea concurrentemente los resultados y entrega cada fila apenas termina.
+
+    Usa un pool de hilos acotado por `max_workers` y un `DomainThrottle` con `pause`
+    como espaciado por dominio (en lugar de la pausa global fija). Las filas llevan
+    `rank`, `source_type` y tiempos por URL (`wait_time_s`: espera por cortesía,
+    `fetch_time_s`: descarga + extracción), en orden de finalización.
+    """
+    throttle = DomainThrottle(pause, domain_delays)
+    jobs = [(i, item) for i, item in enumerate(items, 1) if item.get("url")]
+    for i, item in enumerate(items, 1):
+        if not item.get("url"):
+            logger.warning(f"URL vacía en resultado {i}")
+
+    def work(rank: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        url = item["url"]
+        title = item.get("title")
+        source_type = item.get("source_type", "organic")
+        logger.info(f"Scraping {rank}/{len(items)}: {url} (tipo: {source_type})")
+        waited = throttle.wait(extract_domain(url))
+        started = time.perf_counter()
+        try:
+            data = extract(url)
+            logger.info(f"Scraping exitoso: {url} -> {data.get('len_words', 0)} palabras")
+        except Exception as e:
+            logger.error(f"Error scraping {url}: {str(e)}")
+            data = _error_row(url, title, str(e))
+        data["rank"] = rank
+        data["source_type"] = source_type
+        if not data.get("title"):
+            data["title"] = title
+        data["wait_time_s"] = round(waited, 3)
+        data["fetch_time_s"] = round(time.perf_counter() - started, 3)
+        return data
+
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))),
+                            thread_name_prefix="scraper") as pool:
+        futures = [pool.submit(work, rank, item) for rank, item in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def scrape_urls(items: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+    """Como iter_scrape_urls pero espera a todas las URLs y devuelve las filas en orden de ranking."""
+    rows = sorted(iter_scrape_urls(items, **kwargs), key=lambda row: row["rank"])
+    logger.info(f"Scraping concurrente completado: {len(rows)} URLs, "
+                f"tiempo total de fetch {sum(r['fetch_time_s'] for r in rows):.2f}s")
+    return rows
@@ -0,0 +1,171 @@
+# serp_clustering.py
+# Agrupa keywords cuyas SERP comparten casi los mismos resultados orgánicos, para
+# generar un solo outline por grupo en lugar de uno por keyword.
+#
+# Cada keyword se resume en el conjunto de sus top URLs orgánicas (normalizadas) y en
+# una firma MinHash de ese conjunto. Las firmas se cortan en bandas (LSH): solo se
+# comparan los keywords que coinciden en alguna banda, así que no hace falta recorrer
+# todos los pares y escala a decenas de miles de keywords. Los candidatos se confirman
+# con el Jaccard exacto de los conjuntos.
+
+import hashlib
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+import numpy as np
+
+from config import SERP_CLUSTER_CONFIG
+from scraper import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Primo de Mersenne 2^31 - 1: con hashes de 32 bits, a*x + b entra en uint64 sin desbordar
+_PRIME = (1 << 31) - 1
+
+
+def url_hash(url: str) -> int:
+    """Hash estable de 32 bits de una URL (no depende de PYTHONHASHSEED)."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+class SerpClusterer:
+    """Clustering incremental de keywords por solapamiento de sus top URLs orgánicas.
+
+    `add()` calcula la firma MinHash (`num_perm` permutaciones) y la reparte en
+    `bands` buckets LSH; `clusters()` une los keywords que comparten bucket y cuyo
+    Jaccard exacto es >= `threshold` (enlace simple: A~B y B~C quedan juntos).
+    El umbral efectivo de las bandas ≈ (1/bands)^(bands/num_perm), por debajo de
+    `threshold` para no perder pares. Thread-safe: se puede alimentar desde los
+    workers a medida que llegan las SERP.
+    """
+
+    def __init__(self, threshold: float = SERP_CLUSTER_CONFIG["threshold"],
+                 num_perm: int = SERP_CLUSTER_CONFIG["num_perm"],
+                 bands: int = SERP_CLUSTER_CONFIG["bands"],
+                 top_n: int = SERP_CLUSTER_CONFIG["top_n"], seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) debe ser múltiplo de bands ({bands})")
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._keywords: List[str] = []
+        self._sets: List[FrozenSet[str]] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        self._stats = {"comparisons": 0, "candidate_buckets": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SerpClusterer":
+        return cls(threshold=config.get("cluster_threshold", SERP_CLUSTER_CONFIG["threshold"]),
+                   top_n=config.get("cluster_top_n", SERP_CLUSTER_CONFIG["top_n"]))
+
+    def url_set(self, organic: List[Dict[str, Any]]) -> FrozenSet[str]:
+        return frozenset(normalize_url(item["url"]) for item in organic[:self.top_n] if item.get("url"))
+
+    def signature(self, urls: FrozenSet[str]) -> np.ndarray:
+        """Firma MinHash: mínimo de (a·h(url) + b) mod p por permutación."""
+        hashes = np.fromiter((url_hash(u) for u in urls), dtype=np.uint64, count=len(urls))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, keyword: str, organic: List[Dict[str, Any]]) -> bool:
+        """Registra un keyword con sus resultados orgánicos (features["organic"]).
+
+        Un keyword sin URLs queda como cluster propio. Devuelve False si ya estaba.
+        """
+        urls = self.url_set(organic)
+        signature = self.signature(urls) if urls else None
+        with self._lock:
+            if keyword in self._index:
+                return False
+            i = self._index[keyword] = len(self._keywords)
+            self._keywords.append(keyword)
+            self._sets.append(urls)
+            if signature is not None:
+                for band in range(self.bands):
+                    key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                    self._buckets[(band, key)].append(i)
+        return True
+
+    def clusters(self) -> Dict[str, Any]:
+        """Asignación de clusters sobre lo agregado hasta ahora.
+
+        Devuelve {"assignments": {keyword: id}, "clusters": [{id, representative,
+        keywords, size, similarity}]}, con ids en orden de aparición. El representante
+        es el keyword cuyas URLs más se repiten dentro del cluster (el más "central");
+        `similarity` es el Jaccard de cada keyword con el representante.
+        """
+        with self._lock:
+            keywords, sets = list(self._keywords), list(self._sets)
+            buckets = [members for members in self._buckets.values() if len(members) > 1]
+        parent = list(range(len(keywords)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        comparisons = 0
+        for members in buckets:
+            # Cada miembro se compara contra un "ancla"; los que no se parecen pasan a la
+            # ronda siguiente con otra ancla (evita todos los pares en buckets grandes)
+            remaining = members
+            while len(remaining) > 1:
+                anchor, rest = remaining[0], []
+                for i in remaining[1:]:
+                    if find(i) == find(anchor):
+                        continue
+                    comparisons += 1
+                    if jaccard(sets[anchor], sets[i]) >= self.threshold:
+                        parent[find(i)] = find(anchor)
+                    else:
+                        rest.append(i)
+                remaining = rest
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(keywords)):
+            groups.setdefault(find(i), []).append(i)
+        assignments: Dict[str, int] = {}
+        clusters = []
+        for cluster_id, members in enumerate(groups.values()):
+            frequency = Counter(url for i in members for url in sets[i])
+            rep = max(members, key=lambda i: (sum(frequency[url] for url in sets[i]), -i))
+            for i in members:
+                assignments[keywords[i]] = cluster_id
+            clusters.append({
+                "id": cluster_id,
+                "representative": keywords[rep],
+                "keywords": [keywords[i] for i in members],
+                "size": len(members),
+                "similarity": {keywords[i]: round(jaccard(sets[rep], sets[i]), 3) for i in members},
+            })
+        with self._lock:
+            self._stats["comparisons"] = comparisons
+            self._stats["candidate_buckets"] = len(buckets)
+        return {"assignments": assignments, "clusters": clusters}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, keywords=len(self._keywords), buckets=len(self._buckets))
+
+
+def cluster_serps(organic_by_keyword: Dict[str, List[Dict[str, Any]]], **kwargs) -> Dict[str, Any]:
+    """Atajo: clusters() para {keyword: features["organic"]} (kwargs van a SerpClusterer)."""
+    clusterer = SerpClusterer(**kwargs)
+    for keyword, organic in organic_by_keyword.items():
+        clusterer.add(keyword, organic)
+    result = clusterer.clusters()
+    logger.info(f"Clustering SERP: {len(organic_by_keyword)} keywords → {len(result['clusters'])} clusters")
+    return result
@@ -0,0 +1,14 @@
+# conftest.py
+# Configuración común de los tests: módulos del repo importables y cachés en un
+# directorio temporal (config.py lee las rutas del entorno al importarse).
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_CACHE_DIR = tempfile.mkdtemp(prefix="outline-tests-")
+os.environ.setdefault("SERP_CACHE_PATH", os.path.join(_CACHE_DIR, "serp_cache.sqlite3"))
+os.environ.setdefault("PAGE_CACHE_PATH", os.path.join(_CACHE_DIR, "page_cache.sqlite3"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_CACHE_DIR, "llm_cache.sqlite3"))
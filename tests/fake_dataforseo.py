@@ -0,0 +1,147 @@
+# fake_dataforseo.py
+# Servidor local que imita los endpoints de DataForSEO usados por el modo encolado
+# (task_post / tasks_ready / task_get/advanced) y por live/advanced, para probar sin
+# llamadas pagas. Se usa con RestClient(base_url=server.url) o DATAFORSEO_BASE_URL.
+
+import gzip
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+def serp_items(keyword: str) -> List[Dict[str, Any]]:
+    """Items de una SERP de prueba: orgánicos, un PAA y un tipo que el parser no usa."""
+    organic = [{"type": "organic", "rank_group": i + 1, "title": f"{keyword} resultado {i + 1}",
+                "url": f"https://sitio{i + 1}.com/{keyword.replace(' ', '-')}", "description": "Snippet"}
+               for i in range(3)]
+    return organic + [{"type": "people_also_ask", "items": [{"title": f"¿Qué es {keyword}?"}]},
+                      {"type": "paid", "title": "Anuncio", "url": "https://ads.com"}]
+
+
+class FakeDataForSEO(ThreadingHTTPServer):
+    """Estado del servidor falso.
+
+    `ready_after` fija en qué consulta a tasks_ready aparece listo cada keyword (por
+    defecto en la primera; None = nunca). Los keywords en `reject` no se crean
+    (task_post devuelve status 40501). task_post responde los tasks en orden inverso
+    para que el cliente tenga que mapearlos por keyword. Se registran las consultas.
+    Con `idle_timeout` (segundos) cierra las conexiones keep-alive inactivas, como el
+    servidor real.
+    """
+
+    def __init__(self, ready_after: Optional[Dict[str, Optional[int]]] = None, reject=(),
+                 idle_timeout: Optional[float] = None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.idle_timeout = idle_timeout
+        self.ready_after = dict(ready_after or {})
+        self.reject = set(reject)
+        self.lock = threading.Lock()
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.collected: List[str] = []
+        self.polls = 0
+        self.requests: List[str] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self) -> "FakeDataForSEO":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def task_post(self, payload: List[Dict[str, Any]]) -> Dict[str, Any]:
+        tasks = []
+        with self.lock:
+            for data in payload:
+                keyword = data["keyword"]
+                if keyword in self.reject:
+                    tasks.append({"id": None, "status_code": 40501, "status_message": "Invalid Field",
+                                  "data": data, "result": None})
+                    continue
+                task_id = f"task-{len(self.tasks) + 1:04d}"
+                self.tasks[task_id] = {"data": data, "posted_at_poll": self.polls}
+                tasks.append({"id": task_id, "status_code": 20100, "status_message": "Task Created.",
+                              "data": data, "result": None})
+        return _envelope(list(reversed(tasks)))
+
+    def tasks_ready(self) -> Dict[str, Any]:
+        with self.lock:
+            self.polls += 1
+            ready = []
+            for task_id, task in self.tasks.items():
+                after = self.ready_after.get(task["data"]["keyword"], 1)
+                if task_id not in self.collected and after is not None \
+                        and self.polls - task["posted_at_poll"] >= after:
+                    ready.append({"id": task_id, "se": "google", "se_type": "organic",
+                                  "endpoint_advanced": f"/v3/serp/google/organic/task_get/advanced/{task_id}"})
+        return _envelope([{"id": "ready", "status_code": 20000, "result": ready}])
+
+    def task_get(self, task_id: str) -> Dict[str, Any]:
+        with self.lock:
+            task = self.tasks[task_id]
+            self.collected.append(task_id)
+        keyword = task["data"]["keyword"]
+        return _envelope([{"id": task_id, "status_code": 20000, "status_message": "Ok.", "data": task["data"],
+                           "result": [{"keyword": keyword, "items": serp_items(keyword)}]}])
+
+    def live(self, payload: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return _envelope([{"id": f"live-{i}", "status_code": 20000, "data": data,
+                           "result": [{"keyword": data["keyword"], "items": serp_items(data["keyword"])}]}
+                          for i, data in enumerate(payload)])
+
+
+def _envelope(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"status_code": 20000, "status_message": "Ok.", "tasks_count": len(tasks),
+            "tasks_error": sum(1 for t in tasks if t["status_code"] >= 40000), "tasks": tasks}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Al vencer el timeout esperando el próximo pedido, handle_one_request cierra la conexión
+        self.timeout = self.server.idle_timeout
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def _payload(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body or b"null")
+
+    def _send(self, js: Dict[str, Any]):
+        body = json.dumps(js).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.server.requests.append(f"POST {self.path}")
+        payload = self._payload()
+        if self.path.endswith("/task_post"):
+            self._send(self.server.task_post(payload))
+        elif self.path.endswith("/live/advanced"):
+            self._send(self.server.live(payload))
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        self.server.requests.append(f"GET {self.path}")
+        match = re.search(r"/task_get/advanced/([\w-]+)$", self.path)
+        if self.path.endswith("/tasks_ready"):
+            self._send(self.server.tasks_ready())
+        elif match and match.group(1) in self.server.tasks:
+            self._send(self.server.task_get(match.group(1)))
+        else:
+            self.send_error(404)
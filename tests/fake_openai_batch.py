@@ -0,0 +1,109 @@
+# fake_openai_batch.py
+# Cliente falso de OpenAI con las partes de la Files API y la Batch API que usa
+# openai_batch.py (files.create/content, batches.create/retrieve), sin red ni costo.
+
+import json
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def response_body(text: str, status: str = "completed") -> Dict:
+    """Cuerpo de una respuesta de /v1/responses con `text` como output_text."""
+    return {"id": "resp_fake", "object": "response", "status": status,
+            "output": [{"type": "message", "role": "assistant",
+                        "content": [{"type": "output_text", "text": text, "annotations": []}]}]}
+
+
+class _Files:
+    def __init__(self):
+        self.contents: Dict[str, str] = {}
+
+    def add(self, text: str) -> str:
+        file_id = f"file-{len(self.contents) + 1}"
+        self.contents[file_id] = text
+        return file_id
+
+    def create(self, file, purpose: str):
+        data = file.read()
+        return SimpleNamespace(id=self.add(data.decode("utf-8") if isinstance(data, bytes) else data),
+                               purpose=purpose)
+
+    def content(self, file_id: str):
+        return SimpleNamespace(text=self.contents[file_id])
+
+
+class _Batches:
+    def __init__(self, client: "FakeBatchClient"):
+        self.client = client
+        self.created: Dict[str, Dict] = {}
+        self.retrieves = 0
+
+    def create(self, input_file_id: str, endpoint: str, completion_window: str, metadata=None):
+        batch_id = f"batch-{len(self.created) + 1}"
+        self.created[batch_id] = {"input_file_id": input_file_id, "endpoint": endpoint, "polls": 0}
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    def retrieve(self, batch_id: str):
+        self.retrieves += 1
+        return self.client.advance(batch_id)
+
+
+class FakeBatchClient:
+    """Procesa los batches según `progress`: cantidad de requests terminados en cada
+    consulta (el último valor se repite; None = terminado).
+
+    Los outlines son "OUTLINE <keyword>". Los keywords en `failed` van al archivo de
+    errores, los de `http_error` vuelven con status 500, los de `incomplete` con la
+    respuesta cortada ("OUTLINE <keyword> (cortado)", status "incomplete") y los de
+    `dropped` no aparecen en ningún archivo.
+    """
+
+    def __init__(self, progress: Iterable[Optional[int]] = (None,), failed=(), http_error=(), dropped=(),
+                 incomplete=()):
+        self.progress: List[Optional[int]] = list(progress)
+        self.failed, self.http_error, self.dropped = set(failed), set(http_error), set(dropped)
+        self.incomplete = set(incomplete)
+        self.files = _Files()
+        self.batches = _Batches(self)
+
+    def requests(self, batch_id: str) -> List[Tuple[str, str]]:
+        """[(custom_id, keyword)] del archivo de entrada del batch."""
+        lines = self.files.contents[self.batches.created[batch_id]["input_file_id"]].splitlines()
+        requests = []
+        for line in filter(str.strip, lines):
+            record = json.loads(line)
+            payload = json.loads(record["body"]["input"][1]["content"])
+            requests.append((record["custom_id"], payload["keyword"]))
+        return requests
+
+    def advance(self, batch_id: str):
+        state = self.batches.created[batch_id]
+        step = self.progress[min(state["polls"], len(self.progress) - 1)]
+        state["polls"] += 1
+        requests = self.requests(batch_id)
+        if step is not None:
+            counts = SimpleNamespace(total=len(requests), completed=min(step, len(requests)), failed=0)
+            return SimpleNamespace(id=batch_id, status="in_progress", request_counts=counts,
+                                   output_file_id=None, error_file_id=None)
+        if "output_file_id" not in state:
+            output, errors = [], []
+            for cid, keyword in requests:
+                if keyword in self.dropped:
+                    continue
+                if keyword in self.failed:
+                    errors.append({"id": "req", "custom_id": cid, "response": None,
+                                   "error": {"code": "server_error", "message": "fallo simulado"}})
+                elif keyword in self.http_error:
+                    errors.append({"id": "req", "custom_id": cid, "error": None,
+                                   "response": {"status_code": 500, "body": {"error": {"message": "boom"}}}})
+                elif keyword in self.incomplete:
+                    output.append({"id": "req", "custom_id": cid, "error": None, "response": {
+                        "status_code": 200, "body": response_body(f"OUTLINE {keyword} (cortado)", "incomplete")}})
+                else:
+                    output.append({"id": "req", "custom_id": cid, "error": None,
+                                   "response": {"status_code": 200, "body": response_body(f"OUTLINE {keyword}")}})
+            state["output_file_id"] = self.files.add("".join(json.dumps(r) + "\n" for r in output))
+            state["error_file_id"] = self.files.add("".join(json.dumps(r) + "\n" for r in errors))
+            state["counts"] = SimpleNamespace(total=len(requests), completed=len(output), failed=len(errors))
+        return SimpleNamespace(id=batch_id, status="completed", request_counts=state["counts"],
+                               output_file_id=state["output_file_id"], error_file_id=state["error_file_id"])
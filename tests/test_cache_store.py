@@ -0,0 +1,56 @@
+# test_cache_store.py
+# Total de bytes en memoria de SQLiteCache: coincide con SUM(size) tras altas,
+# reemplazos, bajas, vencimientos y desalojos, y la escritura no hace SUM.
+
+import os
+import time
+
+from cache_store import SQLiteCache
+
+
+def stored(cache):
+    return cache._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+
+def test_running_total_matches_table(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), max_bytes=10 ** 9)
+    cache.set_bytes("a", os.urandom(1000))
+    cache.set_bytes("b", os.urandom(2000), ttl=-1)
+    cache.set_bytes("a", os.urandom(3000))  # reemplazo: resta el tamaño anterior
+    assert cache._total == stored(cache)
+    assert cache.get_bytes("b") is None  # vencida: se borra
+    cache.delete("a")
+    cache.delete("no-existe")
+    assert cache._total == stored(cache) == 0
+
+    cache.set("c", {"x": 1})
+    assert SQLiteCache(cache.path)._total == stored(cache)  # se carga al abrir
+
+
+def test_set_does_not_sum_below_limit(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), max_bytes=10 ** 9)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    for i in range(20):
+        cache.set(f"k{i}", {"i": i})
+    assert not [s for s in statements if "SUM(" in s]
+
+
+def test_eviction_uses_running_total(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), max_bytes=10_000)
+    for i in range(15):
+        cache.set_bytes(f"k{i}", os.urandom(1000))
+        time.sleep(0.001)
+    assert cache._stats["evictions"] > 0
+    assert cache._total == stored(cache) <= 10_000
+    assert cache.get_bytes("k0") is None and cache.get_bytes("k14") is not None
+
+
+def test_resync_counts_other_processes(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache, other = SQLiteCache(path, max_bytes=10_000), SQLiteCache(path, max_bytes=10 ** 9)
+    for i in range(15):
+        other.set_bytes(f"otro{i}", os.urandom(1000))
+    cache._synced_at -= SQLiteCache.RESYNC_SECONDS + 1
+    cache.set_bytes("propio", os.urandom(1000))
+    assert cache._stats["evictions"] > 0 and stored(cache) <= 10_000
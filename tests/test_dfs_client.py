@@ -0,0 +1,118 @@
+# test_dfs_client.py
+# Conexiones keep-alive de RestClient: las que el servidor cerró mientras estaban
+# inactivas se descartan antes de usarlas; si se cae una ya tomada, GET se repite
+# siempre y POST solo si el pedido no llegó a enviarse (task_post no se duplica).
+
+import io
+import json
+import time
+from http.client import RemoteDisconnected
+
+import pytest
+
+from dfs_client import RestClient
+from fake_dataforseo import FakeDataForSEO
+
+
+class FakeResponse(io.BytesIO):
+    will_close = False
+
+    def getheader(self, name, default=None):
+        return default
+
+
+class FakeConnection:
+    """Conexión que falla en `fail_on` ("request" o "getresponse") o responde {"ok": true}."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.sent = []
+
+    def request(self, method, path, headers=None, body=None):
+        if self.fail_on == "request":
+            raise BrokenPipeError("conexión cerrada")
+        self.sent.append((method, path))
+
+    def getresponse(self):
+        if self.fail_on == "getresponse":
+            raise RemoteDisconnected("Remote end closed connection without response")
+        return FakeResponse(json.dumps({"ok": True}).encode())
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = RestClient("user", "pass")
+    opened = []
+
+    def new_connection():
+        opened.append(FakeConnection())
+        return opened[-1]
+    monkeypatch.setattr(client, "_new_connection", new_connection)
+    # La conexión pasa el chequeo de _acquire y el servidor la cierra justo después
+    monkeypatch.setattr(client, "_is_open", lambda connection: True)
+    client.opened = opened
+    return client
+
+
+def stale(client, fail_on):
+    connection = FakeConnection(fail_on)
+    client._idle.put((connection, time.monotonic()))
+    return connection
+
+
+@pytest.mark.parametrize("fail_on", ["request", "getresponse"])
+def test_get_is_retried_on_a_new_connection(client, fail_on):
+    stale(client, fail_on)
+    assert client.get("/v3/serp/google/organic/tasks_ready") == {"ok": True}
+    assert client.opened[0].sent == [("GET", "/v3/serp/google/organic/tasks_ready")]
+    assert client.stats()["reconnects"] == 1
+
+
+def test_post_is_retried_when_it_was_not_sent(client):
+    stale(client, "request")
+    assert client.post("/v3/serp/google/organic/task_post", [{"keyword": "kw"}]) == {"ok": True}
+    assert len(client.opened) == 1
+
+
+def test_post_is_not_resent_after_the_server_received_it(client):
+    connection = stale(client, "getresponse")
+    with pytest.raises(RemoteDisconnected):
+        client.post("/v3/serp/google/organic/task_post", [{"keyword": "kw"}])
+    assert connection.sent == [("POST", "/v3/serp/google/organic/task_post")]
+    assert client.opened == []
+
+
+@pytest.fixture
+def server():
+    server = FakeDataForSEO(idle_timeout=0.2).start()
+    yield server
+    server.stop()
+
+
+def test_post_after_server_closed_idle_connection(server):
+    client = RestClient("user", "pass", base_url=server.url)
+    payload = [{"keyword": "pan casero", "location_code": 2032}]
+    assert client.post("/v3/serp/google/organic/task_post", payload)["tasks_count"] == 1
+    time.sleep(0.5)  # El servidor cierra la conexión inactiva
+    assert client.post("/v3/serp/google/organic/task_post", payload)["tasks_count"] == 1
+
+    stats = client.stats()
+    assert stats["idle_dropped"] == 1 and stats["connections_opened"] == 2 and stats["reconnects"] == 0
+    assert server.requests == ["POST /v3/serp/google/organic/task_post"] * 2
+
+
+def test_idle_connection_is_reused_before_timeout(server):
+    client = RestClient("user", "pass", base_url=server.url)
+    client.get("/v3/serp/google/organic/tasks_ready")
+    client.post("/v3/serp/google/organic/task_post", [{"keyword": "pan"}])
+    assert client.stats()["connections_opened"] == 1 and client.stats()["reused"] == 1
+
+
+def test_connection_idle_past_max_idle_is_dropped(server):
+    client = RestClient("user", "pass", base_url=server.url, max_idle=0.0)
+    client.get("/v3/serp/google/organic/tasks_ready")
+    client.get("/v3/serp/google/organic/tasks_ready")
+    assert client.stats()["idle_dropped"] == 1 and client.stats()["connections_opened"] == 2
@@ -0,0 +1,31 @@
+# test_extract_engines.py
+# Los motores bs4 y lxml de parse_article tienen que dar la misma salida.
+
+import pytest
+
+from bench_extract import compare, extract_all, synthetic_pages
+from scraper import parse_article
+
+NOISY_HEADINGS = (b"<html><head><title>Portada</title></head><body><article>"
+                  b"<h2>Uno<style>.a{}</style></h2><h2>Dos<script>var x = 1;</script></h2>"
+                  b"<h2>Tres<noscript> sin JS</noscript></h2><h2>Cuatro<template>oculto</template>!</h2>"
+                  b"<h2><script>solo script</script></h2><h3>A<!-- comentario -->B</h3>"
+                  b"<p>" + b"texto del cuerpo " * 30 + b"<template>plantilla</template></p>"
+                  b"</article></body></html>")
+
+
+@pytest.mark.parametrize("engine", ["bs4", "lxml"])
+def test_script_style_and_template_text_is_ignored(engine):
+    result = parse_article("https://example.com/nota", NOISY_HEADINGS, engine=engine)
+    assert result["h2"] == ["Uno", "Dos", "Tressin JS", "Cuatro!"]
+    assert result["h3"] == ["AB"]
+    assert "plantilla" not in result["text"]
+
+
+def test_engines_match_on_synthetic_corpus():
+    pages = synthetic_pages(150)
+    names = [name for name, _, _ in pages]
+    _, bs4_results = extract_all(pages, "bs4")
+    _, lxml_results = extract_all(pages, "lxml")
+    assert compare(names, bs4_results, lxml_results) == {}
+    assert [r["len_words"] for r in bs4_results] == [r["len_words"] for r in lxml_results]
@@ -0,0 +1,33 @@
+# test_keyword_events.py
+# pipeline.keyword_events: los eventos del hilo productor llegan en orden y un error
+# de la corrida se relanza en el hilo que itera.
+
+import pytest
+
+import pipeline
+
+
+def fake_run_keywords(fail_after=None):
+    def run_keywords(keywords, config, on_outline_delta=None, **kwargs):
+        for i, kw in enumerate(keywords):
+            if i == fail_after:
+                raise ValueError(f"falló {kw}")
+            on_outline_delta(kw, f"# {kw}")
+            yield kw, {"keyword": kw}
+    return run_keywords
+
+
+def test_events_in_order(monkeypatch):
+    monkeypatch.setattr(pipeline, "run_keywords", fake_run_keywords())
+    assert list(pipeline.keyword_events(["a", "b"], {})) == [
+        ("delta", "a", "# a"), ("done", "a", {"keyword": "a"}),
+        ("delta", "b", "# b"), ("done", "b", {"keyword": "b"})]
+
+
+def test_producer_error_is_raised_in_consumer(monkeypatch):
+    monkeypatch.setattr(pipeline, "run_keywords", fake_run_keywords(fail_after=1))
+    received = []
+    with pytest.raises(ValueError, match="falló b"):
+        for event in pipeline.keyword_events(["a", "b", "c"], {}):
+            received.append(event)
+    assert received == [("delta", "a", "# a"), ("done", "a", {"keyword": "a"})]
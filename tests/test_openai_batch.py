@@ -0,0 +1,101 @@
+# test_openai_batch.py
+# Modo batch de OpenAI (generate_outlines_batch) con un cliente falso de Files/Batches.
+
+import json
+
+import pandas as pd
+import pytest
+
+import openai_batch
+from fake_openai_batch import FakeBatchClient
+from openai_batch import custom_id, generate_outlines_batch
+
+
+def outline_args(keyword):
+    df = pd.DataFrame([{"title": f"{keyword} guía", "h2": ["Qué es"], "h3": [], "len_words": 900,
+                        "has_tables": False, "has_lists": True}])
+    return dict(df=df, paa=[f"¿Qué es {keyword}?"], related=[], ai_overview=[], videos=[],
+                intent_label="informational", intent_scores={"informational": 1.0}, model="gpt-test")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(openai_batch.time, "sleep", recorded.append)
+    return recorded
+
+
+def test_results_are_mapped_per_keyword(tmp_path, sleeps):
+    keywords = ["seguro auto", "seguro hogar", "seguro viaje", "seguro vida", "seguro moto"]
+    client = FakeBatchClient(progress=[0, 0, 2, 2, None], failed={"seguro viaje"},
+                             http_error={"seguro vida"}, dropped={"seguro moto"})
+    submitted = []
+    results = generate_outlines_batch({kw: outline_args(kw) for kw in keywords}, api_key="k",
+                                      path=str(tmp_path / "batch.jsonl"), client=client,
+                                      on_submit=submitted.append, poll_min=1.0, poll_max=3.0, backoff=2.0)
+
+    assert results["seguro auto"] == ("OUTLINE seguro auto", None)
+    assert results["seguro hogar"] == ("OUTLINE seguro hogar", None)
+    assert results["seguro viaje"][0] is None and "fallo simulado" in results["seguro viaje"][1]
+    assert results["seguro vida"][0] is None and results["seguro vida"][1].startswith("HTTP 500")
+    assert results["seguro moto"] == (None, "sin resultado (batch completed)")
+
+    # El JSONL enviado tiene una línea por keyword, con el custom_id estable
+    lines = [json.loads(line) for line in (tmp_path / "batch.jsonl").read_text().splitlines()]
+    assert [line["custom_id"] for line in lines] == [custom_id(kw) for kw in keywords]
+    assert submitted == ["batch-1"]
+
+    # Backoff: poll_min al avanzar los completados, ×2 (hasta poll_max) mientras no avanzan
+    assert sleeps == [1.0, 2.0, 1.0, 2.0]
+    assert client.batches.retrieves == 5
+
+
+def test_resuming_by_batch_id_does_not_resubmit(tmp_path, sleeps):
+    client = FakeBatchClient(progress=[None])
+    requests = {"seguro auto": outline_args("seguro auto")}
+    generate_outlines_batch(requests, api_key="k", path=str(tmp_path / "a.jsonl"), client=client)
+    results = generate_outlines_batch(requests, api_key="k", path=str(tmp_path / "b.jsonl"),
+                                      client=client, batch_id="batch-1")
+    assert results == {"seguro auto": ("OUTLINE seguro auto", None)}
+    assert len(client.batches.created) == 1 and not (tmp_path / "b.jsonl").exists()
+
+
+def test_wait_for_batch_stops_at_timeout(sleeps):
+    client = FakeBatchClient(progress=[0])
+    client.files.add(json.dumps({"custom_id": "kw-x", "body": {"input": [
+        {}, {"content": json.dumps({"keyword": "x"})}]}}) + "\n")
+    batch_id = client.batches.create(input_file_id="file-1", endpoint="/v1/responses", completion_window="24h").id
+    batch = openai_batch.wait_for_batch(client, batch_id, poll_min=1.0, poll_max=1.0, timeout=0.5)
+    assert batch.status == "in_progress" and sleeps == []
+
+
+def test_apply_caches_only_completed_outlines(tmp_path, sleeps, monkeypatch):
+    import batch_runner
+    from batch_runner import OPENAI_BATCH_INPUT, RESULTS_FILE, Checkpoint, apply_openai_batches
+    from openai_batch import batch_line
+
+    class FakeCache:
+        def __init__(self):
+            self.entries = {}
+
+        def set(self, body, text):
+            self.entries[body["input"][1]["content"]] = text
+
+    keywords = ["pan casero", "pan dulce"]
+    client, cache = FakeBatchClient(incomplete={"pan dulce"}), FakeCache()
+    monkeypatch.setattr(batch_runner, "batch_client", lambda api_key: client)
+    monkeypatch.setattr(batch_runner, "get_llm_cache", lambda: cache)
+    (tmp_path / OPENAI_BATCH_INPUT).write_text(
+        "".join(json.dumps(batch_line(kw, outline_args(kw)), default=str) + "\n" for kw in keywords))
+    (tmp_path / RESULTS_FILE).write_text("".join(json.dumps(
+        {"keyword": kw, "outline_md": "heurístico", "outline_extras_md": "\nEXTRAS"}) + "\n" for kw in keywords))
+
+    checkpoint = Checkpoint(str(tmp_path))
+    stats = apply_openai_batches(str(tmp_path), checkpoint, {"openai_key": "k"}, poll_min=1.0)
+
+    assert stats["outlines"] == 2
+    assert list(cache.entries.values()) == ["OUTLINE pan casero"]
+    records = {record["keyword"]: record for record in checkpoint.records()}
+    assert records["pan dulce"]["outline_md"] == "OUTLINE pan dulce (cortado)\nEXTRAS"
+    assert "incomplete" in records["pan dulce"]["warnings"][0]
+    assert not records["pan casero"].get("warnings")
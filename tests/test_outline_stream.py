@@ -0,0 +1,104 @@
+# test_outline_stream.py
+# Fin del stream de responses.create en outline_generator._stream_text: completo,
+# incompleto (se devuelve lo generado) y fallido (excepción). Solo las respuestas
+# completas se guardan en la caché del LLM.
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+import outline_generator
+from outline_generator import _cached_stream, _stream_text, collect_stream
+
+
+class FakeDispatcher:
+    def __init__(self, events):
+        self.events = events
+
+    def stream(self, api_params):
+        return iter(self.events)
+
+    def create(self, api_params):
+        return self.events
+
+
+class FakeCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, api_params, force=False):
+        return None if force else self.entries.get(str(api_params))
+
+    def set(self, api_params, text):
+        self.entries[str(api_params)] = text
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FakeCache()
+    monkeypatch.setattr(outline_generator, "get_llm_cache", lambda: cache)
+    return cache
+
+
+def deltas(*parts):
+    return [SimpleNamespace(type="response.output_text.delta", delta=part) for part in parts]
+
+
+def test_completed_returns_final_text():
+    events = deltas("# Out", "line") + [
+        SimpleNamespace(type="response.completed", response=SimpleNamespace(output_text="# Outline"))]
+    received = []
+    assert collect_stream(_stream_text(FakeDispatcher(events), {}, "outline"), received.append) \
+        == ("# Outline", "completed")
+    assert received == ["# Out", "line"]
+
+
+def test_incomplete_returns_partial_text_with_warning(caplog):
+    response = SimpleNamespace(output_text="# Outline\n## Cortado",
+                               incomplete_details=SimpleNamespace(reason="max_output_tokens"))
+    events = deltas("# Outline\n", "## Cortado") + [SimpleNamespace(type="response.incomplete", response=response)]
+    with caplog.at_level(logging.WARNING, logger="outline_generator"):
+        text = collect_stream(_stream_text(FakeDispatcher(events), {}, "outline"))
+    assert text == ("# Outline\n## Cortado", "incomplete")
+    assert "max_output_tokens" in caplog.text
+
+
+def test_incomplete_without_output_text_uses_deltas():
+    events = deltas("# Outline", " parcial") + [
+        SimpleNamespace(type="response.incomplete", response=SimpleNamespace(incomplete_details=None))]
+    assert collect_stream(_stream_text(FakeDispatcher(events), {}, "outline")) == ("# Outline parcial", "incomplete")
+
+
+@pytest.mark.parametrize("event", [
+    SimpleNamespace(type="response.failed", response=SimpleNamespace(error="server_error")),
+    SimpleNamespace(type="error", message="boom"),
+])
+def test_failed_raises(event):
+    with pytest.raises(RuntimeError, match=event.type):
+        collect_stream(_stream_text(FakeDispatcher(deltas("# Out") + [event]), {}, "outline"))
+
+
+def test_only_completed_streams_are_cached(cache):
+    incomplete = deltas("# Cor", "tado") + [
+        SimpleNamespace(type="response.incomplete", response=SimpleNamespace(output_text="# Cortado"))]
+    assert collect_stream(_cached_stream(FakeDispatcher(incomplete), {"n": 1}, "outline")) == "# Cortado"
+    # Sin evento final (stream cortado) tampoco se guarda
+    assert collect_stream(_cached_stream(FakeDispatcher(deltas("# Sin fin")), {"n": 2}, "outline")) == "# Sin fin"
+    assert cache.entries == {}
+
+    completed = deltas("# Ok") + [
+        SimpleNamespace(type="response.completed", response=SimpleNamespace(output_text="# Ok"))]
+    assert collect_stream(_cached_stream(FakeDispatcher(completed), {"n": 3}, "outline")) == "# Ok"
+    assert cache.entries == {str({"n": 3}): "# Ok"}
+
+
+@pytest.mark.parametrize("status, cached", [("completed", True), ("incomplete", False)])
+def test_non_streaming_caches_only_completed(cache, monkeypatch, status, cached):
+    response = SimpleNamespace(output_text="# Outline", status=status)
+    monkeypatch.setattr(outline_generator, "_dispatcher", lambda api_key: FakeDispatcher(response))
+    monkeypatch.setattr(outline_generator, "build_outline_request", lambda keyword, **kwargs: {"kw": keyword})
+    assert outline_generator.generate_outline_with_openai(
+        "pan casero", df=None, paa=[], related=[], ai_overview=[], videos=[], intent_label="informational",
+        intent_scores={}, model="gpt-test", api_key="k") == "# Outline"
+    assert (str({"kw": "pan casero"}) in cache.entries) is cached
@@ -0,0 +1,62 @@
+# test_page_cache.py
+# extract_article con la caché de páginas: una revalidación sin cambios (304 o mismo
+# hash) devuelve el resultado guardado y renueva el vencimiento de la entrada.
+
+import time
+
+import pytest
+
+import scraper
+from config import PAGE_CACHE_CONFIG
+from page_cache import PageCache, content_hash
+from scraper import FetchedPage
+
+URL = "https://example.com/nota"
+HTML = b"<html><head><title>Nota</title></head><body><h1>Nota</h1><h2>Uno</h2><p>texto de prueba</p></body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PageCache(path=str(tmp_path / "pages.sqlite"))
+    monkeypatch.setattr(scraper, "get_page_cache", lambda: cache)
+    return cache
+
+
+def fetches(monkeypatch, *responses):
+    calls = []
+
+    def fake_fetch(url, headers=None, **kwargs):
+        calls.append(headers or {})
+        return responses[len(calls) - 1]
+    monkeypatch.setattr(scraper, "http_fetch", fake_fetch)
+    return calls
+
+
+def expires_at(cache, key):
+    return cache.store._conn.execute("SELECT expires_at FROM cache WHERE key = ?", (key,)).fetchone()[0]
+
+
+def age_entries(cache, seconds_left):
+    cache.store._conn.execute("UPDATE cache SET expires_at = ?", (time.time() + seconds_left,))
+
+
+@pytest.mark.parametrize("revalidation", [
+    FetchedPage(304, {}, b""),
+    FetchedPage(200, {"Content-Type": "text/html"}, HTML),
+])
+def test_unchanged_page_refreshes_ttl(cache, monkeypatch, revalidation):
+    calls = fetches(monkeypatch, FetchedPage(200, {"Content-Type": "text/html", "ETag": '"v1"'}, HTML),
+                    revalidation)
+    first = scraper.extract_article(URL, engine="lxml")
+    age_entries(cache, 60)
+
+    assert scraper.extract_article(URL, engine="lxml") == first
+    assert calls[1] == {"If-None-Match": '"v1"'}
+    minimum = time.time() + PAGE_CACHE_CONFIG["ttl"] - 60
+    assert expires_at(cache, f"page:{URL}") > minimum
+    assert expires_at(cache, f"body:{content_hash(HTML)}") > minimum
+
+
+def test_touch_missing_key(tmp_path):
+    cache = PageCache(path=str(tmp_path / "pages.sqlite"))
+    assert cache.store.touch("page:https://example.com/otra", ttl=10) is False
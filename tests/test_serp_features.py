@@ -0,0 +1,65 @@
+# test_serp_features.py
+# SERP con shopping/local pack: decode_serp_stream → parse_serp_features → guess_intent_batch.
+
+import io
+import json
+
+import pytest
+
+import dataforseo_api
+from analytics import guess_intent_batch
+from dataforseo_api import SERP_FEATURE_TYPES, SERP_ITEM_TYPES, decode_serp_stream, parse_serp_features
+
+
+def _serp(*items):
+    organic = [{"type": "organic", "title": f"Resultado {i}", "url": f"https://sitio{i}.com/nota",
+                "description": "Texto neutro sin pistas de intención"} for i in range(3)]
+    body = {"status_code": 20000, "tasks": [{"status_code": 20000, "data": {"keyword": "zapatillas"},
+                                             "result": [{"items": organic + list(items)}]}]}
+    return io.BytesIO(json.dumps(body).encode("utf-8"))
+
+
+SHOPPING = {"type": "popular_products", "items": [{"title": "Zapatilla X", "url": "https://tienda.com/x",
+                                                   "price": {"current": 10}}]}
+LOCAL_PACK = {"type": "local_pack", "title": "Zapatería Centro", "url": "https://zapateria.com",
+              "phone": "+54 11 1234"}
+ADS = {"type": "paid", "title": "Anuncio", "url": "https://ads.com"}
+
+
+@pytest.fixture(params=["ijson", "json"])
+def decoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(dataforseo_api, "ijson", None)
+    elif dataforseo_api.ijson is None:
+        pytest.skip("ijson no instalado")
+    return decode_serp_stream
+
+
+def test_parser_covers_every_decoded_type():
+    assert set(parse_serp_features({"tasks": []})) == set(SERP_FEATURE_TYPES)
+    assert SERP_ITEM_TYPES >= {"shopping", "popular_products", "commercial_units", "local_pack", "map"}
+
+
+def test_shopping_and_local_pack_survive_decoding(decoder):
+    features = parse_serp_features(decoder(_serp(SHOPPING, LOCAL_PACK, ADS)))
+    assert len(features["organic"]) == 3
+    assert [p["title"] for p in features["shopping"]] == ["Zapatilla X"]
+    assert [p["title"] for p in features["local_pack"]] == ["Zapatería Centro"]
+
+
+def test_serp_features_drive_intent(decoder):
+    serps = [parse_serp_features(decoder(_serp(SHOPPING))),
+             parse_serp_features(decoder(_serp(LOCAL_PACK))),
+             parse_serp_features(decoder(_serp(ADS)))]
+    (shop_label, shop_probs), (local_label, _), (plain_label, plain_probs) = guess_intent_batch(serps)
+    assert shop_label == "transactional" and shop_probs["transactional"] == 1.0
+    assert local_label == "local"
+    # Sin frases ni features que sumen, todo queda en 0 (y gana el primer intent)
+    assert plain_label == "informational" and sum(plain_probs.values()) == 0
+
+
+def test_serp_cache_key_depends_on_item_types():
+    key = dataforseo_api._serp_key("Zapatillas", location_name="Argentina", language_code="es",
+                                   device="desktop", safe="active")
+    legacy = dataforseo_api._cache_key("serp", "Zapatillas", "Argentina", "es", "desktop", "active")
+    assert key.startswith("serp-") and key != legacy
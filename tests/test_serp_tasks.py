@@ -0,0 +1,86 @@
+# test_serp_tasks.py
+# Modo encolado de SERP (dfs_serp_tasks) contra el servidor falso de DataForSEO.
+
+import threading
+
+import pytest
+
+import dataforseo_api
+from dataforseo_api import dfs_serp_tasks, is_task_ok, parse_serp_features
+from dfs_client import RestClient
+from fake_dataforseo import FakeDataForSEO
+
+SERP_PARAMS = dict(login="l", password="p", location_name="Argentina", language_code="es",
+                   device="desktop", safe="active")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Intervalos de espera entre consultas a tasks_ready (se duermen de verdad)."""
+    recorded = []
+    real_sleep = dataforseo_api.time.sleep
+
+    def sleep(seconds):
+        recorded.append(round(seconds, 6))
+        real_sleep(seconds)
+
+    monkeypatch.setattr(dataforseo_api.time, "sleep", sleep)
+    return recorded
+
+
+def run_tasks(server, keywords, **kwargs):
+    delivered = {}
+    lock = threading.Lock()
+
+    def on_result(keyword, js):
+        with lock:
+            delivered[keyword] = js
+
+    results = dfs_serp_tasks(keywords, client=RestClient("l", "p", base_url=server.url),
+                             on_result=on_result, **SERP_PARAMS, **kwargs)
+    return results, delivered
+
+
+def test_partial_readiness_backoff_and_mapping(sleeps):
+    server = FakeDataForSEO(ready_after={"tarea lenta": 4, "tarea colgada": None},
+                            reject={"tarea rechazada"}).start()
+    keywords = ["tarea uno", "tarea dos", "tarea lenta", "tarea colgada", "tarea rechazada"]
+    try:
+        results, delivered = run_tasks(server, keywords, poll_min=0.01, poll_max=0.08, backoff=2.0,
+                                       timeout=0.6)
+    finally:
+        server.stop()
+
+    assert set(results) == set(keywords) and delivered.keys() == results.keys()
+    # Cada respuesta corresponde a su keyword aunque task_post los devuelva en otro orden
+    for keyword in ("tarea uno", "tarea dos", "tarea lenta"):
+        assert is_task_ok(results[keyword])
+        assert results[keyword]["tasks"][0]["data"]["keyword"] == keyword
+        features = parse_serp_features(results[keyword])
+        assert [o["title"] for o in features["organic"]][0] == f"{keyword} resultado 1"
+        assert features["paa"] == [f"¿Qué es {keyword}?"]
+    assert not is_task_ok(results["tarea rechazada"])
+    assert results["tarea rechazada"]["tasks"][0]["status_code"] == 40501
+    assert "timeout" in results["tarea colgada"]["tasks"][0]["status_message"]
+
+    # Listos en la consulta 1 (uno, dos) y 4 (lenta): el intervalo vuelve a poll_min cuando
+    # aparecen resultados y crece ×2 hasta poll_max mientras no
+    assert sleeps[:7] == [0.01, 0.02, 0.04, 0.01, 0.02, 0.04, 0.08]
+    assert max(sleeps) <= 0.08
+    # Solo se descargan los tasks listos, una vez cada uno
+    gets = [r for r in server.requests if "/task_get/" in r]
+    assert len(gets) == len(set(gets)) == 3
+    assert sum("/task_post" in r for r in server.requests) == 1
+
+
+def test_cached_serps_skip_the_queue(sleeps):
+    server = FakeDataForSEO().start()
+    try:
+        first, _ = run_tasks(server, ["tarea cacheada"], poll_min=0.01, timeout=5)
+        requests_after_first = len(server.requests)
+        second, delivered = run_tasks(server, ["tarea cacheada"], poll_min=0.01, timeout=5)
+    finally:
+        server.stop()
+    assert is_task_ok(first["tarea cacheada"])
+    assert second == first and delivered == second
+    assert len(server.requests) == requests_after_first
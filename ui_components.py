@@ -1,9 +1,11 @@
 # ui_components.py
 # Componentes de interfaz de usuario de Streamlit
 
-import os, time, base64, re
+import os, time, base64, hashlib, re
 import streamlit as st
-from config import DEFAULT_CONFIG, OPENAI_NO_TEMPERATURE_MODELS, COUNTRY_ISO_TO_NAME
+from config import DEFAULT_CONFIG, OPENAI_NO_TEMPERATURE_MODELS, COUNTRY_ISO_TO_NAME, SCRAPER_CONFIG
+from analytics import median_length_words
+from results_store import parquet_bytes
 
 
 def setup_sidebar():
@@ -39,6 +41,8 @@ def setup_sidebar():
             
         use_openai = st.toggle("Use OpenAI to generate the outline", 
                              value=True)
+        force_regenerate = st.checkbox("Forzar regeneración (ignorar caché del LLM)", value=False,
+                                       help="Por defecto un pedido idéntico reutiliza el outline ya generado")
 
         # Parámetros de búsqueda
         st.subheader("Parámetros de búsqueda")
@@ -56,8 +60,21 @@ def setup_sidebar():
         with st.expander("Configuración avanzada"):
             language_code = st.text_input("language_code (DataForSEO)", value=DEFAULT_CONFIG["language_code"], help="Ej: es-AR para español de Argentina")
             safe = st.selectbox("Búsqueda segura", ["off", "moderate", "strict"], index=0)
-            pause = st.number_input("Pausa entre peticiones (segundos)", 
+            pause = st.number_input("Pausa entre peticiones al mismo dominio (segundos)", 
                                   min_value=0.0, value=DEFAULT_CONFIG["pause"], step=0.1)
+            max_workers = st.number_input("Scraping concurrente (hilos)", min_value=1, max_value=32,
+                                        value=DEFAULT_CONFIG["max_workers"], step=1)
+            keyword_workers = st.number_input("Keywords en paralelo", min_value=1, max_value=16,
+                                            value=DEFAULT_CONFIG["keyword_workers"], step=1,
+                                            help="Cada pestaña se muestra apenas termina su keyword")
+            cluster_serps = st.checkbox("Agrupar keywords con SERP parecida", value=DEFAULT_CONFIG["cluster_serps"],
+                                        help="Consulta todas las SERP primero y genera un solo outline por grupo "
+                                             "de keywords que comparten la mayoría de sus resultados orgánicos")
+            scraper_engines = ["lxml", "bs4"]
+            scraper_engine = st.selectbox("Motor de extracción HTML", scraper_engines,
+                                          index=scraper_engines.index(SCRAPER_CONFIG["engine"])
+                                          if SCRAPER_CONFIG["engine"] in scraper_engines else 0,
+                                          help="lxml es más rápido; bs4 (BeautifulSoup) queda como alternativa")
             
             st.markdown("**Para compatibilidad con APIs legacy:**")
             gl = st.text_input("gl (Google API - código de país)", value=country_iso_code)
@@ -85,6 +102,7 @@ def setup_sidebar():
         "openai_model": openai_model,
         "openai_temperature": openai_temperature,
         "use_openai": use_openai,
+        "force_regenerate": force_regenerate,
         "country_iso_code": country_iso_code,
         "lang_iso_code": lang_iso_code,
         "language_code": language_code,
@@ -95,6 +113,13 @@ def setup_sidebar():
         "gl": gl,
         "hl": hl,
         "pause": pause,
+        "max_workers": int(max_workers),
+        "scraper_engine": scraper_engine,
+        "keyword_workers": int(keyword_workers),
+        "cluster_serps": cluster_serps,
+        "serp_concurrency": DEFAULT_CONFIG["serp_concurrency"],
+        "scrape_concurrency": DEFAULT_CONFIG["scrape_concurrency"],
+        "llm_concurrency": DEFAULT_CONFIG["llm_concurrency"],
         #"auto_generate_article": auto_generate_article,
         #"article_type": article_type,
     }
@@ -152,7 +177,7 @@ def display_content_anatomy(df):
     """Muestra anatomía del contenido"""
     st.markdown("### Anatomía del contenido")
     anatomy = {
-        "median_length_words": int(df["len_words"].replace(0, None).median() or 0),
+        "median_length_words": median_length_words(df),
         "has_tables": int(df["has_tables"].sum()),
         "has_lists": int(df["has_lists"].sum()),
     }
@@ -171,15 +196,18 @@ def display_video_suggestions(videos):
                 st.write(f"- {v.get('title')}: {url}")
 
 
-def create_download_links(outline_md, df, keyword):
-    """Crea botones de descarga"""
+def create_download_links(outline_md, pages, keyword):
+    """Crea botones de descarga (páginas scrapeadas como Parquet, outline como Markdown)"""
     
     clean_kw = re.sub(r'[^a-zA-Z0-9]+','_', keyword)
-    # csv link
-    csv = df.to_csv(index=False, encoding='utf-8')
-    b64_csv = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64_csv}" download="outline_{clean_kw}_{int(time.time())}.csv">Descargar como CSV</a>'
-    st.markdown(href, unsafe_allow_html=True)
+    # clean_kw sirve para el nombre de archivo pero no como key: "pan casero" y "pan-casero"
+    # darían el mismo y Streamlit corta el render con DuplicateWidgetID
+    widget_key = hashlib.sha1(keyword.encode("utf-8")).hexdigest()[:16]
+    # parquet (zstd) directo desde la tabla Arrow, sin pasar por CSV ni base64
+    st.download_button("Descargar páginas (Parquet)", data=parquet_bytes(pages),
+                       file_name=f"paginas_{clean_kw}_{int(time.time())}.parquet",
+                       mime="application/vnd.apache.parquet", key=f"parquet_{widget_key}",
+                       on_click="ignore")
 
     # markdown link
     b64_md = base64.b64encode(outline_md.encode()).decode()
@@ -187,6 +215,16 @@ def create_download_links(outline_md, df, keyword):
     st.markdown(href_md, unsafe_allow_html=True)
 
 
+def create_run_download(store):
+    """Botón de descarga del dataset de la corrida (pages/serp/outlines en Parquet, zip)"""
+    stats = store.stats()
+    if not stats["keywords"]:
+        return
+    st.download_button(f"📦 Descargar dataset de la corrida ({stats['keywords']} keywords, {stats['pages']} páginas)",
+                       data=store.to_zip(), file_name=f"corrida_{int(time.time())}.zip",
+                       mime="application/zip", key="run_dataset", on_click="ignore")
+
+
 def create_article_download_button(article_content: str, keyword: str, article_type: str = ""):
     """Crea botón de descarga para artículos"""
     clean_kw = re.sub(r'[^a-zA-Z0-9]+','_', keyword)